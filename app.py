@@ -1,48 +1,125 @@
+import time
+
+# Streamlit re-executes this whole file on every interaction, so keep it cheap: heavy
+# modules are imported where they are first needed and expensive objects are cached.
+run_started = time.perf_counter()
+
+import asyncio
+import os
+
 import streamlit as st
 from streamlit_webrtc import webrtc_streamer, WebRtcMode, RTCConfiguration
-from google import genai
-from google.genai import types
-import cv2
-import threading
-import PIL.Image
-import io
-import os
-import asyncio
-import base64
-from dotenv import load_dotenv
 
-# 1. Setup
-load_dotenv()
-api_key = st.secrets.get("GOOGLE_API_KEY") or os.getenv("GOOGLE_API_KEY")
-client = genai.Client(api_key=api_key, http_options={'api_version': 'v1beta'})
+from robotbox.session_state import FrameBuffer, RunTimer
 
 # Model from your script
 MODEL_ID = "gemini-2.5-flash-native-audio-preview-12-2025"
+# Pixels per camera update, split between the whole scene and a close-up of the work area.
+FRAME_PIXELS = 640 * 480
+# A fixed (x, y, w, h) close-up region as fractions of the frame, or None to follow motion.
+BOARD_REGION = None
+# Kit documentation index from `python -m robotbox.kit_docs build`, used if it exists.
+KIT_INDEX = "kit_index"
+# Processes that convert, analyse and encode camera frames for every student, or 0 to do it
+# on each session's own thread. Off until measured to help on a multi-core host: on one core
+# the pool serves fewer students than threads (`python -m robotbox.media_workers`).
+MEDIA_PROCESSES = 0
 
 st.set_page_config(page_title="RobotBox Live Lab", layout="wide")
 
+# 1. Setup (once per process, shared by every browser session)
+@st.cache_resource
+def get_client():
+    from dotenv import load_dotenv
+    from robotbox.clients import get_client as get_shared_client
+
+    load_dotenv()
+    api_key = st.secrets.get("GOOGLE_API_KEY") or os.getenv("GOOGLE_API_KEY")
+    return get_shared_client(api_key, api_version="v1beta")
+
+
+@st.cache_resource
+def get_jpeg_encoder(quality=80):
+    import cv2
+
+    params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+
+    def encode(frame_bgr):
+        # OpenCV encodes BGR directly, so there's no colour conversion to do.
+        _, buffer = cv2.imencode(".jpg", frame_bgr, params)
+        return buffer.tobytes()
+
+    return encode
+
+
+@st.cache_resource
+def get_transcript_store():
+    from robotbox.transcripts import TranscriptStore
+
+    # One writer thread for every session; appends never block the receive loop.
+    return TranscriptStore("transcripts")
+
+
+@st.cache_resource
+def get_kit_docs_tool():
+    if not os.path.isdir(KIT_INDEX):
+        return None
+    from robotbox.kit_docs import DocIndex, GeminiEmbedder, KitDocsTool
+
+    return KitDocsTool(DocIndex(KIT_INDEX, GeminiEmbedder(get_client())))
+
+
+@st.cache_resource
+def get_media_workers():
+    if not MEDIA_PROCESSES:
+        return None
+    from robotbox.media_workers import MediaWorkers
+
+    return MediaWorkers(MEDIA_PROCESSES)
+
+
+@st.cache_resource
+def get_run_timer():
+    return RunTimer()
+
+
 # 2. Socratic System Instruction
 SYSTEM_INSTRUCTION = """
 # ROLE
-You are the RobotBox AI Tutor, an expert engineering mentor inspired by Sal Khan's Socratic teaching style. 
+You are the RobotBox AI Tutor, an expert engineering mentor inspired by Sal Khan's Socratic teaching style.
 
 # SOCRATIC PRINCIPLES
 1. NEVER GIVE ANSWERS: If a student says "Where does this wire go?", ask them to identify labels.
 2. VALIDATE VISION: Use the camera feed to spot errors. Mention colors or shapes.
 3. THINK ALOUD: Explain the 'why' using analogies.
+
+# WORKSPACE OBSERVATIONS
+Camera frames arrive every few seconds, either as one image or as a pair: the whole scene at low resolution, then
+a sharp close-up of where the student is working. In between, text messages starting with "Workspace (local vision):"
+describe the breadboard as detected on the student's machine: wire colours, components and the rows they sit in.
+Treat them as a rough guide and check them against the latest frame before correcting the student.
+If the student has several cameras, each frame shows all of them tiled, with the busiest view largest.
 """
 
-# 3. Vision Buffer (Thread-safe)
-lock = threading.Lock()
-media_state = {"img": None}
+# 3. Vision Buffers (one per camera per browser session, thread-safe)
+cameras = st.sidebar.number_input("Cameras", min_value=1, max_value=4, value=1)
+# With media workers the frames stay in the decoder's YUV; the workers convert them.
+frame_format = "yuv420p" if MEDIA_PROCESSES else "bgr24"
+if "frames" not in st.session_state:
+    st.session_state.frames = [FrameBuffer(frame_format)]
+while len(st.session_state.frames) < cameras:
+    st.session_state.frames.append(FrameBuffer(frame_format))
+camera_frames = st.session_state.frames[:cameras]
+frames = camera_frames[0]
 
-def video_frame_callback(frame):
-    img = frame.to_ndarray(format="bgr24")
-    # Fix the "blue tint" by converting BGR to RGB (from your script)
-    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-    with lock:
-        media_state["img"] = img_rgb
-    return frame
+run_timer = get_run_timer()
+run_recorded = False
+
+def record_run():
+    global run_recorded
+    if not run_recorded:
+        run_timer.record(run_started)
+        run_recorded = True
 
 # 4. UI Layout
 st.title("🎙️ RobotBox Live AI Lab")
@@ -57,48 +134,169 @@ with col_video:
         rtc_configuration=RTCConfiguration(
             {"iceServers": [{"urls": ["stun:stun.l.google.com:19302"]}]}
         ),
-        video_frame_callback=video_frame_callback,
+        video_frame_callback=frames.callback,
         media_stream_constraints={"video": True, "audio": True},
         async_processing=True,
     )
+    # Extra cameras, e.g. a close-up on the microcontroller, are video only.
+    for i, extra in enumerate(camera_frames[1:], start=1):
+        webrtc_streamer(
+            key=f"robotbox-camera-{i}",
+            mode=WebRtcMode.SENDRECV,
+            rtc_configuration=RTCConfiguration(
+                {"iceServers": [{"urls": ["stun:stun.l.google.com:19302"]}]}
+            ),
+            video_frame_callback=extra.callback,
+            media_stream_constraints={"video": True, "audio": False},
+            async_processing=True,
+        )
+
+student = st.sidebar.text_input("Student name", value="student")
+resume = st.sidebar.checkbox("Continue my last session")
+close_up = st.sidebar.toggle("Send close-ups of the work area", value=True)
+st.sidebar.caption(run_timer.summary())
 
 with col_chat:
     st.subheader("💬 Tutor Session")
-    
+
     if webrtc_ctx.state.playing:
         if st.button("Connect with Tutor"):
+            # The session below blocks this run, so record the UI build time now.
+            record_run()
             with st.status("Initializing Live WebSocket...") as status:
+                from google.genai import types
+
+                from robotbox.framing import MultiResolutionFramer
+                from robotbox.mosaic import Mosaic
+                from robotbox.session_memory import RollingSummary, live_config
+                from robotbox.tools import ToolDispatcher
+                from robotbox.transcripts import SessionTranscript
+                from robotbox.workspace import ObservationStream, WorkspaceObserver
+
+                client = get_client()
+                workers = get_media_workers()
+                if workers is not None:
+                    # The same pipeline as below, in a worker process.
+                    pipeline = workers.open(close_up, FRAME_PIXELS, BOARD_REGION,
+                                            len(camera_frames))
+                else:
+                    framer = MultiResolutionFramer(FRAME_PIXELS, region=BOARD_REGION)
+                    # Several cameras go out as one tiled image, the busiest view largest.
+                    mosaic = Mosaic(len(camera_frames)) if len(camera_frames) > 1 else None
+                    # Layout changes go out as short text; full frames only every few seconds.
+                    observations = ObservationStream(
+                        WorkspaceObserver(), framer.encode if close_up else get_jpeg_encoder())
+                savings = st.empty()
+
+                async def observe():
+                    """Returns `(text, images, savings)` for the latest frames, or None."""
+                    views = [buffer.latest() for buffer in camera_frames]
+                    if workers is not None:
+                        result = await asyncio.wrap_future(workers.submit(pipeline, views))
+                        if result is None:
+                            return None
+                        return result["text"], result["images"], result["savings"]
+                    if mosaic is None:
+                        frame = views[0]
+                    else:
+                        has_view = any(view is not None for view in views)
+                        frame = mosaic.compose(views) if has_view else None
+                    if frame is None:
+                        return None
+                    # Track every frame so the close-up follows the hands.
+                    framer.track(frame)
+                    text, images = observations.tick(frame)
+                    return text, images, observations.savings()
+                store = get_transcript_store()
+                memory = RollingSummary(client)
+                session_name = None
+                if resume and (earlier := store.sessions(student)):
+                    session_name = earlier[-1][0]
+                    memory.seed(store.utterances(student, session_name))
+                transcript = SessionTranscript(store, student, session_name, memory=memory)
+                kit_docs = get_kit_docs_tool()
+
                 # This mimics your async run() loop but inside the Streamlit context
                 async def run_live_session():
-                    async with client.aio.live.connect(model=MODEL_ID, config={
-                        "system_instruction": SYSTEM_INSTRUCTION,
-                        "response_modalities": ["AUDIO"]
-                    }) as session:
-                        status.update(label="Tutor is listening!", state="running")
-                        
+                    handle = None
+                    try:
                         while webrtc_ctx.state.playing:
-                            with lock:
-                                frame = media_state["img"]
-                            
-                            if frame is not None:
-                                # Process frame for Gemini
-                                pil_img = PIL.Image.fromarray(frame)
-                                buffer = io.BytesIO()
-                                pil_img.save(buffer, format="JPEG")
-                                
-                                # Send Frame
-                                await session.send(input={
-                                    "mime_type": "image/jpeg",
-                                    "data": base64.b64encode(buffer.getvalue()).decode()
-                                })
-                            
-                            # Listen for Audio Responses
-                            async for response in session.receive():
-                                if response.data:
-                                    st.audio(response.data, format="audio/wav")
-                            
-                            await asyncio.sleep(1.0) # Prevent rate limiting
-
-                asyncio.run(run_live_session())
+                            config = live_config({
+                                "system_instruction": SYSTEM_INSTRUCTION,
+                                "response_modalities": ["AUDIO"],
+                                "input_audio_transcription": {},
+                                "output_audio_transcription": {},
+                                "tools": [kit_docs.declaration] if kit_docs else [],
+                            }, handle=handle)
+                            connection = client.aio.live.connect(model=MODEL_ID, config=config)
+                            fresh, entered = handle is None, False
+                            try:
+                                async with connection as session:
+                                    entered = True
+                                    status.update(label="Tutor is listening!", state="running")
+                                    if fresh:
+                                        # A resumed session still has its context; a new one gets
+                                        # the summary of what compression dropped or an earlier
+                                        # session.
+                                        await memory.inject(session)
+                                    # Tools run in the background so audio keeps arriving meanwhile.
+                                    tools = ToolDispatcher(session, [kit_docs] if kit_docs else [])
+                                    closing = False
+                                    try:
+                                        while webrtc_ctx.state.playing and not closing:
+                                            if (observed := await observe()) is not None:
+                                                text, images, saved = observed
+                                                for jpeg in images or ():
+                                                    await session.send_realtime_input(
+                                                        video=types.Blob(data=jpeg, mime_type="image/jpeg")
+                                                    )
+                                                if text is not None:
+                                                    await session.send_realtime_input(text=text)
+                                                savings.caption(
+                                                    f"Saving {saved['tokens_per_minute']:,} tokens and "
+                                                    f"{saved['bytes_per_minute'] / 1024:,.0f} KiB "
+                                                    "per minute against a frame per second"
+                                                )
+
+                                            # Listen for Audio Responses
+                                            async for response in session.receive():
+                                                transcript.add(response.server_content)
+                                                if update := response.session_resumption_update:
+                                                    if update.resumable and update.new_handle:
+                                                        handle = update.new_handle
+                                                if response.go_away:
+                                                    # The server is closing; resume on a new connection.
+                                                    closing = True
+                                                if response.tool_call:
+                                                    tools.dispatch(response.tool_call)
+                                                if response.tool_call_cancellation:
+                                                    tools.cancel(response.tool_call_cancellation)
+                                                if response.data:
+                                                    st.audio(response.data, format="audio/wav")
+
+                                            await asyncio.sleep(1.0) # Prevent rate limiting
+                                    finally:
+                                        await tools.aclose()
+                            except Exception:
+                                if fresh or entered:
+                                    raise
+                                # The server refused the resumption handle (e.g. it expired): start
+                                # a new session, which gets the summary instead.
+                                handle = None
+                                continue
+                            if closing:
+                                status.update(label="Reconnecting...", state="running")
+                    finally:
+                        # Stops the background summariser, however the session ended.
+                        await memory.aclose()
+
+                try:
+                    asyncio.run(run_live_session())
+                finally:
+                    transcript.close()
+                    if workers is not None:
+                        workers.close_student(pipeline)
     else:
-        st.info("Start the camera feed to begin your session.")
\ No newline at end of file
+        st.info("Start the camera feed to begin your session.")
+
+record_run()
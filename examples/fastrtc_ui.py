@@ -40,8 +40,8 @@ python live_api_ui.py
 """
 
 import asyncio
-import base64
 import os
+import sys
 from typing import Literal
 
 import gradio as gr
@@ -51,14 +51,19 @@ from fastrtc import (
     WebRTC,
     wait_for_item,
 )
-from google import genai
 from google.genai.types import (
+    Blob,
     LiveConnectConfig,
     PrebuiltVoiceConfig,
     SpeechConfig,
     VoiceConfig,
 )
 
+# Make the shared `robotbox` helpers importable when this script is run directly.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from robotbox.clients import close_clients, get_client
+from robotbox.resample import RECEIVE_SAMPLE_RATE, SEND_SAMPLE_RATE, StreamResampler
+
 try:
     from dotenv import load_dotenv
 
@@ -66,6 +71,39 @@ try:
 except (ImportError, ModuleNotFoundError):
     pass
 
+# Queue bounds, in chunks. Mic frames are 20 ms, so 25 is half a second of audio; the model
+# sends bigger chunks, so 50 is a few seconds. When the network stalls the oldest audio is
+# dropped: it's better to skip stale audio than to let latency build up forever.
+INPUT_QUEUE_SIZE = 25
+OUTPUT_QUEUE_SIZE = 50
+
+
+class QueueMetrics:
+    """Depth and drop counters for one session's audio queues."""
+
+    def __init__(self) -> None:
+        self.input_dropped = 0
+        self.output_dropped = 0
+        self.input_max_depth = 0
+        self.output_max_depth = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return dict(vars(self))
+
+
+def put_drop_oldest(queue: asyncio.Queue, item) -> bool:
+    """Puts `item` on a bounded queue, evicting the oldest item if it is full.
+
+    Returns:
+        bool: True if an item was dropped to make room.
+    """
+    dropped = False
+    if queue.full():
+        queue.get_nowait()
+        dropped = True
+    queue.put_nowait(item)
+    return dropped
+
 
 class GeminiHandler(AsyncStreamHandler):
     """Handler for the Gemini API"""
@@ -76,14 +114,18 @@ class GeminiHandler(AsyncStreamHandler):
         output_sample_rate: int = 24000,
         output_frame_size: int = 480,
     ) -> None:
+        # Take WebRTC audio at its native 48 kHz and do the conversion ourselves.
         super().__init__(
             expected_layout,
             output_sample_rate,
             output_frame_size,
-            input_sample_rate=16000,
+            input_sample_rate=48000,
         )
-        self.input_queue: asyncio.Queue = asyncio.Queue()
-        self.output_queue: asyncio.Queue = asyncio.Queue()
+        self.input_resampler: StreamResampler | None = None
+        self.output_resampler = StreamResampler(RECEIVE_SAMPLE_RATE, output_sample_rate)
+        self.input_queue: asyncio.Queue = asyncio.Queue(maxsize=INPUT_QUEUE_SIZE)
+        self.output_queue: asyncio.Queue = asyncio.Queue(maxsize=OUTPUT_QUEUE_SIZE)
+        self.metrics = QueueMetrics()
         self.quit: asyncio.Event = asyncio.Event()
 
     def copy(self) -> "GeminiHandler":
@@ -97,10 +139,8 @@ class GeminiHandler(AsyncStreamHandler):
         await self.wait_for_args()
         api_key, voice_name = self.latest_args[1:]
 
-        client = genai.Client(
-            api_key=api_key or os.getenv("GEMINI_API_KEY"),
-            http_options={"api_version": "v1alpha"},
-        )
+        # Shared across connections, so only the first student pays for client and TLS setup.
+        client = get_client(api_key or os.getenv("GEMINI_API_KEY"), api_version="v1alpha")
 
         config = LiveConnectConfig(
             response_modalities=["AUDIO"],  # type: ignore
@@ -115,28 +155,58 @@ class GeminiHandler(AsyncStreamHandler):
         async with client.aio.live.connect(
             model="gemini-2.5-flash-lite", config=config
         ) as session:
-            async for audio in session.start_stream(
-                stream=self.stream(), mime_type="audio/pcm"
-            ):
-                if audio.data:
-                    array = np.frombuffer(audio.data, dtype=np.int16)
-                    self.output_queue.put_nowait((self.output_sample_rate, array))
-
-    async def stream(self):
+            tasks = [
+                asyncio.create_task(self.send_audio(session)),
+                asyncio.create_task(self.receive_audio(session)),
+                asyncio.create_task(self.quit.wait()),
+            ]
+            try:
+                # Whichever ends first ends the session: quitting mustn't wait for the
+                # model's turn to finish, and a failed sender mustn't leave us listening.
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()  # Raises the sender's or receiver's exception, if any.
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def receive_audio(self, session):
+        while True:
+            async for message in session.receive():
+                if message.data:
+                    array = np.frombuffer(message.data, dtype=np.int16)
+                    array = self.output_resampler.process(array)
+                    if put_drop_oldest(self.output_queue, (self.output_sample_rate, array)):
+                        self.metrics.output_dropped += 1
+                    self.metrics.output_max_depth = max(
+                        self.metrics.output_max_depth, self.output_queue.qsize()
+                    )
+
+    async def send_audio(self, session):
         while not self.quit.is_set():
-            yield await wait_for_item(self.input_queue)
+            data = await wait_for_item(self.input_queue)
+            if data is not None:
+                # The SDK takes raw bytes and does the base64 encoding when it serializes.
+                await session.send_realtime_input(
+                    audio=Blob(data=data, mime_type=f"audio/pcm;rate={SEND_SAMPLE_RATE}")
+                )
 
     async def receive(self, frame: tuple[int, np.ndarray]) -> None:
-        _, array = frame
-        array = array.squeeze()
-        audio_message = base64.b64encode(array.tobytes()).decode("UTF-8")
-        self.input_queue.put_nowait(audio_message)
+        sample_rate, array = frame
+        if self.input_resampler is None or self.input_resampler.input_rate != sample_rate:
+            self.input_resampler = StreamResampler(sample_rate, SEND_SAMPLE_RATE)
+        array = self.input_resampler.process(array.squeeze())
+        if put_drop_oldest(self.input_queue, array.tobytes()):
+            self.metrics.input_dropped += 1
+        self.metrics.input_max_depth = max(self.metrics.input_max_depth, self.input_queue.qsize())
 
     async def emit(self) -> tuple[int, np.ndarray] | None:
         return await wait_for_item(self.output_queue)
 
     def shutdown(self) -> None:
         self.quit.set()
+        print(f"Session queue metrics: {self.metrics.as_dict()}")
 
 
 with gr.Blocks() as demo:
@@ -192,4 +262,7 @@ with gr.Blocks() as demo:
 
 
 if __name__ == "__main__":
-    demo.launch()
+    try:
+        demo.launch()
+    finally:
+        close_clients()
@@ -52,18 +52,60 @@ don't work.
 
 """
 
+import asyncio
 import os
 import base64
 import json
+import queue
+import sys
+import threading
 import numpy as np
 import gradio as gr
-import websockets.sync.client
+import websockets.asyncio.client
+import websockets.exceptions
 from gradio_webrtc import StreamHandler, WebRTC
 
-__version__ = "0.0.3"
+# Make the shared `robotbox` helpers importable when this script is run directly.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from robotbox.resample import RECEIVE_SAMPLE_RATE, SEND_SAMPLE_RATE, StreamResampler
+
+__version__ = "0.0.4"
 
 KEY_NAME="GOOGLE_API_KEY"
 
+# Reconnection backoff, in seconds.
+RECONNECT_INITIAL_DELAY = 0.5
+RECONNECT_MAX_DELAY = 30.0
+
+# How long `emit()` blocks waiting for audio before handing control back to Gradio.
+EMIT_TIMEOUT = 0.5
+
+# Mic chunks buffered while the socket is (re)connecting. Older chunks are dropped first.
+MAX_PENDING_SENDS = 50
+
+# Output frames (20 ms each) waiting for playback. If playback stalls, the oldest go first.
+OUTPUT_QUEUE_SIZE = 50
+
+
+def put_drop_oldest(frames: queue.Queue, item) -> bool:
+    """Puts `item` on a bounded queue, evicting the oldest item if it is full.
+
+    Returns:
+        bool: True if an item was dropped to make room.
+    """
+    dropped = False
+    while True:
+        try:
+            frames.put_nowait(item)
+            return dropped
+        except queue.Full:
+            try:
+                frames.get_nowait()
+                dropped = True
+            except queue.Empty:
+                pass  # `emit` took one meanwhile.
+
+
 # Configuration and Utilities
 class GeminiConfig:
     """Configuration settings for Gemini API."""
@@ -96,14 +138,114 @@ class AudioProcessor:
         audio_data = base64.b64decode(data)
         return np.frombuffer(audio_data, dtype=np.int16)
 
+class LiveTransport:
+    """Owns the Gemini WebSocket on a dedicated I/O thread.
+
+    Gradio's frame callbacks only enqueue outgoing messages, they never touch the socket.
+    The I/O thread runs its own asyncio loop that connects, sends and receives, and
+    reconnects in the background with exponential backoff when the connection drops.
+    """
+    def __init__(self, config, on_message):
+        self.config = config
+        self.on_message = on_message
+        self.connected = threading.Event()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="gemini-io", daemon=True)
+        self._outgoing = asyncio.Queue(maxsize=MAX_PENDING_SENDS)
+        self._future = None
+
+    def start(self):
+        """Starts the I/O thread and the connection loop."""
+        self._thread.start()
+        self._future = asyncio.run_coroutine_threadsafe(self._run(), self._loop)
+
+    def send(self, message):
+        """Queues a message for sending. Safe to call from any thread, never blocks."""
+        self._loop.call_soon_threadsafe(self._enqueue, message)
+
+    def close(self):
+        """Stops the connection loop and joins the I/O thread."""
+        if self._future is None:
+            return
+        self._future.cancel()
+        self._thread.join(timeout=5)
+
+    def _run_loop(self):
+        self._loop.run_forever()
+        self._loop.close()
+
+    def _enqueue(self, message):
+        if self._outgoing.full():
+            # Stale mic audio is worthless once the model is behind, keep the newest.
+            self._outgoing.get_nowait()
+        self._outgoing.put_nowait(message)
+
+    async def _run(self):
+        try:
+            await self._connect_forever()
+        finally:
+            self.connected.clear()
+            self._loop.stop()
+
+    async def _connect_forever(self):
+        delay = RECONNECT_INITIAL_DELAY
+        while True:
+            try:
+                async with websockets.asyncio.client.connect(self.config.ws_url) as ws:
+                    initial_request = {"setup": {"model": self.config.model,"tools":[{"google_search": {}}]}}
+                    await ws.send(json.dumps(initial_request))
+                    setup_response = json.loads(await ws.recv())
+                    print(f"Setup response: {setup_response}")
+                    self.connected.set()
+                    delay = RECONNECT_INITIAL_DELAY
+                    await self._pump(ws)
+            except (OSError, websockets.exceptions.WebSocketException) as e:
+                print(f"WebSocket connection failed: {str(e)}")
+            except Exception as e:
+                print(f"Setup failed: {str(e)}")
+            finally:
+                self.connected.clear()
+
+            print(f"Reconnecting in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+    async def _pump(self, ws):
+        """Runs the send and receive halves until either one fails."""
+        async def sender():
+            while True:
+                message = await self._outgoing.get()
+                await ws.send(json.dumps(message))
+
+        async def receiver():
+            async for message in ws:
+                self.on_message(json.loads(message))
+
+        tasks = [asyncio.create_task(sender()), asyncio.create_task(receiver())]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
 # Gemini Interaction Handler
 class GeminiHandler(StreamHandler):
     """Handles streaming interactions with the Gemini API."""
     def __init__(self, expected_layout="mono", output_sample_rate=24000, output_frame_size=480) -> None:
-        super().__init__(expected_layout, output_sample_rate, output_frame_size, input_sample_rate=24000)
+        # Take WebRTC audio at its native 48 kHz and do the conversion ourselves.
+        super().__init__(expected_layout, output_sample_rate, output_frame_size, input_sample_rate=48000)
         self.config = GeminiConfig()
-        self.ws = None
+        self.transport = None
+        self.input_resampler = None
+        self.output_resampler = StreamResampler(RECEIVE_SAMPLE_RATE, output_sample_rate)
         self.all_output_data = None
+        self.output_queue = queue.Queue(maxsize=OUTPUT_QUEUE_SIZE)
+        self.output_dropped = 0
+        # Held by the I/O thread while it builds frames and by `reset`, so a reset mid-turn
+        # can't race with the buffer being rebuilt.
+        self.output_lock = threading.Lock()
         self.audio_processor = AudioProcessor()
 
     def copy(self):
@@ -114,45 +256,29 @@ class GeminiHandler(StreamHandler):
             output_frame_size=self.output_frame_size,
         )
 
-    def _initialize_websocket(self):
-        """Initializes the WebSocket connection to the Gemini API."""
-        try:
-            self.ws = websockets.sync.client.connect(self.config.ws_url, timeout=3000)
-            initial_request = {"setup": {"model": self.config.model,"tools":[{"google_search": {}}]}}
-            self.ws.send(json.dumps(initial_request))
-            setup_response = json.loads(self.ws.recv())
-            print(f"Setup response: {setup_response}")
-        except websockets.exceptions.WebSocketException as e:
-            print(f"WebSocket connection failed: {str(e)}")
-            self.ws = None
-        except Exception as e:
-            print(f"Setup failed: {str(e)}")
-            self.ws = None
-
     def receive(self, frame: tuple[int, np.ndarray]) -> None:
-        """Receives audio/video data, encodes it, and sends it to the Gemini API."""
-        try:
-            if not self.ws:
-                self._initialize_websocket()
-
-            sample_rate, array = frame
-            message = {"realtimeInput": {"mediaChunks": []}}
-
-            if sample_rate > 0 and array is not None:
-                array = array.squeeze()
-                audio_data = self.audio_processor.encode_audio(array, self.output_sample_rate)
-                message["realtimeInput"]["mediaChunks"].append({
-                    "mimeType": f"audio/pcm;rate={self.output_sample_rate}",
-                    "data": audio_data["realtimeInput"]["mediaChunks"][0]["data"],
-                })
-
-            if message["realtimeInput"]["mediaChunks"]:
-                self.ws.send(json.dumps(message))
-        except Exception as e:
-            print(f"Error in receive: {str(e)}")
-            if self.ws:
-                self.ws.close()
-            self.ws = None
+        """Receives audio data, encodes it, and hands it to the I/O thread."""
+        if self.transport is None:
+            # Connecting happens in the background, the first frames are buffered meanwhile.
+            self.transport = LiveTransport(self.config, self._on_message)
+            self.transport.start()
+
+        sample_rate, array = frame
+        if sample_rate > 0 and array is not None:
+            if self.input_resampler is None or self.input_resampler.input_rate != sample_rate:
+                self.input_resampler = StreamResampler(sample_rate, SEND_SAMPLE_RATE)
+            array = self.input_resampler.process(array.squeeze())
+            message = self.audio_processor.encode_audio(array, SEND_SAMPLE_RATE)
+            self.transport.send(message)
+
+    def _on_message(self, msg):
+        """Called on the I/O thread for every server message."""
+        if "serverContent" in msg:
+            content = msg["serverContent"].get("modelTurn", {})
+            with self.output_lock:
+                for frame in self._process_server_content(content):
+                    if put_drop_oldest(self.output_queue, frame):
+                        self.output_dropped += 1
 
     def _process_server_content(self, content):
         """Processes audio output data from the WebSocket response."""
@@ -160,6 +286,7 @@ class GeminiHandler(StreamHandler):
             data = part.get("inlineData", {}).get("data", "")
             if data:
                 audio_array = self.audio_processor.process_audio_response(data)
+                audio_array = self.output_resampler.process(audio_array)
                 if self.all_output_data is None:
                     self.all_output_data = audio_array
                 else:
@@ -169,58 +296,32 @@ class GeminiHandler(StreamHandler):
                     yield (self.output_sample_rate, self.all_output_data[: self.output_frame_size].reshape(1, -1))
                     self.all_output_data = self.all_output_data[self.output_frame_size :]
 
-    def generator(self):
-        """Generates audio output from the WebSocket stream."""
-        while True:
-            if not self.ws:
-                print("WebSocket not connected")
-                yield None
-                continue
-
-            try:
-                message = self.ws.recv(timeout=30)
-                msg = json.loads(message)
-                if "serverContent" in msg:
-                    content = msg["serverContent"].get("modelTurn", {})
-                    yield from self._process_server_content(content)
-            except TimeoutError:
-                print("Timeout waiting for server response")
-                yield None
-            except Exception as e:
-                yield None
-
     def emit(self) -> tuple[int, np.ndarray] | None:
-        """Emits the next audio chunk from the generator."""
-        if not self.ws:
-            return None
-        if not hasattr(self, "_generator"):
-            self._generator = self.generator()
+        """Blocks until the next audio chunk is available, or returns None after a short timeout."""
         try:
-            return next(self._generator)
-        except StopIteration:
-            self.reset()
+            return self.output_queue.get(timeout=EMIT_TIMEOUT)
+        except queue.Empty:
             return None
 
     def reset(self) -> None:
-        """Resets the generator and output data."""
-        if hasattr(self, "_generator"):
-            delattr(self, "_generator")
-        self.all_output_data = None
+        """Drops any queued output data."""
+        with self.output_lock:
+            try:
+                while True:
+                    self.output_queue.get_nowait()
+            except queue.Empty:
+                pass
+            self.all_output_data = None
 
     def shutdown(self) -> None:
-        """Closes the WebSocket connection."""
-        if self.ws:
-            self.ws.close()
+        """Closes the WebSocket connection and stops the I/O thread."""
+        if self.transport:
+            self.transport.close()
+            self.transport = None
 
     def check_connection(self):
         """Checks if the WebSocket connection is active."""
-        try:
-            if not self.ws or self.ws.closed:
-                self._initialize_websocket()
-            return True
-        except Exception as e:
-            print(f"Connection check failed: {str(e)}")
-            return False
+        return self.transport is not None and self.transport.connected.is_set()
 
 # Main Gradio Interface
 def registry(
@@ -258,7 +359,8 @@ def registry(
     return interface
 
 # Launch the Gradio interface
-gr.load(
-    name='gemini-2.5-flash-lite',
-    src=registry,
-).launch()
+if __name__ == "__main__":
+    gr.load(
+        name='gemini-2.5-flash-lite',
+        src=registry,
+    ).launch()
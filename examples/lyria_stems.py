@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+## Setup
+
+This script plays several Lyria RealTime sessions at once, one per stem, mixed into a
+single output with a volume per stem. All sessions share the same bpm and scale.
+
+To install the dependencies for this script, run:
+
+```
+pip install google-genai numpy pyaudio
+```
+
+Before running this script, ensure the `GOOGLE_API_KEY` environment
+variable is set to the api-key you obtained from Google AI Studio.
+
+## Run
+
+To run the script:
+
+```
+python lyria_stems.py "Ambient pads" "Deep bass line" "Soft brushed drums" --bpm 90
+```
+
+While it plays, type `<stem>=<volume>` (for example `2=0.5`) to change a stem's volume,
+`stats` to show the mixer state, or `q` to quit. Add `--stand-in` to play stand-in stems
+generated locally instead of Lyria.
+
+To check how many stems the mixer can handle on one core, run
+`python -m robotbox.music_mixer` from the repository root.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import sys
+
+import pyaudio
+from google.genai import types
+
+# Make the shared `robotbox` helpers importable when this script is run directly.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from robotbox.clients import aclose_clients, get_client
+from robotbox.music_mixer import CHANNELS, RATE, MusicMixer
+
+MODEL = "models/lyria-realtime-exp"
+BLOCK_FRAMES = 1024
+
+
+async def run_stem(client, prompt, config, stem):
+    """Plays one Lyria session into `stem` until cancelled."""
+    async with client.aio.live.music.connect(model=MODEL) as session:
+        await session.set_weighted_prompts(prompts=[types.WeightedPrompt(text=prompt, weight=1.0)])
+        await session.set_music_generation_config(config=config)
+        await session.play()
+        async for message in session.receive():
+            if message.server_content:
+                for chunk in message.server_content.audio_chunks:
+                    stem.push(chunk.data)
+            elif message.filtered_prompt:
+                print(f"Prompt for {stem.name!r} was filtered out: ", message.filtered_prompt)
+
+
+async def control(mixer):
+    while True:
+        command = (await asyncio.to_thread(input, " > ")).strip()
+        if command.lower() == "q":
+            return
+        if command.lower() == "stats":
+            print(mixer.stats())
+            continue
+        index, _, volume = command.partition("=")
+        try:
+            number = int(index)
+            if not 1 <= number <= len(mixer.stems):
+                raise IndexError(number)  # 0 or -1 would silently pick a stem from the end.
+            mixer.set_gain(number - 1, float(volume))
+        except (ValueError, IndexError):
+            print(f"Type <stem>=<volume> with a stem from 1 to {len(mixer.stems)}, "
+                  "'stats' or 'q'")
+
+
+async def main(client, prompts, config):
+    mixer = MusicMixer()
+    stems = [mixer.add_stem(prompt) for prompt in prompts]
+    for number, prompt in enumerate(prompts, 1):
+        print(f"Stem {number}: {prompt}")
+
+    p = pyaudio.PyAudio()
+
+    def play(in_data, frame_count, time_info, status):
+        # Runs on PortAudio's thread and only ever reads what the sessions have buffered.
+        return mixer.mix(frame_count), pyaudio.paContinue
+
+    output_stream = p.open(
+        format=pyaudio.paInt16, channels=CHANNELS, rate=RATE, output=True,
+        frames_per_buffer=BLOCK_FRAMES, stream_callback=play)
+
+    sessions = [
+        asyncio.create_task(run_stem(client, prompt, config, stem))
+        for prompt, stem in zip(prompts, stems)
+    ]
+    try:
+        await control(mixer)
+    finally:
+        for task in sessions:
+            task.cancel()
+        await asyncio.gather(*sessions, return_exceptions=True)
+        output_stream.close()
+        p.terminate()
+        # Close the shared client on the loop its async connections belong to.
+        await aclose_clients()
+        print(mixer.stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("prompts", nargs="+", help="One prompt per stem")
+    parser.add_argument("--bpm", type=int, default=None)
+    parser.add_argument("--scale", default=None, help="A types.Scale name, e.g. C_MAJOR_A_MINOR")
+    parser.add_argument("--stand-in", action="store_true", help="Use a local stand-in music server")
+    args = parser.parse_args()
+
+    config = types.LiveMusicGenerationConfig(
+        bpm=args.bpm, scale=types.Scale[args.scale] if args.scale else None)
+
+    with contextlib.ExitStack() as stack:
+        if args.stand_in:
+            from robotbox.standin import StandInMusicServer, redirect_live_api
+
+            server = stack.enter_context(StandInMusicServer(speed=1.0))
+            stack.enter_context(redirect_live_api(server.url))
+            api_key = "stand-in"
+        else:
+            api_key = os.environ.get("GOOGLE_API_KEY")
+
+        # v1alpha since Lyria RealTime is only experimental.
+        client = get_client(api_key, api_version="v1alpha")
+        asyncio.run(main(client, args.prompts, config))
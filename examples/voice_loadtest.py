@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+## Setup
+
+This script measures how many concurrent voice sessions one process can sustain, so the
+`concurrency_limit` of `gradio_audio.py` and `fastrtc_ui.py` can be set from data.
+
+It creates N `GeminiHandler` instances directly (no browser, no WebRTC), feeds each one
+recorded student audio at real-time pace, and points them at a local stand-in Live API
+server running in a separate process. No API key is needed and nothing is sent to Google.
+
+Install the dependencies of the handler you want to test, for example:
+
+```
+pip install fastrtc google-genai websockets numpy
+```
+
+## Run
+
+To ramp the FastRTC handler from 1 to 16 sessions, 20 seconds per step:
+
+```
+python voice_loadtest.py --handler fastrtc --sessions 1 2 4 8 16 --seconds 20
+```
+
+Use `--audio` to feed a WAV recording of a student (16-bit PCM, any rate), otherwise a
+synthetic speech-like signal is used. Pin the process to one core (`taskset -c 0 python ...`)
+to get per-core numbers.
+
+For each step the script reports the CPU (% of one core) and memory used per session, the
+time from session start to first audio, the jitter of emitted audio against a real-time
+playout clock, and dropped frames: output that arrived later than the playout budget, or
+never arrived. The very first session also pays for process-wide setup (like the shared
+`genai.Client`), so its time to first audio is reported separately.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import resource
+import sys
+import threading
+import time
+import wave
+
+import numpy as np
+
+# Make the shared `robotbox` helpers importable when this script is run directly.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from robotbox.resample import StreamResampler
+from robotbox.standin import StandInLiveServer, redirect_live_api
+
+WEBRTC_SAMPLE_RATE = 48000
+FRAME_SECONDS = 0.02
+FRAME_SIZE = int(WEBRTC_SAMPLE_RATE * FRAME_SECONDS)
+# Audio still in flight when a step ends isn't counted as missing.
+DRAIN_SECONDS = 1.0
+
+
+def load_audio(path):
+    """Reads a 16-bit WAV file as mono int16 at the WebRTC sample rate."""
+    with wave.open(path, "rb") as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f"{path} must be 16-bit PCM")
+        channels = wav.getnchannels()
+        rate = wav.getframerate()
+        audio = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+    audio = audio.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    return StreamResampler(rate, WEBRTC_SAMPLE_RATE).process(audio)
+
+
+def synth_student_audio(seconds=10, seed=0):
+    """Speech-like bursts of filtered noise separated by pauses."""
+    rng = np.random.default_rng(seed)
+    n = seconds * WEBRTC_SAMPLE_RATE
+    noise = np.convolve(rng.standard_normal(n), np.ones(8) / 8, mode="same")
+    syllables = (np.sin(2 * np.pi * 4 * np.arange(n) / WEBRTC_SAMPLE_RATE) > 0).astype(float)
+    pauses = np.repeat(rng.random(seconds * 2) > 0.3, WEBRTC_SAMPLE_RATE // 2)[:n]
+    return (noise * syllables * pauses * 4000).astype(np.int16)
+
+
+def current_rss():
+    """Resident memory of this process in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # Peak rather than current, but the best that's portable.
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def _serve(port_queue):
+    server = StandInLiveServer()
+    server.start()
+    port_queue.put(server.port)
+    threading.Event().wait()
+
+
+class SessionStats:
+    """What one simulated student sent and heard."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.frames_sent = 0
+        self.late_inputs = 0
+        self.arrivals = []  # (perf_counter time, samples) per emitted chunk.
+
+    def first_audio(self):
+        """Seconds from session start to the first emitted audio, None if there was none."""
+        if not self.arrivals:
+            return None
+        return self.arrivals[0][0] - self.started
+
+    def playout(self, output_rate, budget):
+        """Returns (lateness in seconds per chunk, late chunk count) against a playout clock."""
+        if not self.arrivals:
+            return np.zeros(0), 0
+        times = np.array([t for t, _ in self.arrivals])
+        samples = np.array([n for _, n in self.arrivals])
+        offsets = (np.cumsum(samples) - samples) / output_rate
+        # Start the clock as late as possible without any chunk arriving early.
+        lateness = times - offsets
+        lateness -= lateness.min()
+        return lateness, int(np.sum(lateness > budget))
+
+
+def make_handler(kind, url):
+    if kind == "gradio":
+        import gradio_audio
+
+        handler = gradio_audio.GeminiHandler().copy()
+        handler.config.ws_url = url
+        return handler
+
+    import fastrtc_ui
+
+    handler = fastrtc_ui.GeminiHandler().copy()
+    handler.set_args(["stand-in-key", "Puck"])
+    return handler
+
+
+async def feed(handler, audio, stats, deadline, is_async):
+    """Sends 20 ms frames at real-time pace, like a browser would."""
+    loop = asyncio.get_running_loop()
+    n_frames = len(audio) // FRAME_SIZE
+    # Spread session starts over one frame so they don't all wake up together.
+    await asyncio.sleep(np.random.random() * FRAME_SECONDS)
+    next_time = loop.time()
+    while loop.time() < deadline:
+        i = stats.frames_sent % n_frames
+        frame = (WEBRTC_SAMPLE_RATE, audio[i * FRAME_SIZE:(i + 1) * FRAME_SIZE].reshape(1, -1))
+        if is_async:
+            await handler.receive(frame)
+        else:
+            handler.receive(frame)
+        stats.frames_sent += 1
+        next_time += FRAME_SECONDS
+        delay = next_time - loop.time()
+        if delay < -FRAME_SECONDS:
+            stats.late_inputs += 1
+        await asyncio.sleep(max(0.0, delay))
+
+
+async def drain_async(handler, stats, stop):
+    while not stop.is_set():
+        item = await handler.emit()
+        if item is not None:
+            stats.arrivals.append((time.perf_counter(), item[1].shape[-1]))
+
+
+def drain_sync(handler, stats, stop):
+    # gradio_webrtc calls a sync handler's emit() from its own thread, so do the same.
+    while not stop.is_set():
+        item = handler.emit()
+        if item is not None:
+            stats.arrivals.append((time.perf_counter(), item[1].shape[-1]))
+
+
+async def run_step(kind, n_sessions, audio, seconds, url):
+    handlers = [make_handler(kind, url) for _ in range(n_sessions)]
+    is_async = asyncio.iscoroutinefunction(handlers[0].emit)
+    stats = [SessionStats() for _ in handlers]
+    stop = threading.Event()
+    loop = asyncio.get_running_loop()
+
+    rss_before = current_rss()
+    cpu_before = time.process_time()
+    wall_before = time.perf_counter()
+
+    tasks, threads = [], []
+    deadline = loop.time() + seconds
+    for handler, stat in zip(handlers, stats):
+        if is_async:
+            tasks.append(asyncio.create_task(handler.start_up()))
+            tasks.append(asyncio.create_task(drain_async(handler, stat, stop)))
+        else:
+            thread = threading.Thread(target=drain_sync, args=(handler, stat, stop), daemon=True)
+            thread.start()
+            threads.append(thread)
+    await asyncio.gather(*(feed(h, audio, s, deadline, is_async) for h, s in zip(handlers, stats)))
+    rss_peak = current_rss()
+    await asyncio.sleep(DRAIN_SECONDS)
+
+    cpu = time.process_time() - cpu_before
+    wall = time.perf_counter() - wall_before
+    stop.set()
+    for handler in handlers:
+        handler.shutdown()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    for thread in threads:
+        thread.join()
+
+    return {
+        "cpu": cpu / wall / n_sessions * 100,
+        "rss": (rss_peak - rss_before) / n_sessions / 2**20,
+        "stats": stats,
+        "output_rate": handlers[0].output_sample_rate,
+    }
+
+
+def report(n_sessions, result, budget):
+    lateness, late, missing, sent, late_inputs = [], 0, 0, 0, 0
+    for stats in result["stats"]:
+        session_lateness, session_late = stats.playout(result["output_rate"], budget)
+        lateness.append(session_lateness)
+        late += session_late
+        heard = sum(n for _, n in stats.arrivals) / result["output_rate"]
+        expected = stats.frames_sent * FRAME_SECONDS
+        missing += max(0, round((expected - heard) / FRAME_SECONDS))
+        sent += stats.frames_sent
+        late_inputs += stats.late_inputs
+    lateness = np.concatenate(lateness) * 1000 if lateness else np.zeros(1)
+    first_audio = [t for t in (stats.first_audio() for stats in result["stats"]) if t is not None]
+    first_audio_ms = np.median(first_audio) * 1000 if first_audio else float("nan")
+    dropped = late + missing
+    drop_rate = dropped / max(sent, 1)
+    print(f"{n_sessions:>8} {result['cpu']:>9.1f} {result['rss']:>9.1f} {first_audio_ms:>9.1f} "
+          f"{np.percentile(lateness, 50):>8.1f} {np.percentile(lateness, 99):>8.1f} "
+          f"{dropped:>8} {drop_rate:>7.2%} {late_inputs:>9}")
+    return drop_rate
+
+
+async def main(args):
+    audio = load_audio(args.audio) if args.audio else synth_student_audio()
+
+    port_queue = multiprocessing.Queue()
+    server = multiprocessing.Process(target=_serve, args=(port_queue,), daemon=True)
+    server.start()
+    url = f"ws://127.0.0.1:{port_queue.get(timeout=30)}"
+
+    print(f"Handler: {args.handler}, {args.seconds}s per step, playout budget {args.budget * 1000:.0f} ms")
+    print(f"{'sessions':>8} {'cpu %':>9} {'rss MB':>9} {'1st ms':>9} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'dropped':>8} {'rate':>7} {'late in':>9}")
+    sustained = 0
+    first_audio = []
+    try:
+        with redirect_live_api(url):
+            for n_sessions in args.sessions:
+                result = await run_step(args.handler, n_sessions, audio, args.seconds, url)
+                drop_rate = report(n_sessions, result, args.budget)
+                first_audio += [stats.first_audio() for stats in result["stats"]]
+                if drop_rate <= args.max_drop_rate:
+                    sustained = n_sessions
+    finally:
+        server.terminate()
+    print(f"Largest tested N within {args.max_drop_rate:.0%} dropped frames: {sustained}")
+    later = [t for t in first_audio[1:] if t is not None]
+    if first_audio and first_audio[0] is not None and later:
+        print(f"Time to first audio: first session {first_audio[0] * 1000:.1f} ms, "
+              f"later sessions {np.median(later) * 1000:.1f} ms (median)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--handler", choices=["fastrtc", "gradio"], default="fastrtc")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--seconds", type=float, default=20, help="duration of each step")
+    parser.add_argument("--audio", help="WAV recording of student audio to feed")
+    parser.add_argument("--budget", type=float, default=0.1,
+                        help="playout buffer in seconds, later output counts as dropped")
+    parser.add_argument("--max-drop-rate", type=float, default=0.01)
+    asyncio.run(main(parser.parse_args()))
@@ -27,7 +27,9 @@ variable is set to the api-key you obtained from Google AI Studio.
 
 Important: **Use headphones**. This script uses the system default audio
 input and output, which often won't include echo cancellation. So to prevent
-the model from interrupting itself it is important that you use headphones. 
+the model from interrupting itself it is important that you use headphones,
+or pass `--echo-cancel` to remove the model's own voice from the microphone
+input before it is sent.
 
 ## Run
 
@@ -43,6 +45,30 @@ The default is "camera". To share your screen run:
 ```
 python Get_started_LiveAPI.py --mode screen
 ```
+
+In camera mode, `--close-up` sends each update as two images within a pixel budget
+(`--pixels`): the whole scene at low resolution and a sharp crop of the area that changed
+most, e.g. your hands on the breadboard. `--region x,y,w,h` (fractions of the frame) fixes
+the crop on one place instead.
+
+`--cameras 0,2` tiles several cameras, e.g. an overhead view and a close-up of the
+microcontroller, into one image per update. The camera with the most going on gets the
+largest tile.
+
+Both sides of the conversation are transcribed and saved under `transcripts/`, per
+`--student`. To find sessions later:
+
+```
+python -m robotbox.transcripts search transcripts "l298n driver" --student ada
+```
+
+With `--kit-index`, the tutor can look parts up in the kit documentation while it talks.
+Build the index first from a folder of Markdown or text files:
+
+```
+python -m robotbox.kit_docs build kit_docs/ kit_index
+python Get_started_LiveAPI.py --kit-index kit_index
+```
 """
 
 from dotenv import load_dotenv
@@ -62,6 +88,19 @@ import mss
 import argparse
 
 from google import genai
+from google.genai import types
+
+# Make the shared `robotbox` helpers importable when this script is run directly.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from robotbox.echo import EchoCanceller
+from robotbox.framing import MultiResolutionFramer
+from robotbox.kit_docs import DocIndex, GeminiEmbedder, KitDocsTool
+from robotbox.mosaic import Mosaic
+from robotbox.resample import StreamResampler
+from robotbox.session_memory import DEFAULT_TRIGGER_TOKENS, RollingSummary, live_config
+from robotbox.tools import ToolDispatcher
+from robotbox.transcripts import SessionTranscript, TranscriptStore
+from robotbox.voice_activity import MANUAL_ACTIVITY_CONFIG, SpeechGate
 
 if sys.version_info < (3, 11, 0):
     import taskgroup, exceptiongroup
@@ -84,15 +123,31 @@ client = genai.Client(http_options={"api_version": "v1beta"})
 # Replace the existing CONFIG with this Socratic version
 CONFIG = {
     "response_modalities": ["AUDIO"],
-    "system_instruction": "You are the RobotBox AI Tutor. Use Socratic methods to guide students. Never give direct answers; instead, ask questions about their wiring or code that lead them to the solution."
+    "system_instruction": "You are the RobotBox AI Tutor. Use Socratic methods to guide students. Never give direct answers; instead, ask questions about their wiring or code that lead them to the solution.",
+    "input_audio_transcription": {},
+    "output_audio_transcription": {},
 }
 
 pya = pyaudio.PyAudio()
 
 
 class AudioLoop:
-    def __init__(self, video_mode=DEFAULT_MODE):
+    def __init__(self, video_mode=DEFAULT_MODE, framer=None, transcript=None, tools=(),
+                 trigger_tokens=DEFAULT_TRIGGER_TOKENS, cameras=(0,), echo=None, gate=None):
         self.video_mode = video_mode
+        self.echo = echo
+        self.gate = gate
+        self.cameras = list(cameras)
+        self.mosaic = Mosaic(len(self.cameras)) if len(self.cameras) > 1 else None
+        self.framer = framer
+        self.transcript = transcript
+        self.memory = transcript.memory if transcript is not None else None
+        self.tools = list(tools)
+        self.trigger_tokens = trigger_tokens
+        self.dispatcher = None
+        self.resumption_handle = None
+        # Cleared while the session is being replaced, so nothing is sent to a closed one.
+        self.connected = asyncio.Event()
 
         self.audio_in_queue = None
         self.out_queue = None
@@ -111,14 +166,27 @@ class AudioLoop:
             )
             if text.lower() == "q":
                 break
+            await self.connected.wait()
             await self.session.send(input=text or ".", end_of_turn=True)
 
-    def _get_frame(self, cap):
-        # Read the frameq
-        ret, frame = cap.read()
-        # Check if the frame was read successfully
-        if not ret:
+    def _get_frame(self, caps):
+        # Read a frame from every camera
+        frames = [frame if ret else None for ret, frame in (cap.read() for cap in caps)]
+        # Check that at least one frame was read successfully
+        if all(frame is None for frame in frames):
             return None
+        if self.mosaic is not None:
+            # Every camera in one image, the busiest one largest.
+            frame = self.mosaic.compose(frames)
+        else:
+            frame = frames[0]
+        if self.framer is not None:
+            # A low-resolution view of the scene plus a sharp close-up of the work area.
+            self.framer.track(frame)
+            return [
+                {"mime_type": "image/jpeg", "data": base64.b64encode(jpeg).decode()}
+                for jpeg in self.framer.encode(frame)
+            ]
         # Fix: Convert BGR to RGB color space
         # OpenCV captures in BGR but PIL expects RGB format
         # This prevents the blue tint in the video feed
@@ -132,26 +200,28 @@ class AudioLoop:
 
         mime_type = "image/jpeg"
         image_bytes = image_io.read()
-        return {"mime_type": mime_type, "data": base64.b64encode(image_bytes).decode()}
+        return [{"mime_type": mime_type, "data": base64.b64encode(image_bytes).decode()}]
 
     async def get_frames(self):
         # This takes about a second, and will block the whole program
         # causing the audio pipeline to overflow if you don't to_thread it.
-        cap = await asyncio.to_thread(
-            cv2.VideoCapture, 0
-        )  # 0 represents the default camera
+        caps = [
+            await asyncio.to_thread(cv2.VideoCapture, camera) for camera in self.cameras
+        ]  # 0 represents the default camera
 
         while True:
-            frame = await asyncio.to_thread(self._get_frame, cap)
-            if frame is None:
+            images = await asyncio.to_thread(self._get_frame, caps)
+            if images is None:
                 break
 
             await asyncio.sleep(1.0)
 
-            await self.out_queue.put(frame)
+            for image in images:
+                await self.out_queue.put(image)
 
-        # Release the VideoCapture object
-        cap.release()
+        # Release the VideoCapture objects
+        for cap in caps:
+            cap.release()
 
     def _get_screen(self):
         sct = mss.mss()
@@ -182,34 +252,83 @@ class AudioLoop:
             await self.out_queue.put(frame)
 
     async def send_realtime(self):
+        speaking = None  # The session an activity was started on, until it ends.
         while True:
             msg = await self.out_queue.get()
-            await self.session.send(input=msg)
+            await self.connected.wait()
+            if "activity_start" in msg:
+                speaking = self.session
+            elif "activity_end" in msg:
+                started, speaking = speaking, None
+                if started is not self.session:
+                    continue  # That session was replaced; the new one never saw the start.
+            elif speaking is not None and speaking is not self.session:
+                # The connection was replaced mid-utterance: open the activity again.
+                await self.session.send_realtime_input(activity_start=types.ActivityStart())
+                speaking = self.session
+            if "data" in msg:
+                await self.session.send(input=msg)
+            else:
+                await self.session.send_realtime_input(**msg)
 
     async def listen_audio(self):
         mic_info = pya.get_default_input_device_info()
+        # Capture at the device's native rate and convert to what the Live API expects.
+        mic_rate = int(mic_info["defaultSampleRate"])
+        resampler = StreamResampler(mic_rate, SEND_SAMPLE_RATE)
+        chunk_size = CHUNK_SIZE * mic_rate // SEND_SAMPLE_RATE
         self.audio_stream = await asyncio.to_thread(
             pya.open,
             format=FORMAT,
             channels=CHANNELS,
-            rate=SEND_SAMPLE_RATE,
+            rate=mic_rate,
             input=True,
             input_device_index=mic_info["index"],
-            frames_per_buffer=CHUNK_SIZE,
+            frames_per_buffer=chunk_size,
         )
         if __debug__:
             kwargs = {"exception_on_overflow": False}
         else:
             kwargs = {}
         while True:
-            data = await asyncio.to_thread(self.audio_stream.read, CHUNK_SIZE, **kwargs)
-            await self.out_queue.put({"data": data, "mime_type": "audio/pcm"})
+            data = await asyncio.to_thread(self.audio_stream.read, chunk_size, **kwargs)
+            data = resampler.process_bytes(data)
+            if self.echo is not None:
+                # Takes out what the speakers played, so the model doesn't hear itself.
+                data = self.echo.process_bytes(data)
+            if self.gate is None:
+                await self.out_queue.put({"data": data, "mime_type": "audio/pcm"})
+                continue
+            # Only speech goes upstream, between an activity start and end.
+            for kind, audio in self.gate.process_bytes(data):
+                if kind == "start":
+                    await self.out_queue.put({"activity_start": types.ActivityStart()})
+                elif kind == "end":
+                    await self.out_queue.put({"activity_end": types.ActivityEnd()})
+                else:
+                    await self.out_queue.put({"data": audio, "mime_type": "audio/pcm"})
 
     async def receive_audio(self):
-        "Background task to reads from the websocket and write pcm chunks to the output queue"
+        """Reads from the websocket and writes pcm chunks to the output queue, until the
+        server says it is about to close the connection."""
         while True:
             turn = self.session.receive()
             async for response in turn:
+                if update := response.session_resumption_update:
+                    if update.resumable and update.new_handle:
+                        self.resumption_handle = update.new_handle
+                if response.go_away:
+                    return
+                if self.transcript is not None:
+                    # Only queues the text; the store writes it on its own thread.
+                    self.transcript.add(response.server_content)
+                if response.tool_call:
+                    # Runs in the background; the response is sent when the tool finishes.
+                    self.dispatcher.dispatch(response.tool_call)
+                    continue
+                if response.tool_call_cancellation:
+                    self.dispatcher.cancel(response.tool_call_cancellation)
+                    continue
                 if data := response.data:
                     self.audio_in_queue.put_nowait(data)
                     continue
@@ -223,25 +342,64 @@ class AudioLoop:
             while not self.audio_in_queue.empty():
                 self.audio_in_queue.get_nowait()
 
+    async def connection(self):
+        """Keeps a session open, resuming it each time the server closes the connection."""
+        config = dict(CONFIG)
+        if self.tools:
+            config["tools"] = [tool.declaration for tool in self.tools]
+        if self.gate is not None:
+            # The gate marks where speech starts and ends instead of the server.
+            config["realtime_input_config"] = MANUAL_ACTIVITY_CONFIG
+        while True:
+            session_config = live_config(
+                config, self.trigger_tokens, self.trigger_tokens // 2, self.resumption_handle)
+            fresh, entered = self.resumption_handle is None, False
+            try:
+                async with client.aio.live.connect(model=MODEL, config=session_config) as session:
+                    entered = True
+                    self.session = session
+                    self.dispatcher.session = session
+                    if self.memory is not None and fresh:
+                        # A resumed session still has its context; a new one gets the summary
+                        # of what compression dropped, or of an earlier session.
+                        await self.memory.inject(session)
+                    self.connected.set()
+                    try:
+                        await self.receive_audio()
+                    finally:
+                        self.connected.clear()
+            except Exception:
+                if fresh or entered:
+                    raise
+                # The server refused the resumption handle (e.g. it expired): start a new
+                # session, which gets the summary instead.
+                self.resumption_handle = None
+                print("\nCould not resume, starting a new session...")
+                continue
+            print("\nReconnecting...")
+
     async def play_audio(self):
+        speaker_rate = int(pya.get_default_output_device_info()["defaultSampleRate"])
+        resampler = StreamResampler(RECEIVE_SAMPLE_RATE, speaker_rate)
+        # The echo canceller's reference, at the microphone's rate once resampled.
+        reference = StreamResampler(RECEIVE_SAMPLE_RATE, SEND_SAMPLE_RATE)
         stream = await asyncio.to_thread(
             pya.open,
             format=FORMAT,
             channels=CHANNELS,
-            rate=RECEIVE_SAMPLE_RATE,
+            rate=speaker_rate,
             output=True,
         )
         while True:
             bytestream = await self.audio_in_queue.get()
-            await asyncio.to_thread(stream.write, bytestream)
+            if self.echo is not None:
+                self.echo.push_reference_bytes(reference.process_bytes(bytestream))
+            await asyncio.to_thread(stream.write, resampler.process_bytes(bytestream))
 
     async def run(self):
         try:
-            async with (
-                client.aio.live.connect(model=MODEL, config=CONFIG) as session,
-                asyncio.TaskGroup() as tg,
-            ):
-                self.session = session
+            async with asyncio.TaskGroup() as tg:
+                self.dispatcher = ToolDispatcher(None, self.tools)
 
                 self.audio_in_queue = asyncio.Queue()
                 self.out_queue = asyncio.Queue(maxsize=5)
@@ -254,7 +412,7 @@ class AudioLoop:
                 elif self.video_mode == "screen":
                     tg.create_task(self.get_screen())
 
-                tg.create_task(self.receive_audio())
+                tg.create_task(self.connection())
                 tg.create_task(self.play_audio())
 
                 await send_text_task
@@ -265,6 +423,15 @@ class AudioLoop:
         except ExceptionGroup as EG:
             self.audio_stream.close()
             traceback.print_exception(EG)
+        finally:
+            if self.dispatcher is not None:
+                await self.dispatcher.aclose()
+                if self.tools:
+                    print("Tool calls:", self.dispatcher.stats())
+            if self.gate is not None:
+                print("Microphone:", self.gate.stats())
+            if self.memory is not None:
+                await self.memory.aclose()
 
 
 if __name__ == "__main__":
@@ -276,6 +443,78 @@ if __name__ == "__main__":
         help="pixels to stream from",
         choices=["camera", "screen", "none"],
     )
+    parser.add_argument(
+        "--cameras",
+        type=lambda value: [int(v) for v in value.split(",")],
+        default=[0],
+        help="comma-separated camera indexes, tiled into one image if more than one",
+    )
+    parser.add_argument(
+        "--close-up",
+        action="store_true",
+        help="send a low-resolution scene plus a sharp crop of the work area",
+    )
+    parser.add_argument(
+        "--pixels",
+        type=int,
+        default=640 * 480,
+        help="pixels per camera update with --close-up, across both images",
+    )
+    parser.add_argument(
+        "--region",
+        type=lambda value: tuple(float(v) for v in value.split(",")),
+        default=None,
+        help="fixed x,y,w,h crop as fractions of the frame, instead of following motion",
+    )
+    parser.add_argument(
+        "--kit-index",
+        default=None,
+        help="kit documentation index from `python -m robotbox.kit_docs build`",
+    )
+    parser.add_argument(
+        "--student",
+        default="student",
+        help="whose transcript the session is saved to",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue the student's last session, starting from a summary of it",
+    )
+    parser.add_argument(
+        "--compress-at",
+        type=int,
+        default=DEFAULT_TRIGGER_TOKENS,
+        help="context tokens at which the oldest turns are dropped (0 to never)",
+    )
+    parser.add_argument(
+        "--echo-cancel",
+        action="store_true",
+        help="cancel the model's voice picked up by the microphone, to use speakers",
+    )
+    parser.add_argument(
+        "--local-vad",
+        action="store_true",
+        help="send the microphone only while the student speaks, detected locally",
+    )
     args = parser.parse_args()
-    main = AudioLoop(video_mode=args.mode)
-    asyncio.run(main.run())
+    framer = MultiResolutionFramer(args.pixels, region=args.region) if args.close_up else None
+    store = TranscriptStore("transcripts")
+    memory = RollingSummary(client)
+    session_name = None
+    if args.resume and (earlier := store.sessions(args.student)):
+        session_name = earlier[-1][0]
+        memory.seed(store.utterances(args.student, session_name))
+    transcript = SessionTranscript(store, args.student, session_name, memory=memory)
+    tools = []
+    if args.kit_index:
+        tools.append(KitDocsTool(DocIndex(args.kit_index, GeminiEmbedder(client))))
+    main = AudioLoop(video_mode=args.mode, framer=framer, transcript=transcript, tools=tools,
+                     trigger_tokens=args.compress_at, cameras=args.cameras,
+                     echo=EchoCanceller() if args.echo_cancel else None,
+                     gate=SpeechGate() if args.local_vad else None)
+    try:
+        asyncio.run(main.run())
+    finally:
+        transcript.close()
+        store.close()
@@ -48,6 +48,7 @@ Start talking to Gemini
 """
 
 import asyncio
+import os
 import sys
 import traceback
 
@@ -55,6 +56,10 @@ import pyaudio
 
 from google import genai
 
+# Make the shared `robotbox` helpers importable when this script is run directly.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from robotbox.resample import StreamResampler
+
 if sys.version_info < (3, 11, 0):
     import taskgroup, exceptiongroup
 
@@ -100,21 +105,26 @@ class AudioLoop:
 
     async def listen_audio(self):
         mic_info = pya.get_default_input_device_info()
+        # Capture at the device's native rate and convert to what the Live API expects.
+        mic_rate = int(mic_info["defaultSampleRate"])
+        resampler = StreamResampler(mic_rate, SEND_SAMPLE_RATE)
+        chunk_size = CHUNK_SIZE * mic_rate // SEND_SAMPLE_RATE
         self.audio_stream = await asyncio.to_thread(
             pya.open,
             format=FORMAT,
             channels=CHANNELS,
-            rate=SEND_SAMPLE_RATE,
+            rate=mic_rate,
             input=True,
             input_device_index=mic_info["index"],
-            frames_per_buffer=CHUNK_SIZE,
+            frames_per_buffer=chunk_size,
         )
         if __debug__:
             kwargs = {"exception_on_overflow": False}
         else:
             kwargs = {}
         while True:
-            data = await asyncio.to_thread(self.audio_stream.read, CHUNK_SIZE, **kwargs)
+            data = await asyncio.to_thread(self.audio_stream.read, chunk_size, **kwargs)
+            data = resampler.process_bytes(data)
             await self.out_queue.put({"data": data, "mime_type": "audio/pcm"})
 
     async def send_realtime(self):
@@ -141,16 +151,18 @@ class AudioLoop:
                 self.audio_in_queue.get_nowait()
 
     async def play_audio(self):
+        speaker_rate = int(pya.get_default_output_device_info()["defaultSampleRate"])
+        resampler = StreamResampler(RECEIVE_SAMPLE_RATE, speaker_rate)
         stream = await asyncio.to_thread(
             pya.open,
             format=FORMAT,
             channels=CHANNELS,
-            rate=RECEIVE_SAMPLE_RATE,
+            rate=speaker_rate,
             output=True,
         )
         while True:
             bytestream = await self.audio_in_queue.get()
-            await asyncio.to_thread(stream.write, bytestream)
+            await asyncio.to_thread(stream.write, resampler.process_bytes(bytestream))
 
     async def run(self):
         try:
@@ -35,61 +35,82 @@ python LyriaRealTime_EAP.py
 
 The script takes a prompt from the command line and streams the audio back over
 websockets.
+
+## Render to a file
+
+To render a scripted piece to a WAV (or, with `pip install soundfile`, FLAC) file as fast
+as it's generated, without an audio device:
+
+```
+python Get_started_LyriaRealTime.py --render script.json --output bed.wav
+```
+
+See `robotbox/music_render.py` for the script format. Add `--stand-in` to render against a
+local stand-in music server instead of Lyria, for example to try a script without a key.
 """
+import argparse
 import asyncio
-import pyaudio
+import contextlib
 import os
+import sys
 from google import genai
 from google.genai import types
 
-# Longer buffer reduces chance of audio drop, but also delays audio and user commands.
-BUFFER_SECONDS=1
+# Make the shared `robotbox` helpers importable when this script is run directly.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from robotbox.music_control import MusicControlScheduler
+from robotbox.music_render import render
+from robotbox.playback import JitterBuffer
+
+# Bounds for the playback buffer. Within them the buffer follows the observed network
+# jitter: a longer buffer reduces the chance of audio drops, but delays user commands.
+MIN_BUFFER_SECONDS=0.1
+MAX_BUFFER_SECONDS=2
+# Prompt changes fade over this many seconds instead of cutting abruptly.
+RAMP_SECONDS=2
 CHUNK=4200
-FORMAT=pyaudio.paInt16
 CHANNELS=2
 MODEL='models/lyria-realtime-exp'
 OUTPUT_RATE=48000
 
-api_key = os.environ.get("GOOGLE_API_KEY")
-
-if api_key is None:
-    print("Please enter your API key")
-    api_key = input("API Key: ").strip()
-
-client = genai.Client(
-    api_key=api_key,
-    http_options={'api_version': 'v1alpha',}, # v1alpha since Lyria RealTime is only experimental
-)
-
 async def main():
+    import pyaudio
+
+    FORMAT=pyaudio.paInt16
     p = pyaudio.PyAudio()
     config = types.LiveMusicGenerationConfig()
+    player = JitterBuffer(
+        OUTPUT_RATE, CHANNELS, min_delay=MIN_BUFFER_SECONDS, max_delay=MAX_BUFFER_SECONDS)
+
+    def play(in_data, frame_count, time_info, status):
+        # Runs on PortAudio's thread, so the event loop never waits on the device.
+        return player.read(frame_count), pyaudio.paContinue
+
+    output_stream = p.open(
+        format=FORMAT, channels=CHANNELS, rate=OUTPUT_RATE, output=True, frames_per_buffer=CHUNK,
+        stream_callback=play)
+
     async with client.aio.live.music.connect(model=MODEL) as session:
+        # Merges back-to-back config changes and turns prompt changes into smooth ramps.
+        control = MusicControlScheduler(session, config)
+
         async def receive():
-            chunks_count = 0
-            output_stream = p.open(
-                format=FORMAT, channels=CHANNELS, rate=OUTPUT_RATE, output=True, frames_per_buffer=CHUNK)
             async for message in session.receive():
-                chunks_count += 1
-                if chunks_count == 1:
-                    # Introduce a delay before starting playback to have a buffer for network jitter.
-                    await asyncio.sleep(BUFFER_SECONDS)
                 # print("Received chunk: ", message)
                 if message.server_content:
                 # print("Received chunk with metadata: ", message.server_content.audio_chunks[0].source_metadata)
-                    audio_data = message.server_content.audio_chunks[0].data
-                    output_stream.write(audio_data)
+                    for chunk in message.server_content.audio_chunks:
+                        player.push(chunk.data)
                 elif message.filtered_prompt:
                     print("Prompt was filtered out: ", message.filtered_prompt)
                 else:
                     print("Unknown error occured with message: ", message)
-                await asyncio.sleep(10**-12)
 
         async def send():
             await asyncio.sleep(5) # Allow initial prompt to play a bit
 
             while True:
-                print("Set new prompt ((bpm=<number|'AUTO'>, scale=<enum|'AUTO'>, top_k=<number|'AUTO'>, 'play', 'pause', 'prompt1:w1,prompt2:w2,...', or single text prompt)")
+                print("Set new prompt ((bpm=<number|'AUTO'>, scale=<enum|'AUTO'>, top_k=<number|'AUTO'>, 'play', 'pause', 'stats', 'prompt1:w1,prompt2:w2,...', or single text prompt)")
                 prompt_str = await asyncio.to_thread(
                     input,
                     " > "
@@ -100,56 +121,62 @@ async def main():
 
                 if prompt_str.lower() == 'q':
                     print("Sending STOP command.")
-                    await session.stop();
+                    await control.stop()
                     return False
 
                 if prompt_str.lower() == 'play':
                     print("Sending PLAY command.")
-                    await session.play()
+                    await control.play()
                     continue
 
                 if prompt_str.lower() == 'pause':
                     print("Sending PAUSE command.")
-                    await session.pause()
+                    await control.pause()
                     continue
 
+                if prompt_str.lower() == 'stats':
+                    print(f"Playback: {player.stats()}")
+                    print(f"Control messages: {control.stats}")
+                    continue
+
+                # Config changes are merged if they come quickly one after the other, and
+                # bpm or scale changes share a single context reset.
                 if prompt_str.startswith('bpm='):
                   if prompt_str.strip().endswith('AUTO'):
-                    del config.bpm
                     print(f"Setting BPM to AUTO, which requires resetting context.")
+                    control.update_config(bpm=None)
                   else:
                     bpm_value = int(prompt_str.removeprefix('bpm='))
                     print(f"Setting BPM to {bpm_value}, which requires resetting context.")
-                    config.bpm=bpm_value
-                  await session.set_music_generation_config(config=config)
-                  await session.reset_context()
+                    control.update_config(bpm=bpm_value)
                   continue
 
                 if prompt_str.startswith('scale='):
                   if prompt_str.strip().endswith('AUTO'):
-                    del config.scale
                     print(f"Setting Scale to AUTO, which requires resetting context.")
+                    control.update_config(scale=None)
                   else:
+                    scale_name = prompt_str.removeprefix('scale=').strip()
                     found_scale_enum_member = None
                     for scale_member in types.Scale: # types.Scale is an enum
-                        if scale_member.name.lower() == prompt_str.lower():
+                        if scale_member.name.lower() == scale_name.lower():
                             found_scale_enum_member = scale_member
                             break
                     if found_scale_enum_member:
                         print(f"Setting scale to {found_scale_enum_member.name}, which requires resetting context.")
-                        config.scale = found_scale_enum_member
+                        control.update_config(scale=found_scale_enum_member)
                     else:
                         print("Error: Matching enum not found.")
-                  await session.set_music_generation_config(config=config)
-                  await session.reset_context()
                   continue
 
                 if prompt_str.startswith('top_k='):
-                    top_k_value = int(prompt_str.removeprefix('top_k='))
-                    print(f"Setting TopK to {top_k_value}.")
-                    config.top_k = top_k_value
-                    await session.set_music_generation_config(config=config)
-                    await session.reset_context()
+                    if prompt_str.strip().endswith('AUTO'):
+                        print(f"Setting TopK to AUTO.")
+                        control.update_config(top_k=None)
+                    else:
+                        top_k_value = int(prompt_str.removeprefix('top_k='))
+                        print(f"Setting TopK to {top_k_value}.")
+                        control.update_config(top_k=top_k_value)
                     continue
 
                 # Check for multiple weighted prompts "prompt1:number1, prompt2:number2, ..."
@@ -193,7 +220,7 @@ async def main():
                             print(f"Partially sending {len(parsed_prompts)} valid weighted prompt(s) due to errors in other segments: {', '.join(prompt_repr)}")
                         else:
                             print(f"Sending multiple weighted prompts: {', '.join(prompt_repr)}")
-                        await session.set_weighted_prompts(prompts=parsed_prompts)
+                        control.ramp_to(parsed_prompts, RAMP_SECONDS)
                     else: # No valid prompts were parsed from the input string that contained ":"
                         print("Error: Input contained ':' suggesting multi-prompt format, but no valid 'text:weight' segments were successfully parsed. No action taken.")
 
@@ -201,14 +228,10 @@ async def main():
 
                 # If none of the above, treat as a regular single text prompt
                 print(f"Sending single text prompt: \"{prompt_str}\"")
-                await session.set_weighted_prompts(
-                    prompts=[types.WeightedPrompt(text=prompt_str, weight=1.0)]
-                )
+                control.ramp_to([types.WeightedPrompt(text=prompt_str, weight=1.0)], RAMP_SECONDS)
 
         print("Starting with some piano")
-        await session.set_weighted_prompts(
-            prompts=[types.WeightedPrompt(text="Piano", weight=1.0)]
-        )
+        await control.set_prompts([types.WeightedPrompt(text="Piano", weight=1.0)])
 
         # Set initial BPM and Scale
         config.bpm = 120
@@ -226,6 +249,47 @@ async def main():
         await asyncio.gather(send_task, receive_task)
 
     # Clean up PyAudio
+    print(f"Playback: {player.stats()}")
+    print(f"Control messages: {control.stats}")
+    output_stream.close()
     p.terminate()
 
-asyncio.run(main())
+async def render_to_file(script, output):
+    async with client.aio.live.music.connect(model=MODEL) as session:
+        stats = await render(session, script, output)
+    print(f"Wrote {stats['audio_seconds']} s of audio to {output} in {stats['wall_seconds']} s "
+          f"({stats['audio_seconds_per_second']} s of audio per second)")
+    print(f"Control messages: {stats['control']}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--render", metavar="SCRIPT",
+                        help="Render a JSON script to a file instead of playing")
+    parser.add_argument("--output", default="lyria_render.wav",
+                        help="WAV or FLAC file for --render")
+    parser.add_argument("--stand-in", action="store_true", help="Use a local stand-in music server")
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as stack:
+        if args.stand_in:
+            from robotbox.standin import StandInMusicServer, redirect_live_api
+
+            server = stack.enter_context(StandInMusicServer())
+            stack.enter_context(redirect_live_api(server.url))
+            api_key = "stand-in"
+        else:
+            api_key = os.environ.get("GOOGLE_API_KEY")
+
+        if api_key is None:
+            print("Please enter your API key")
+            api_key = input("API Key: ").strip()
+
+        client = genai.Client(
+            api_key=api_key,
+            http_options={'api_version': 'v1alpha',}, # v1alpha since Lyria RealTime is only experimental
+        )
+
+        if args.render:
+            asyncio.run(render_to_file(args.render, args.output))
+        else:
+            asyncio.run(main())
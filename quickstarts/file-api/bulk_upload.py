@@ -0,0 +1,60 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Uploads many files at once, skipping files whose content was already uploaded and hasn't
+# expired yet. Usage: python3 bulk_upload.py photos/*.jpg videos/*.mp4
+
+import argparse
+import os
+import sys
+
+from google import genai
+from dotenv import load_dotenv
+
+# Make the shared `robotbox` helpers importable when this script is run directly.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from robotbox.uploads import UploadIndex, bulk_upload
+
+parser = argparse.ArgumentParser()
+parser.add_argument("paths", nargs="+", help="Files to upload")
+parser.add_argument("--index", default="uploads.sqlite", help="Local index of uploaded files")
+parser.add_argument("--workers", type=int, default=8, help="Concurrent uploads")
+parser.add_argument("--verify", action="store_true",
+                    help="Check that indexed files still exist before reusing them")
+args = parser.parse_args()
+
+# Load environment variables from .env file
+load_dotenv()
+api_key = os.environ["GOOGLE_API_KEY"]
+
+# Initialize Google API Client
+client = genai.Client(api_key=api_key)
+
+def report(path, file, cached):
+    print(f"{'Reused' if cached else 'Uploaded'} {path} as: {file.uri}")
+
+index = UploadIndex(args.index)
+print(f"Pruned {index.prune()} expired entries from {args.index}")
+files, failed, stats = bulk_upload(
+    client, args.paths, index, max_workers=args.workers, verify=args.verify, progress=report)
+index.close()
+
+for path, error in failed.items():
+    print(f"Failed to upload {path}: {error}")
+
+print(f"{stats['files']} files in {stats['seconds']} s: {stats['files_per_second']} files/s, "
+      f"{stats['bytes_per_second'] / 1e6:.1f} MB/s "
+      f"({stats['uploaded_bytes_per_second'] / 1e6:.1f} MB/s actually uploaded)")
+print(f"Cache hit rate {stats['hit_rate']:.0%}, {stats['uploads']} uploads, "
+      f"{stats['failed']} failed")
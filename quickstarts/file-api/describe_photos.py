@@ -0,0 +1,62 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Describes many images like sample.py does for one, packing several images into each
+# request up to a token budget. Usage: python3 describe_photos.py photos/*.jpg
+
+import argparse
+import os
+import sys
+
+from google import genai
+from dotenv import load_dotenv
+
+# Make the shared `robotbox` helpers importable when this script is run directly.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from robotbox.packing import PackedGenerator
+from robotbox.uploads import UploadIndex, bulk_upload
+
+parser = argparse.ArgumentParser()
+parser.add_argument("paths", nargs="+", help="Images to describe")
+parser.add_argument("--prompt", default="Describe the image with a creative description")
+parser.add_argument("--budget", type=int, default=8000, help="Prompt tokens per request")
+parser.add_argument("--max-items", type=int, default=10, help="Images per request")
+args = parser.parse_args()
+
+# Load environment variables from .env file
+load_dotenv()
+api_key = os.environ["GOOGLE_API_KEY"]
+
+# Initialize Google API Client
+client = genai.Client(api_key=api_key)
+
+# Upload the images, reusing earlier uploads of the same content
+index = UploadIndex("uploads.sqlite")
+files, failed, _ = bulk_upload(client, args.paths, index)
+index.close()
+for path, error in failed.items():
+    print(f"Failed to upload {path}: {error}")
+
+# Generate the descriptions, several images per call
+model_name = "gemini-2.5-flash"
+generator = PackedGenerator(
+    client, model_name, args.prompt, budget=args.budget, max_items=args.max_items)
+descriptions = generator.run([(path, [file]) for path, file in files.items()])
+for path, description in descriptions.items():
+    print(f"{path}: {description}\n")
+
+report = generator.report()
+print(f"{report['items']} images in {report['calls']} calls ({report['calls_saved']} saved), "
+      f"{report['tokens_per_call']} prompt tokens per call, "
+      f"{report['count_tokens_calls']} count_tokens calls")
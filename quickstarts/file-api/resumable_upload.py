@@ -0,0 +1,63 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Uploads a large file in chunks. If the upload is interrupted, running the same command
+# again continues where it stopped. Usage: python3 resumable_upload.py lab_recording.mp4
+
+import argparse
+import contextlib
+import os
+import sys
+
+from dotenv import load_dotenv
+
+# Make the shared `robotbox` helpers importable when this script is run directly.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from robotbox.uploads import UPLOAD_URL, resumable_upload
+
+parser = argparse.ArgumentParser()
+parser.add_argument("path", help="File to upload")
+parser.add_argument("--display-name", default=None)
+parser.add_argument("--chunk-mb", type=int, default=8, help="Chunk size, in MiB")
+parser.add_argument("--state-dir", default=".uploads", help="Where upload sessions are kept")
+parser.add_argument("--stand-in", action="store_true",
+                    help="Upload to a local stand-in server instead of the File API")
+args = parser.parse_args()
+
+def report(sent, total, bytes_per_second):
+    print(f"\r{sent / total:6.1%} of {total / 1e6:.0f} MB, {bytes_per_second / 1e6:.1f} MB/s",
+          end="", flush=True)
+
+with contextlib.ExitStack() as stack:
+    if args.stand_in:
+        from robotbox.standin import StandInUploadServer
+
+        upload_url = stack.enter_context(StandInUploadServer()).upload_url
+        api_key = "stand-in"
+    else:
+        # Load environment variables from .env file
+        load_dotenv()
+        api_key = os.environ["GOOGLE_API_KEY"]
+        upload_url = UPLOAD_URL
+
+    file = resumable_upload(
+        args.path,
+        api_key=api_key,
+        display_name=args.display_name,
+        state_dir=args.state_dir,
+        chunk_size=args.chunk_mb << 20,
+        progress=report,
+        upload_url=upload_url,
+    )
+    print(f"\nUploaded file {file.display_name} as: {file.uri}")
@@ -14,8 +14,13 @@
 
 from google import genai
 import os
+import sys
 from dotenv import load_dotenv
 
+# Make the shared `robotbox` helpers importable when this script is run directly.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from robotbox.response_cache import CachedModels, ResponseCache
+
 # Load environment variables from .env file
 load_dotenv()
 api_key = os.environ["GOOGLE_API_KEY"]
@@ -39,10 +44,13 @@ print(f"Uploaded file {file_response.display_name} as: {file_response.uri}")
 get_file =client.files.get(name=file_response.name)
 print(f"Retrieved file {get_file.display_name} as: {get_file.uri}")
 
-# Generate content using the client.models API
+# Generate content using the client.models API. Responses are cached on disk, keyed by the
+# file's content hash, so running the sample again with the same image is instant.
+cache = ResponseCache("responses.sqlite")
+models = CachedModels(client, cache)
 prompt = "Describe the image with a creative description"
 model_name = "gemini-2.5-flash"
-response = client.models.generate_content(
+response = models.generate_content(
     model=model_name,
     contents=[
       prompt,
@@ -50,6 +58,8 @@ response = client.models.generate_content(
     ]
 )
 print(response.text)
+print(f"Response cache: {cache.stats}, hit rate {cache.hit_rate():.0%}")
+cache.close()
 
 # Delete the sample file
 client.files.delete(name=file_response.name)
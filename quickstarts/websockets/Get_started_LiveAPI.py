@@ -61,6 +61,10 @@ import argparse
 
 from websockets.asyncio.client import connect
 
+# Make the shared `robotbox` helpers importable when this script is run directly.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from robotbox.resample import StreamResampler
+
 if sys.version_info < (3, 11, 0):
     import taskgroup, exceptiongroup
 
@@ -188,16 +192,21 @@ class AudioLoop:
         pya = pyaudio.PyAudio()
 
         mic_info = pya.get_default_input_device_info()
+        # Capture at the device's native rate and convert to what the Live API expects.
+        mic_rate = int(mic_info["defaultSampleRate"])
+        resampler = StreamResampler(mic_rate, SEND_SAMPLE_RATE)
+        chunk_size = CHUNK_SIZE * mic_rate // SEND_SAMPLE_RATE
         self.audio_stream = pya.open(
             format=FORMAT,
             channels=CHANNELS,
-            rate=SEND_SAMPLE_RATE,
+            rate=mic_rate,
             input=True,
             input_device_index=mic_info["index"],
-            frames_per_buffer=CHUNK_SIZE,
+            frames_per_buffer=chunk_size,
         )
         while True:
-            data = await asyncio.to_thread(self.audio_stream.read, CHUNK_SIZE)
+            data = await asyncio.to_thread(self.audio_stream.read, chunk_size)
+            data = resampler.process_bytes(data)
             msg = {
                 "realtime_input": {
                     "media_chunks": [
@@ -241,12 +250,14 @@ class AudioLoop:
 
     async def play_audio(self):
         pya = pyaudio.PyAudio()
+        speaker_rate = int(pya.get_default_output_device_info()["defaultSampleRate"])
+        resampler = StreamResampler(RECEIVE_SAMPLE_RATE, speaker_rate)
         stream = pya.open(
-            format=FORMAT, channels=CHANNELS, rate=RECEIVE_SAMPLE_RATE, output=True
+            format=FORMAT, channels=CHANNELS, rate=speaker_rate, output=True
         )
         while True:
             bytestream = await self.audio_in_queue.get()
-            await asyncio.to_thread(stream.write, bytestream)
+            await asyncio.to_thread(stream.write, resampler.process_bytes(bytestream))
 
     async def run(self):
         """Takes audio chunks off the input queue, and writes them to files.
@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Runs a JSONL file of requests through `generate_content`, resumably.
+
+Each input line is either a Batch API request, `{"key": ..., "request": {"contents": ...}}`
+(see `quickstarts/Batch_mode.ipynb`), or any other JSON object, whose string fields are
+joined into a text prompt (with `key`, `request_id` or `id` used as its key). Results are
+appended to an output JSONL in the Batch API's output format as they finish.
+
+The input is streamed, so memory use doesn't depend on its length. A checkpoint file next
+to the output records which lines are done and how far the output is valid; after a crash,
+running the same command again truncates the output to that point and carries on. An
+existing output without a checkpoint is left alone unless `--overwrite` is given.
+
+```
+python -m robotbox.batch_runner requests.jsonl results.jsonl --concurrency 8 --rpm 300
+```
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import httpx
+from google.genai import errors, types
+
+from robotbox.clients import aclose_clients, get_client
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+KEY_FIELDS = ("key", "request_id", "id")
+# HTTP status codes worth retrying.
+RETRY_CODES = (408, 429, 500, 502, 503, 504)
+CHECKPOINT_INTERVAL = 2.0
+
+
+class TokenBucket:
+    """Limits how often `acquire` returns to `rate` per second, with bursts up to `burst`."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                if self._updated is not None:
+                    self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class Checkpoint:
+    """Which input lines are finished, kept in constant space.
+
+    Every line below `watermark` is done; `done` only holds finished lines above it, so it
+    is bounded by the number of requests in flight rather than by the input size.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.watermark = 0
+        self.input_offset = 0  # Byte offset of line `watermark` in the input.
+        self.output_offset = 0  # Output bytes that match this checkpoint.
+        self.done = set()
+        if os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            self.watermark = state["watermark"]
+            self.input_offset = state["input_offset"]
+            self.output_offset = state["output_offset"]
+            self.done = set(state["done"])
+        self._offsets = {}  # Input byte offsets of lines read but not yet below the watermark.
+        self._resume = (self.watermark, self.input_offset)  # The latest line with a known offset.
+
+    def is_done(self, line):
+        return line < self.watermark or line in self.done
+
+    def seen(self, line, offset):
+        """Records where `line` starts in the input. Called for every line that is read."""
+        self._offsets[line] = offset
+        if line == self.watermark:
+            self._resume = (line, offset)
+
+    def finished(self, line):
+        self.done.add(line)
+        while self.watermark in self.done:
+            self.done.remove(self.watermark)
+            self._offsets.pop(self.watermark, None)
+            self.watermark += 1
+        if self.watermark in self._offsets:
+            self._resume = (self.watermark, self._offsets[self.watermark])
+
+    def save(self, output_offset):
+        # Lines finished in an earlier run can move the watermark past what's been read, so
+        # resume from the last line whose offset is known and list the rest as done.
+        line, offset = self._resume
+        state = {
+            "watermark": line,
+            "input_offset": offset,
+            "output_offset": output_offset,
+            "done": sorted(self.done.union(range(line, self.watermark))),
+        }
+        # Write and rename, so a crash never leaves a half-written checkpoint.
+        with open(self.path + ".tmp", "w") as f:
+            json.dump(state, f)
+        os.replace(self.path + ".tmp", self.path)
+
+
+def _parse(raw, line):
+    """Returns the key and the `generate_content` arguments for one input line.
+
+    Raises ValueError for a line that isn't a JSON object, so it's recorded as an error:
+
+    >>> _parse(b'[1, 2]', 3)
+    Traceback (most recent call last):
+    ...
+    ValueError: line 3 is a JSON list, not an object
+    """
+    record = json.loads(raw)
+    if not isinstance(record, dict):
+        raise ValueError(f"line {line} is a JSON {type(record).__name__}, not an object")
+    if "request" in record:
+        if not isinstance(record["request"], dict):
+            raise ValueError(f"line {line} has a request that isn't an object")
+        request = dict(record["request"])
+        key = record.get("key", str(line))
+        contents = request.pop("contents")
+        config = dict(request.pop("generation_config", None)
+                      or request.pop("generationConfig", None) or {})
+        # The remaining request fields (system_instruction, tools, ...) are config fields.
+        config.update(request)
+        return key, contents, types.GenerateContentConfig.model_validate(config)
+    key = next((str(record[field]) for field in KEY_FIELDS if field in record), str(line))
+    text = "\n\n".join(
+        value for field, value in record.items()
+        if isinstance(value, str) and field not in KEY_FIELDS
+    )
+    return key, text, None
+
+
+async def _generate(client, model, contents, config, max_retries):
+    for attempt in range(max_retries + 1):
+        try:
+            return await client.aio.models.generate_content(
+                model=model, contents=contents, config=config), attempt
+        except (errors.APIError, httpx.TransportError) as e:
+            retryable = isinstance(e, httpx.TransportError) or e.code in RETRY_CODES
+            if not retryable or attempt == max_retries:
+                raise
+            await asyncio.sleep(min(60, 2 ** attempt))
+
+
+async def run_batch(
+    client,
+    input_path,
+    output_path,
+    model=DEFAULT_MODEL,
+    concurrency=8,
+    rpm=None,
+    max_retries=5,
+    report_every=10.0,
+    overwrite=False,
+):
+    """Runs every unfinished line of `input_path` and appends the results to `output_path`.
+
+    Args:
+        client (genai.Client): The client to call.
+        input_path (str): The JSONL requests.
+        output_path (str): The JSONL results, one `{"key", "line", "response" | "error"}`
+            object per input line, in completion order.
+        model (str): The model for every request.
+        concurrency (int): Requests in flight at once.
+        rpm (float): Requests per minute to stay under, or None for no limit.
+        max_retries (int): Retries for rate limit and server errors.
+        report_every (float): Seconds between progress lines.
+        overwrite (bool): Start over if `output_path` exists without a checkpoint, instead
+            of raising `FileExistsError`.
+
+    Returns:
+        dict: Requests completed in this run, errors, retries and requests per second.
+    """
+    checkpoint_path = output_path + ".checkpoint"
+    if (not overwrite and not os.path.exists(checkpoint_path)
+            and os.path.exists(output_path) and os.path.getsize(output_path)):
+        # Without a checkpoint nothing says which results it holds, and starting over would
+        # truncate it.
+        raise FileExistsError(
+            f"{output_path} exists but has no checkpoint; pass overwrite=True (--overwrite) to "
+            "replace it")
+    checkpoint = Checkpoint(checkpoint_path)
+    bucket = TokenBucket(rpm / 60, burst=max(1, concurrency // 2)) if rpm else None
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    stats = {"completed": 0, "errors": 0, "retries": 0}
+    started = time.perf_counter()
+
+    # Anything written after the last checkpoint is redone, so drop it.
+    with open(output_path, "ab") as output:
+        output.truncate(checkpoint.output_offset)
+    output = open(output_path, "ab")
+
+    async def read():
+        with open(input_path, "rb") as f:
+            f.seek(checkpoint.input_offset)
+            offset = checkpoint.input_offset
+            line = checkpoint.watermark
+            for raw in f:
+                checkpoint.seen(line, offset)
+                if not raw.strip():
+                    # Blank lines count as done so the watermark can move past them.
+                    checkpoint.finished(line)
+                elif not checkpoint.is_done(line):
+                    await queue.put((line, raw))
+                offset += len(raw)
+                line += 1
+            checkpoint.seen(line, offset)
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def work():
+        while (item := await queue.get()) is not None:
+            line, raw = item
+            result = {"line": line}
+            try:
+                key, contents, config = _parse(raw, line)
+                result["key"] = key
+                if bucket:
+                    await bucket.acquire()
+                response, retries = await _generate(client, model, contents, config, max_retries)
+                stats["retries"] += retries
+                result["response"] = response.model_dump(
+                    mode="json", exclude_none=True,
+                    exclude={"sdk_http_response", "automatic_function_calling_history"})
+            except (errors.APIError, httpx.TransportError, ValueError, KeyError) as e:
+                # Invalid lines and failed requests are recorded, not retried on resume.
+                result["error"] = f"{type(e).__name__}: {e}"
+                stats["errors"] += 1
+            output.write(json.dumps(result).encode() + b"\n")
+            checkpoint.finished(line)
+            stats["completed"] += 1
+
+    async def save_periodically():
+        last_report = time.perf_counter()
+        while True:
+            await asyncio.sleep(CHECKPOINT_INTERVAL)
+            output.flush()
+            checkpoint.save(output.tell())
+            if time.perf_counter() - last_report >= report_every:
+                last_report = time.perf_counter()
+                elapsed = last_report - started
+                print(f"{stats['completed']} done, {stats['errors']} errors, "
+                      f"{stats['completed'] / elapsed:.1f} requests/s")
+
+    saver = asyncio.create_task(save_periodically())
+    tasks = [asyncio.create_task(read())]
+    tasks += [asyncio.create_task(work()) for _ in range(concurrency)]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        # If one task failed the others are still running; stop them before closing the
+        # output they write to.
+        for task in tasks + [saver]:
+            task.cancel()
+        await asyncio.gather(*tasks, saver, return_exceptions=True)
+        output.flush()
+        checkpoint.save(output.tell())
+        output.close()
+
+    elapsed = time.perf_counter() - started
+    stats["seconds"] = round(elapsed, 2)
+    stats["requests_per_second"] = round(stats["completed"] / elapsed, 2)
+    return stats
+
+
+async def _main(args):
+    try:
+        return await run_batch(
+            get_client(os.getenv("GOOGLE_API_KEY")), args.input, args.output,
+            model=args.model, concurrency=args.concurrency, rpm=args.rpm,
+            overwrite=args.overwrite)
+    finally:
+        # The async connection pool belongs to this loop, so close it before the loop ends.
+        await aclose_clients()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("input", help="JSONL file of requests")
+    parser.add_argument("output", help="JSONL file the results are appended to")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rpm", type=float, default=None, help="Requests per minute limit")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="Replace an existing output that has no checkpoint")
+    args = parser.parse_args()
+
+    stats = asyncio.run(_main(args))
+    print(stats)
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+A process-wide registry of `genai.Client` instances.
+
+Building a client costs tens of milliseconds (TLS contexts, CA bundle, HTTP pools), and
+servers that open a session per student would pay it on every connection. `get_client`
+returns one shared client per API key and API version, so later sessions reuse the same
+TLS setup and HTTP connection pools.
+"""
+
+import atexit
+import threading
+
+from google import genai
+
+_clients: dict[tuple[str | None, str], genai.Client] = {}
+_lock = threading.Lock()
+
+
+def get_client(api_key=None, api_version="v1beta"):
+    """Returns the shared client for `api_key` and `api_version`, creating it if needed.
+
+    Safe to call from concurrent handlers and threads.
+
+    Args:
+        api_key (str): The API key, or None to let the SDK read `GOOGLE_API_KEY`.
+        api_version (str): The API version, for example "v1alpha" for Live features.
+
+    Returns:
+        genai.Client: The shared client.
+    """
+    key = (api_key, api_version)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    with _lock:
+        if key not in _clients:
+            _clients[key] = genai.Client(api_key=api_key, http_options={"api_version": api_version})
+        return _clients[key]
+
+
+def close_clients():
+    """Closes every shared client. Called automatically when the process exits."""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+
+async def aclose_clients():
+    """Closes every shared client, including their async HTTP connection pools.
+
+    Await it at the end of an `asyncio.run` that used the clients' `aio` side, while the
+    loop those pools belong to is still running.
+    """
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        await client.aio.aclose()
+        client.close()
+
+
+atexit.register(close_clients)
@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Acoustic echo cancellation, so the tutor can be used with speakers instead of headphones.
+
+Without headphones the tutor's voice leaks from the speakers into the microphone, and the
+model hears itself and interrupts itself. `EchoCanceller` is given everything that is
+played (the reference) and learns the path from speaker to microphone with a
+partitioned-block frequency-domain adaptive filter (normalized LMS per frequency bin,
+overlap-save), then subtracts its estimate of the echo from the microphone signal.
+
+Two copies of the filter run at once. The background filter always adapts; the
+foreground filter, whose output is sent, only takes the background's coefficients once
+they are clearly better. When the student talks over the tutor (double talk), the
+background filter is pushed off course, but the foreground keeps cancelling.
+
+## Scenarios
+
+To measure echo reduction on synthetic rooms and the time per block, run:
+
+```
+python -m robotbox.echo
+```
+"""
+
+import collections
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+from robotbox.resample import SEND_SAMPLE_RATE
+
+
+class EchoCanceller:
+    """Removes the echo of a reference signal from a microphone signal.
+
+    Both signals are mono at the same rate, 16 kHz after resampling for the Live API.
+
+    Args:
+        rate (int): Sample rate of both signals.
+        block (int): Samples per processing block. The output lags the input by up to one
+            block.
+        tail_ms (float): Longest echo handled, from the reference being queued to the
+            echo dying away, including the sound card's output and input buffering.
+        step (float): Adaptation step, between 0 and 1. Larger converges faster but
+            settles less deeply.
+        max_reference_ms (float): Reference queued beyond this, e.g. because playback ran
+            ahead of the microphone, is dropped so the two stay in step.
+    """
+
+    def __init__(self, rate=SEND_SAMPLE_RATE, block=256, tail_ms=256, step=0.5,
+                 max_reference_ms=500):
+        self.rate = rate
+        self.block = block
+        self.step = step
+        self.partitions = max(1, math.ceil(tail_ms * rate / 1000 / block))
+        self.max_reference = int(max_reference_ms * rate / 1000)
+        bins = block + 1
+        self._x = np.zeros(2 * block, np.float32)  # The last two blocks of reference.
+        self._spectra = np.zeros((self.partitions, bins), np.complex64)  # Newest first.
+        self._background = np.zeros((self.partitions, bins), np.complex64)
+        self._foreground = np.zeros((self.partitions, bins), np.complex64)
+        self._power = np.full(bins, 1e-2, np.float32)  # Smoothed reference power per bin.
+        self._energy = {"background": 0.0, "foreground": 0.0, "mic": 0.0}
+        self._reference = collections.deque()
+        self._queued = 0
+        self._mic = np.zeros(0, np.float32)
+        self._lock = threading.Lock()
+        self.stats = {"blocks": 0, "copies": 0, "resets": 0, "dropped_reference": 0}
+
+    def push_reference(self, samples):
+        """Queues audio about to be played, as int16 or float samples in [-1, 1]."""
+        samples = np.asarray(samples)
+        if samples.dtype == np.int16:
+            samples = samples.astype(np.float32) / 32768
+        with self._lock:
+            self._reference.append(samples.astype(np.float32))
+            self._queued += len(samples)
+            while self._queued > self.max_reference and self._reference:
+                dropped = self._reference.popleft()
+                self._queued -= len(dropped)
+                self.stats["dropped_reference"] += len(dropped)
+
+    def push_reference_bytes(self, data):
+        self.push_reference(np.frombuffer(data, dtype=np.int16))
+
+    def _pull_reference(self, n):
+        """The next `n` reference samples, with silence for whatever hasn't been queued."""
+        out = np.zeros(n, np.float32)
+        filled = 0
+        with self._lock:
+            while filled < n and self._reference:
+                chunk = self._reference[0]
+                take = min(n - filled, len(chunk))
+                out[filled:filled + take] = chunk[:take]
+                filled += take
+                if take == len(chunk):
+                    self._reference.popleft()
+                else:
+                    self._reference[0] = chunk[take:]
+                self._queued -= take
+        return out
+
+    def _process_block(self, mic, reference):
+        n = self.block
+        self._x[:n] = self._x[n:]
+        self._x[n:] = reference
+        spectrum = np.fft.rfft(self._x)
+        self._spectra[1:] = self._spectra[:-1]
+        self._spectra[0] = spectrum
+
+        # Overlap-save: the second half of the circular convolution is the linear one.
+        echo_b = np.fft.irfft((self._background * self._spectra).sum(axis=0))[n:]
+        echo_f = np.fft.irfft((self._foreground * self._spectra).sum(axis=0))[n:]
+        error_b = mic - echo_b
+        error_f = mic - echo_f
+
+        # NLMS: each bin's step is normalized by the reference power in that bin.
+        self._power = 0.9 * self._power + 0.1 * (spectrum.real ** 2 + spectrum.imag ** 2)
+        error_spectrum = np.fft.rfft(np.concatenate([np.zeros(n, np.float32), error_b]))
+        gradient = np.conj(self._spectra) * (
+            error_spectrum / (self.partitions * self._power + 1e-6))
+        # Keep each partition's impulse response one block long (the gradient constraint).
+        taps = np.fft.irfft(gradient, axis=1)
+        taps[:, n:] = 0
+        self._background += self.step * np.fft.rfft(taps, axis=1).astype(np.complex64)
+
+        # Hand over between the two filters on smoothed residual energies.
+        for name, signal in (("background", error_b), ("foreground", error_f), ("mic", mic)):
+            self._energy[name] = 0.95 * self._energy[name] + 0.05 * float(signal @ signal)
+        background, foreground = self._energy["background"], self._energy["foreground"]
+        if background < 0.7 * foreground:
+            self._foreground[:] = self._background
+            self._energy["foreground"] = background
+            self.stats["copies"] += 1
+        elif background > 4 * foreground and background > self._energy["mic"]:
+            # The background filter diverged, e.g. during double talk. Start it again
+            # from the foreground.
+            self._background[:] = self._foreground
+            self._energy["background"] = foreground
+            self.stats["resets"] += 1
+        self.stats["blocks"] += 1
+        return error_f
+
+    def process(self, mic):
+        """Cancels echo in microphone samples (int16 or float in [-1, 1]).
+
+        Returns:
+            np.ndarray: Cleaned samples of the same dtype, for every complete block so
+            far. Up to `block - 1` samples are held until the next call.
+        """
+        mic = np.asarray(mic)
+        integer = mic.dtype == np.int16
+        samples = mic.astype(np.float32) / 32768 if integer else mic.astype(np.float32)
+        self._mic = np.concatenate([self._mic, samples])
+        blocks = len(self._mic) // self.block
+        out = np.empty(blocks * self.block, np.float32)
+        for i in range(blocks):
+            part = slice(i * self.block, (i + 1) * self.block)
+            out[part] = self._process_block(self._mic[part], self._pull_reference(self.block))
+        self._mic = self._mic[blocks * self.block:]
+        if integer:
+            return np.clip(np.rint(out * 32768), -32768, 32767).astype(np.int16)
+        return out
+
+    def process_bytes(self, data):
+        """Cancels echo in a chunk of 16-bit PCM bytes."""
+        return self.process(np.frombuffer(data, dtype=np.int16)).tobytes()
+
+
+def _speech_like(rng, seconds, rate=SEND_SAMPLE_RATE):
+    """Noise shaped like speech: a falling spectrum, switched on and off in syllables."""
+    n = int(seconds * rate)
+    noise = rng.standard_normal(n)
+    spectrum = np.fft.rfft(noise)
+    freqs = np.fft.rfftfreq(n, 1 / rate)
+    spectrum *= 1 / (1 + (freqs / 500) ** 1.5) * (freqs > 80)
+    voice = np.fft.irfft(spectrum, n)
+    envelope = np.repeat(rng.random(n // 3200 + 1) > 0.3, 3200)[:n].astype(float)
+    envelope = np.convolve(envelope, np.hanning(800) / 400, mode="same")
+    voice *= envelope
+    return (0.3 * voice / np.abs(voice).max()).astype(np.float32)
+
+
+def _room(rng, delay_ms, decay_ms, gain, rate=SEND_SAMPLE_RATE):
+    """A synthetic speaker-to-microphone impulse response."""
+    delay = int(delay_ms * rate / 1000)
+    length = int(3 * decay_ms * rate / 1000)
+    tail = rng.standard_normal(length) * np.exp(-np.arange(length) / (decay_ms * rate / 1000))
+    response = np.concatenate([np.zeros(delay), tail])
+    return gain * response / np.sqrt(np.sum(response ** 2))
+
+
+def _erle(mic_echo, residual):
+    """Echo return loss enhancement in dB: how much quieter the echo got."""
+    return 10 * np.log10(np.sum(mic_echo ** 2) / max(np.sum(residual ** 2), 1e-12))
+
+
+def _run(canceller, mic, reference, chunk=320):
+    """Feeds the canceller in 20 ms chunks, as `listen_audio` would."""
+    out = []
+    for start in range(0, len(mic), chunk):
+        canceller.push_reference(reference[start:start + chunk])
+        out.append(canceller.process(mic[start:start + chunk]))
+    out = np.concatenate(out)
+    return np.concatenate([out, np.zeros(len(mic) - len(out), np.float32)])
+
+
+def _scenarios():
+    """Synthetic echo scenarios. Returns (name, passed, detail) per scenario."""
+    rate = SEND_SAMPLE_RATE
+    rng = np.random.default_rng(1)
+    results = []
+    seconds = 12
+    settled = slice(6 * rate, seconds * rate)
+
+    # 1. Echo only, in a small room with a short delay.
+    far = _speech_like(rng, seconds)
+    room = _room(rng, delay_ms=20, decay_ms=30, gain=0.8)
+    echo = np.convolve(far, room)[:len(far)].astype(np.float32)
+    noise = (1e-4 * rng.standard_normal(len(far))).astype(np.float32)
+    out = _run(EchoCanceller(), echo + noise, far)
+    erle = _erle(echo[settled], out[settled] - noise[settled])
+    results.append(("echo only", erle > 20, f"ERLE {erle:.1f} dB"))
+
+    # 2. A long path: 120 ms of sound card buffering plus a livelier room.
+    room = _room(rng, delay_ms=120, decay_ms=40, gain=1.5)
+    echo = np.convolve(far, room)[:len(far)].astype(np.float32)
+    out = _run(EchoCanceller(), echo + noise, far)
+    erle = _erle(echo[settled], out[settled] - noise[settled])
+    results.append(("120 ms delay", erle > 15, f"ERLE {erle:.1f} dB"))
+
+    # 3. Double talk: the student speaks over the tutor from 6 s on. The student's voice
+    # must come through, and the echo must stay cancelled.
+    room = _room(rng, delay_ms=30, decay_ms=30, gain=0.8)
+    echo = np.convolve(far, room)[:len(far)].astype(np.float32)
+    near = np.zeros_like(far)
+    near[settled] = _speech_like(rng, seconds - 6)
+    out = _run(EchoCanceller(), echo + near + noise, far)
+    residual = out[settled] - near[settled] - noise[settled]
+    erle = _erle(echo[settled], residual)
+    kept = 10 * np.log10(np.sum(near[settled] ** 2) / np.sum(residual ** 2))
+    results.append(("double talk", erle > 10 and kept > 10,
+                    f"ERLE {erle:.1f} dB, student voice {kept:.1f} dB above residual"))
+
+    # 4. The echo path changes (someone moves the speaker) halfway through.
+    half = seconds * rate // 2
+    first, second = _room(rng, 25, 30, 0.8), _room(rng, 60, 30, 0.8)
+    echo = np.concatenate([np.convolve(far, first)[:half],
+                           np.convolve(far, second)[half:len(far)]]).astype(np.float32)
+    out = _run(EchoCanceller(), echo + noise, far)
+    recovered = slice(half + 2 * rate, len(far))
+    erle = _erle(echo[recovered], out[recovered] - noise[recovered])
+    results.append(("path change", erle > 15, f"ERLE {erle:.1f} dB 2 s after the change"))
+
+    # 5. No playback: the microphone must pass through untouched.
+    near = _speech_like(rng, 4)
+    out = _run(EchoCanceller(), near, np.zeros_like(near))
+    held = len(out) - len(out) % 256 - 256
+    error = np.max(np.abs(out[:held] - near[:held]))
+    results.append(("no playback", error < 1e-6, f"max difference {error:.1e}"))
+    return results
+
+
+def _benchmark(seconds=30):
+    """Times `process` against the real-time budget on one core."""
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {min(os.sched_getaffinity(0))})
+    rng = np.random.default_rng(0)
+    canceller = EchoCanceller()
+    chunk = SEND_SAMPLE_RATE // 50
+    far = (rng.standard_normal(seconds * SEND_SAMPLE_RATE) * 3000).astype(np.int16)
+    mic = (far // 2).astype(np.int16)
+    timings = []
+    for start in range(0, len(mic), chunk):
+        canceller.push_reference(far[start:start + chunk])
+        began = time.perf_counter()
+        canceller.process(mic[start:start + chunk])
+        timings.append(time.perf_counter() - began)
+    timings = np.array(timings)
+    budget = chunk / SEND_SAMPLE_RATE
+    print(f"{canceller.partitions} partitions of {canceller.block} samples "
+          f"({canceller.partitions * canceller.block / SEND_SAMPLE_RATE * 1000:.0f} ms tail): "
+          f"mean {timings.mean() * 1000:.2f} ms, p99 {np.percentile(timings, 99) * 1000:.2f} ms "
+          f"per 20 ms chunk, {timings.mean() / budget * 100:.1f}% of one core")
+    return np.percentile(timings, 99) < budget
+
+
+if __name__ == "__main__":
+    failed = 0
+    for name, passed, detail in _scenarios():
+        failed += not passed
+        print(f"{'PASS' if passed else 'FAIL'} {name:14} {detail}")
+    if not _benchmark():
+        failed += 1
+        print("FAIL real time")
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Multi-resolution camera frames: a small view of the whole scene plus a sharp close-up.
+
+A whole frame shrunk to fit the image budget is too blurry to read resistor bands or pin
+labels, and spends most of its pixels on the desk. `MultiResolutionFramer` splits a pixel
+budget between a low-resolution context frame and a crop at up to full camera resolution.
+The crop follows whatever changed most between frames (usually the student's hands), or
+stays on a fixed board region, and moves smoothly so consecutive close-ups line up.
+"""
+
+import math
+
+import cv2
+import numpy as np
+
+
+def _fit(width, height, pixels):
+    """The largest size with the aspect ratio of `width` x `height` and at most `pixels`."""
+    scale = min(1.0, math.sqrt(pixels / (width * height)))
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+class RegionTracker:
+    """Follows the region of a video that changes most, smoothly.
+
+    Args:
+        width (int): Frames are compared at this width, which keeps differencing cheap
+            and ignores sensor noise.
+        threshold (int): Grey-level change that counts as motion.
+        min_area (float): Smallest moving blob followed, as a fraction of the frame.
+        smoothing (float): How far the region moves towards a new target per frame,
+            from 0 (never) to 1 (at once).
+        deadband (float): Target moves smaller than this fraction of the frame size are
+            ignored, so the crop doesn't wobble while the student works in one spot.
+    """
+
+    def __init__(self, width=160, threshold=25, min_area=0.002, smoothing=0.3, deadband=0.05):
+        self.width = width
+        self.threshold = threshold
+        self.min_area = min_area
+        self.smoothing = smoothing
+        self.deadband = deadband
+        self.box = None  # (cx, cy, w, h) as fractions of the frame.
+        self._previous = None
+        self._kernel = np.ones((5, 5), np.uint8)
+
+    def _target(self, frame):
+        """The bounding box of the largest moving blob, as fractions, or None."""
+        height = int(frame.shape[0] * self.width / frame.shape[1])
+        grey = cv2.cvtColor(cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA),
+                            cv2.COLOR_BGR2GRAY)
+        grey = cv2.GaussianBlur(grey, (5, 5), 0)
+        previous, self._previous = self._previous, grey
+        if previous is None:
+            return None
+        _, moved = cv2.threshold(cv2.absdiff(grey, previous), self.threshold, 255,
+                                 cv2.THRESH_BINARY)
+        moved = cv2.dilate(moved, self._kernel)
+        n, _, stats, _ = cv2.connectedComponentsWithStats(moved)
+        if n < 2:
+            return None
+        i = 1 + int(np.argmax(stats[1:, cv2.CC_STAT_AREA]))
+        x, y, w, h, area = stats[i]
+        if area < self.min_area * moved.size:
+            return None
+        return (float(x + w / 2) / self.width, float(y + h / 2) / height,
+                float(w) / self.width, float(h) / height)
+
+    def update(self, frame):
+        """Returns the tracked region after this frame as (cx, cy, w, h) fractions, or None
+        until something has moved."""
+        target = self._target(frame)
+        if target is None:
+            return self.box
+        if self.box is None:
+            self.box = target
+            return self.box
+        moved = max(abs(t - b) for t, b in zip(target, self.box))
+        if moved > self.deadband:
+            a = self.smoothing
+            self.box = tuple(b + a * (t - b) for t, b in zip(target, self.box))
+        return self.box
+
+
+class MultiResolutionFramer:
+    """Turns camera frames into a context JPEG and a detail JPEG within a pixel budget.
+
+    Args:
+        total_pixels (int): Pixels across both images.
+        context_share (float): Fraction of `total_pixels` for the whole-scene image.
+        region (tuple): A fixed `(x, y, w, h)` region, as fractions of the frame, to crop
+            instead of following motion. For example the breadboard's place on the desk.
+        tracker (RegionTracker): Follows motion when `region` isn't set.
+        quality (int): JPEG quality for both images.
+    """
+
+    def __init__(self, total_pixels=640 * 480, context_share=0.25, region=None, tracker=None,
+                 quality=80):
+        self.context_pixels = int(total_pixels * context_share)
+        self.detail_pixels = total_pixels - self.context_pixels
+        self.region = region
+        self.tracker = tracker or RegionTracker()
+        self._params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+
+    def track(self, frame):
+        """Feeds a frame to the tracker. Call for every frame, even ones not sent."""
+        if self.region is None:
+            self.tracker.update(frame)
+
+    def crop_box(self, frame):
+        """The detail crop in pixels, as (x0, y0, x1, y1)."""
+        height, width = frame.shape[:2]
+        if self.region is not None:
+            x, y, w, h = self.region
+            box = (x + w / 2, y + h / 2, w, h)
+        else:
+            # Until something moves, look at the middle of the frame.
+            box = self.tracker.box or (0.5, 0.5, 0, 0)
+        cx, cy, w, h = box[0] * width, box[1] * height, box[2] * width, box[3] * height
+        # At least as large as the budget allows at full resolution, with the frame's
+        # aspect ratio, so small regions get full detail and large ones get scaled down.
+        w, h = max(w, h * width / height), max(h, w * height / width)
+        min_w, min_h = _fit(width, height, self.detail_pixels)
+        w, h = min(width, max(w, min_w)), min(height, max(h, min_h))
+        x0 = int(min(max(cx - w / 2, 0), width - w))
+        y0 = int(min(max(cy - h / 2, 0), height - h))
+        return x0, y0, x0 + int(w), y0 + int(h)
+
+    def _encode(self, image, pixels):
+        size = _fit(image.shape[1], image.shape[0], pixels)
+        if size != (image.shape[1], image.shape[0]):
+            image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        _, buffer = cv2.imencode(".jpg", image, self._params)
+        return buffer.tobytes()
+
+    def encode(self, frame):
+        """Returns `[context, detail]` JPEG bytes for a BGR frame."""
+        x0, y0, x1, y1 = self.crop_box(frame)
+        return [
+            self._encode(frame, self.context_pixels),
+            self._encode(frame[y0:y1, x0:x1], self.detail_pixels),
+        ]
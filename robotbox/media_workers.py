@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Processes camera frames in worker processes, so vision work doesn't share the app's GIL.
+
+In the Streamlit app, every student's WebRTC callbacks, colour conversion, layout
+detection, resizing, JPEG encoding and Live session loop run in one process, and the
+vision work holds the GIL that everything else needs. `MediaWorkers` runs that work in a
+pool of processes instead.
+
+A raw frame is copied once, into a slot of a ring of `multiprocessing.shared_memory`
+slots, and the worker reads it in place. Only the slot number and the frame's shape go
+through a queue, and only the small result comes back: a text observation and the JPEGs
+to send. Each student is handled by the same worker every time, because the pipeline keeps
+state from one frame to the next (the previous layout, where the hands are).
+
+## Benchmark
+
+To measure how many students the pool serves as it gets more cores, run:
+
+```
+python -m robotbox.media_workers
+```
+"""
+
+import collections
+import concurrent.futures
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from robotbox.framing import MultiResolutionFramer
+from robotbox.mosaic import Mosaic
+from robotbox.workspace import ObservationStream, WorkspaceObserver
+
+# Room for a 1080p frame in BGR (and so in YUV 4:2:0). Larger frames are shrunk to fit.
+DEFAULT_SLOT_BYTES = 1920 * 1080 * 3
+
+
+def _to_bgr(frame):
+    """Converts a YUV 4:2:0 frame, as `FrameBuffer(format="yuv420p")` keeps, to BGR."""
+    if frame is not None and frame.ndim == 2:
+        return cv2.cvtColor(frame, cv2.COLOR_YUV2BGR_I420)
+    return frame
+
+
+def _fit_slot(frame, slot_bytes):
+    """Shrinks a frame too large for a slot, as BGR, so it fits."""
+    frame = _to_bgr(frame)
+    scale = (slot_bytes / frame.nbytes) ** 0.5
+    size = (max(1, int(frame.shape[1] * scale)), max(1, int(frame.shape[0] * scale)))
+    return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+
+class _Pipeline:
+    """One student's frame processing, as the app does it without workers."""
+
+    def __init__(self, close_up=False, pixels=640 * 480, region=None, cameras=1, quality=80):
+        self.mosaic = Mosaic(cameras) if cameras > 1 else None
+        self.framer = MultiResolutionFramer(pixels, region=region, quality=quality)
+        params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+        encode = self.framer.encode if close_up else (
+            lambda frame: cv2.imencode(".jpg", frame, params)[1].tobytes())
+        self.observations = ObservationStream(WorkspaceObserver(), encode)
+
+    def run(self, frames):
+        frames = [_to_bgr(frame) for frame in frames]
+        if self.mosaic is not None:
+            frame = self.mosaic.compose(frames)
+        else:
+            frame = frames[0]
+        if frame is None:
+            return None
+        # Track every frame so the close-up follows the hands.
+        self.framer.track(frame)
+        text, images = self.observations.tick(frame)
+        return {"text": text, "images": images, "savings": self.observations.savings()}
+
+
+def _worker(memory_name, slot_bytes, tasks, results):
+    # Spawned workers share the parent's resource tracker, so attaching registers nothing
+    # new and the parent's `unlink` is the only cleanup.
+    memory = shared_memory.SharedMemory(name=memory_name)
+    pipelines = {}
+    try:
+        for message in iter(tasks.get, None):
+            kind, student = message[:2]
+            if kind == "open":
+                pipelines[student] = _Pipeline(**message[2])
+                continue
+            if kind == "close":
+                pipelines.pop(student, None)
+                continue
+            job, slots = message[2:]
+            # Views of the slots, not copies. The parent reuses a slot only after this
+            # job's result is back.
+            frames = [
+                None if slot is None else np.ndarray(
+                    shape, np.uint8, buffer=memory.buf, offset=slot * slot_bytes)
+                for slot, shape in slots
+            ]
+            try:
+                results.put((job, pipelines[student].run(frames), None))
+            except Exception as e:
+                results.put((job, None, f"{type(e).__name__}: {e}"))
+            del frames
+    finally:
+        memory.close()
+
+
+class MediaWorkers:
+    """A pool of processes running each student's frame pipeline.
+
+    Args:
+        processes (int): Worker processes. Defaults to one per core.
+        slots (int): Frames that can be in flight at once, across all students. A frame
+            submitted while every slot is busy is dropped, as the next one will be fresher.
+        slot_bytes (int): Largest raw frame a slot holds. A larger frame is shrunk to fit
+            on the submitting thread, which costs that thread a conversion and a resize.
+    """
+
+    def __init__(self, processes=None, slots=16, slot_bytes=DEFAULT_SLOT_BYTES):
+        processes = processes or os.cpu_count() or 1
+        # Spawned, not forked: forking the app's threads (WebRTC, asyncio) is unsafe.
+        context = multiprocessing.get_context("spawn")
+        self.slot_bytes = slot_bytes
+        self._memory = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        self._free = collections.deque(range(slots))
+        self._lock = threading.Lock()
+        self._results = context.Queue()
+        self._tasks = [context.Queue() for _ in range(processes)]
+        self._processes = [
+            context.Process(target=_worker, daemon=True, name=f"media-worker-{i}",
+                            args=(self._memory.name, slot_bytes, tasks, self._results))
+            for i, tasks in enumerate(self._tasks)
+        ]
+        for process in self._processes:
+            process.start()
+        self._students = itertools.count()
+        self._jobs = itertools.count()
+        self._pending = {}  # Job -> (future, slots, worker).
+        self._closing = False
+        self.stats = {"frames": 0, "dropped": 0, "shrunk": 0, "errors": 0}
+        self._collector = threading.Thread(target=self._collect, daemon=True,
+                                           name="media-results")
+        self._collector.start()
+
+    def open(self, close_up=False, pixels=640 * 480, region=None, cameras=1):
+        """Starts a student's pipeline and returns its id. Arguments are as in `app.py`."""
+        student = next(self._students)
+        self._worker(student).put(("open", student, {
+            "close_up": close_up, "pixels": pixels, "region": region, "cameras": cameras}))
+        return student
+
+    def close_student(self, student):
+        self._worker(student).put(("close", student))
+
+    def _worker(self, student):
+        return self._tasks[student % len(self._tasks)]
+
+    def submit(self, student, frames):
+        """Hands one frame per camera (None for a camera without one yet) to the student's
+        worker.
+
+        Returns:
+            concurrent.futures.Future: Resolves to a dict with the `text` observation, the
+            `images` to send (either may be None) and the `savings` so far, or to None if
+            the frame was dropped or there was no frame at all.
+        """
+        future = concurrent.futures.Future()
+        needed = sum(frame is not None for frame in frames)
+        with self._lock:
+            if needed == 0 or len(self._free) < needed:
+                self.stats["dropped"] += bool(needed)
+                future.set_result(None)
+                return future
+            slots = [None if frame is None else self._free.popleft() for frame in frames]
+        described = []
+        for frame, slot in zip(frames, slots):
+            if frame is None:
+                described.append((None, None))
+                continue
+            if frame.nbytes > self.slot_bytes:
+                frame = _fit_slot(frame, self.slot_bytes)
+                self.stats["shrunk"] += 1
+            # The only copy of the pixels: straight into shared memory.
+            np.ndarray(frame.shape, np.uint8, buffer=self._memory.buf,
+                       offset=slot * self.slot_bytes)[...] = frame
+            described.append((slot, frame.shape))
+        job = next(self._jobs)
+        worker = student % len(self._tasks)
+        with self._lock:
+            self._pending[job] = (future, slots, worker)
+        self._tasks[worker].put(("frame", student, job, described))
+        return future
+
+    def _release(self, slots):
+        with self._lock:
+            self._free.extend(slot for slot in slots if slot is not None)
+
+    def _collect(self):
+        checked = time.monotonic()
+        while not self._closing:
+            if time.monotonic() - checked > 0.5:
+                self._fail_dead_workers()
+                checked = time.monotonic()
+            try:
+                job, result, error = self._results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            with self._lock:
+                future, slots, _ = self._pending.pop(job)
+            self._release(slots)
+            self.stats["frames"] += 1
+            if error is None:
+                future.set_result(result)
+            else:
+                self.stats["errors"] += 1
+                future.set_exception(RuntimeError(error))
+
+    def _fail_dead_workers(self):
+        dead = {i for i, process in enumerate(self._processes) if not process.is_alive()}
+        if not dead:
+            return
+        with self._lock:
+            jobs = [job for job, (_, _, worker) in self._pending.items() if worker in dead]
+            failed = [self._pending.pop(job) for job in jobs]
+        for future, slots, worker in failed:
+            self._release(slots)
+            future.set_exception(RuntimeError(
+                f"media worker {worker} exited with {self._processes[worker].exitcode}"))
+
+    def close(self):
+        """Stops the workers and frees the shared memory."""
+        for tasks in self._tasks:
+            tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._closing = True
+        self._collector.join()
+        self._memory.close()
+        self._memory.unlink()
+
+
+def _scene(width=640, height=480, t=0.0):
+    """A synthetic breadboard with a few wires, one of them moving, as YUV 4:2:0."""
+    frame = np.full((height, width, 3), (60, 70, 80), np.uint8)
+    cv2.rectangle(frame, (80, 60), (560, 420), (225, 225, 220), -1)
+    for i, colour in enumerate([(0, 0, 200), (200, 0, 0), (0, 160, 0)]):
+        y = 120 + 100 * i + int(20 * np.sin(t + i))
+        cv2.line(frame, (120 + 40 * i, y), (380 + 30 * i, y + 30), colour, 6)
+    cv2.circle(frame, (int(320 + 150 * np.sin(t / 3)), 240), 40, (40, 90, 170), -1)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2YUV_I420)
+
+
+def _throughput(submit, students, seconds, scenes):
+    """Frames per second with every student keeping one frame in flight, as the app does."""
+    done = 0
+    started = time.perf_counter()
+    in_flight = {submit(student, [scenes[0]]): student for student in students}
+    while time.perf_counter() - started < seconds:
+        finished, _ = concurrent.futures.wait(
+            in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in finished:
+            future.result()
+            student = in_flight.pop(future)
+            done += 1
+            in_flight[submit(student, [scenes[done % len(scenes)]])] = student
+    concurrent.futures.wait(in_flight)
+    return done / (time.perf_counter() - started)
+
+
+def _benchmark(seconds=5.0, fps=1.0):
+    """Students served at `fps` frames each, by the pool and by threads in one process."""
+    scenes = [_scene(t=i / 5) for i in range(50)]
+    cores = os.cpu_count() or 1
+    counts = sorted({1, 2, 4, 8, 16, cores} & set(range(1, cores + 1)))
+    print(f"{cores} cores; each student sends {fps:g} frame/s of 640x480 with close-ups")
+    for processes in counts:
+        students = range(2 * processes + 2)
+
+        # The app's current design: every student's pipeline on a thread of one process.
+        pipelines = {student: _Pipeline(close_up=True) for student in students}
+        with concurrent.futures.ThreadPoolExecutor(processes) as executor:
+            threaded = _throughput(
+                lambda student, frames: executor.submit(pipelines[student].run, frames),
+                students, seconds, scenes)
+
+        workers = MediaWorkers(processes)
+        try:
+            for _ in students:
+                workers.open(close_up=True)
+            _throughput(workers.submit, students, 1.0, scenes)  # Start up the workers.
+            pooled = _throughput(workers.submit, students, seconds, scenes)
+        finally:
+            workers.close()
+        print(f"{processes:3} processes: {pooled:7.1f} frames/s, {pooled / fps:5.0f} students "
+              f"| {processes:3} threads: {threaded:7.1f} frames/s, {threaded / fps:5.0f} students")
+
+    # What is left for the app's own process to do per frame: one copy into a slot.
+    slot = np.empty(DEFAULT_SLOT_BYTES, np.uint8)
+    started = time.perf_counter()
+    for i in range(200):
+        slot[:scenes[0].size] = scenes[i % len(scenes)].ravel()
+    copy_ms = (time.perf_counter() - started) / 200 * 1000
+    started = time.perf_counter()
+    for i in range(20):
+        _Pipeline(close_up=True).run([scenes[i]])
+    pipeline_ms = (time.perf_counter() - started) / 20 * 1000
+    print(f"app process per frame: {copy_ms:.3f} ms copying into a slot, instead of "
+          f"{pipeline_ms:.1f} ms running the pipeline")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tiles several camera views into one frame, giving more room to the busiest view.
+
+An overhead camera and a close-up on the microcontroller would otherwise cost two image
+messages per send interval. `Mosaic.compose` resizes every view straight into its tile of
+one preallocated canvas, so the model gets both views in a single image. Each view's share
+of the canvas follows how much it has been changing: the camera on the part the student
+is working on gets the most pixels, and a view where nothing happens shrinks to a
+thumbnail.
+"""
+
+import cv2
+import numpy as np
+
+# Relative change in a view's aspect ratio that re-splits the tiles.
+ASPECT_CHANGE = 0.05
+
+
+def _fitted_area(rect, aspect):
+    """Area of an image of `aspect` (width / height) fitted inside `rect`."""
+    _, _, w, h = rect
+    return min(w, h * aspect) * min(h, w / aspect)
+
+
+def _split(rect, shares, aspects):
+    """Divides `rect` among views in proportion to `shares`, recursively (a treemap).
+
+    Each split goes across or down, whichever leaves the views' pictures, at their aspect
+    ratios, covering more of the canvas.
+
+    Returns:
+        (list, float): A rect per view, and the area the pictures would cover.
+    """
+    x, y, w, h = rect
+    if len(shares) == 1:
+        return [rect], _fitted_area(rect, aspects[0])
+    half = len(shares) // 2
+    first = sum(shares[:half]) / sum(shares)
+    best = None
+    for across in (True, False):
+        if across:
+            cut = int(round(w * first))
+            a, b = (x, y, cut, h), (x + cut, y, w - cut, h)
+        else:
+            cut = int(round(h * first))
+            a, b = (x, y, w, cut), (x, y + cut, w, h - cut)
+        rects_a, area_a = _split(a, shares[:half], aspects[:half])
+        rects_b, area_b = _split(b, shares[half:], aspects[half:])
+        if best is None or area_a + area_b > best[1]:
+            best = rects_a + rects_b, area_a + area_b
+    return best
+
+
+class Mosaic:
+    """Composes frames from several sources into one tiled BGR frame.
+
+    Args:
+        sources (int): Number of views.
+        width (int): Canvas width.
+        height (int): Canvas height.
+        min_share (float): Smallest fraction of the canvas a view shrinks to.
+        smoothing (float): Weight of the latest frame in each view's activity average.
+        relayout (float): Change in any view's share needed before tiles move, so the
+            layout stays put from one image to the next unless activity really shifts.
+            Tiles also move on each view's first frame and when a view's aspect ratio
+            changes.
+    """
+
+    def __init__(self, sources, width=1024, height=768, min_share=0.15, smoothing=0.3,
+                 relayout=0.1):
+        self.sources = sources
+        self.min_share = min(min_share, 1.0 / sources)
+        self.smoothing = smoothing
+        self.relayout = relayout
+        self.canvas = np.zeros((height, width, 3), np.uint8)
+        self.activity = np.ones(sources)
+        self.shares = np.full(sources, 1.0 / sources)
+        self.aspects = [4 / 3] * sources  # Updated from each source's frames.
+        self.tiles, _ = _split((0, 0, width, height), list(self.shares), self.aspects)
+        self._tiled_aspects = list(self.aspects)  # The aspects `tiles` was split for.
+        self._previous = [None] * sources
+        self._stale = False  # A view sent its first frame, so the layout guessed its aspect.
+
+    def _update_activity(self, frames):
+        for i, frame in enumerate(frames):
+            if frame is None:
+                continue
+            self.aspects[i] = frame.shape[1] / frame.shape[0]
+            if self._previous[i] is None:
+                self._stale = True
+            thumb = cv2.cvtColor(cv2.resize(frame, (64, 48), interpolation=cv2.INTER_AREA),
+                                 cv2.COLOR_BGR2GRAY)
+            if self._previous[i] is not None:
+                change = float(cv2.absdiff(thumb, self._previous[i]).mean())
+                self.activity[i] += self.smoothing * (change - self.activity[i])
+            self._previous[i] = thumb
+
+    def _layout(self):
+        raw = self.activity + 1e-3
+        shares = raw / raw.sum()
+        # Raise the quiet views to the floor, taking the difference from the busy ones.
+        low = shares < self.min_share
+        if low.any() and not low.all():
+            spare = 1.0 - self.min_share * low.sum()
+            shares = np.where(low, self.min_share, shares / shares[~low].sum() * spare)
+        reshaped = any(abs(new / old - 1) > ASPECT_CHANGE
+                       for new, old in zip(self.aspects, self._tiled_aspects))
+        if self._stale or reshaped or np.abs(shares - self.shares).max() > self.relayout:
+            self.shares = shares
+            height, width = self.canvas.shape[:2]
+            self.tiles, _ = _split((0, 0, width, height), list(shares), self.aspects)
+            self._tiled_aspects = list(self.aspects)
+            self._stale = False
+            self.canvas[:] = 0
+
+    def compose(self, frames):
+        """Returns the canvas with every frame drawn into its tile.
+
+        Args:
+            frames (list[np.ndarray]): One BGR frame per source. A None keeps that view's
+                previous picture, unless the tiles have just moved.
+
+        Returns:
+            np.ndarray: The canvas itself, reused by the next call; copy it to keep it.
+        """
+        self._update_activity(frames)
+        self._layout()
+        for frame, (x, y, w, h) in zip(frames, self.tiles):
+            if frame is None:
+                continue
+            # Fit inside the tile keeping the aspect ratio, centred.
+            scale = min(w / frame.shape[1], h / frame.shape[0])
+            fw, fh = max(1, int(frame.shape[1] * scale)), max(1, int(frame.shape[0] * scale))
+            ox, oy = x + (w - fw) // 2, y + (h - fh) // 2
+            tile = self.canvas[oy:oy + fh, ox:ox + fw]
+            # Resized straight into the canvas, so there's no intermediate image to copy.
+            cv2.resize(frame, (fw, fh), dst=tile,
+                       interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+        return self.canvas
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Coalesced, rate-limited control messages for a Lyria RealTime music session.
+
+Config changes that arrive close together are merged into one `set_music_generation_config`
+(and at most one `reset_context`, only when bpm or scale actually changed). Prompt changes
+become a linear weight ramp sent at a bounded rate instead of a hard cut.
+"""
+
+import asyncio
+import math
+
+from google.genai import types
+
+# Changing these only takes effect after the session context is reset.
+RESET_FIELDS = ("bpm", "scale")
+
+
+class MusicControlScheduler:
+    """Sends control messages to a music session on the caller's behalf.
+
+    Args:
+        session: A `client.aio.live.music.connect()` session.
+        config (types.LiveMusicGenerationConfig): The config the session is using. It is
+            updated in place as changes are applied.
+        coalesce_window (float): Seconds to collect config changes before sending them.
+        min_interval (float): Minimum seconds between two control messages.
+        ramp_rate (float): Weighted-prompt updates per second during a ramp.
+    """
+
+    def __init__(self, session, config, coalesce_window=0.3, min_interval=0.1, ramp_rate=4.0):
+        self.session = session
+        self.config = config
+        self.coalesce_window = coalesce_window
+        self.min_interval = min_interval
+        self.ramp_rate = ramp_rate
+        self.prompts = {}  # Prompt text -> weight as last sent.
+        self.stats = {"sent": 0, "merged": 0, "skipped": 0, "resets": 0}
+        self._pending = {}
+        self._flush_task = None
+        self._ramp_task = None
+        self._ramp_remaining = 0
+        self._send_lock = asyncio.Lock()
+        self._last_send = -math.inf
+
+    async def _send(self, method, **kwargs):
+        loop = asyncio.get_running_loop()
+        async with self._send_lock:
+            wait = self._last_send + self.min_interval - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            await getattr(self.session, method)(**kwargs)
+            self._last_send = loop.time()
+            self.stats["sent"] += 1
+
+    def update_config(self, **changes):
+        """Schedules config changes, for example `update_config(bpm=90)`.
+
+        A value of None returns the field to AUTO. Changes made within `coalesce_window`
+        of each other are sent together.
+        """
+        if self._pending:
+            # Rides along with the update that is already scheduled.
+            self.stats["merged"] += 1
+        self._pending.update(changes)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.coalesce_window)
+        await self.flush()
+
+    async def flush(self):
+        """Sends pending config changes now."""
+        changes, self._pending = self._pending, {}
+        changed = {k: v for k, v in changes.items() if getattr(self.config, k) != v}
+        if not changed:
+            if changes:
+                self.stats["skipped"] += 1
+            return
+        for field, value in changed.items():
+            setattr(self.config, field, value)
+        await self._send("set_music_generation_config", config=self.config)
+        if any(field in RESET_FIELDS for field in changed):
+            await self._send("reset_context")
+            self.stats["resets"] += 1
+
+    def ramp_to(self, prompts, duration):
+        """Moves the prompt weights to `prompts` linearly over `duration` seconds.
+
+        A new ramp replaces one that is still running, starting from the weights already sent.
+
+        Args:
+            prompts (list[types.WeightedPrompt]): The target prompts.
+            duration (float): Length of the transition. 0 applies it at once.
+        """
+        if self._ramp_task is not None and not self._ramp_task.done():
+            self._ramp_task.cancel()
+            self.stats["skipped"] += self._ramp_remaining
+        target = {p.text: p.weight for p in prompts}
+        self._ramp_task = asyncio.create_task(self._ramp(target, duration))
+        return self._ramp_task
+
+    async def set_prompts(self, prompts):
+        """Applies `prompts` immediately."""
+        await self.ramp_to(prompts, 0)
+
+    async def _ramp(self, target, duration):
+        start = dict(self.prompts)
+        steps = max(1, math.ceil(duration * self.ramp_rate))
+        texts = list(dict.fromkeys([*start, *target]))
+        for step in range(1, steps + 1):
+            self._ramp_remaining = steps - step
+            alpha = step / steps
+            weights = {
+                text: (1 - alpha) * start.get(text, 0.0) + alpha * target.get(text, 0.0)
+                for text in texts
+            }
+            weights = {text: round(w, 3) for text, w in weights.items() if abs(w) >= 1e-3}
+            if weights == self.prompts:
+                self.stats["skipped"] += 1
+            else:
+                await self._send(
+                    "set_weighted_prompts",
+                    prompts=[types.WeightedPrompt(text=t, weight=w) for t, w in weights.items()],
+                )
+                self.prompts = weights
+            if step < steps:
+                await asyncio.sleep(1 / self.ramp_rate)
+        self._ramp_remaining = 0
+
+    async def play(self):
+        await self.flush()
+        await self._send("play")
+
+    async def pause(self):
+        await self._send("pause")
+
+    async def stop(self):
+        self.close()
+        await self._send("stop")
+
+    def close(self):
+        """Cancels pending config changes and any running ramp."""
+        for task in (self._flush_task, self._ramp_task):
+            if task is not None:
+                task.cancel()
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Mixes several Lyria RealTime sessions into one output stream.
+
+Each session feeds a `Stem` from the event loop; the audio device pulls mixed blocks from
+`MusicMixer.mix` on its own thread. All stems are locked to one shared timeline: playback
+starts when every stem has pre-rolled, and a stem that runs dry is silent for the frames
+it missed and skips them once its audio arrives, so stems never drift apart.
+
+Run this file to benchmark the mix on a single core:
+
+```
+python -m robotbox.music_mixer
+```
+"""
+
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+from robotbox.playback import RingBuffer
+
+RATE = 48000
+CHANNELS = 2
+
+
+class Stem:
+    """The buffered audio of one music session.
+
+    Args:
+        name (str): Label for the stem.
+        gain (float): Initial linear volume.
+        capacity (float): Buffer size, in seconds.
+    """
+
+    def __init__(self, name, gain=1.0, capacity=10.0):
+        self.name = name
+        self.gain = gain
+        self._ring = RingBuffer(int(capacity * RATE), CHANNELS)
+        self._lock = threading.Lock()
+        self._owed = 0  # Timeline frames missed in an underrun, skipped when audio arrives.
+        self.underruns = 0
+        self.overflow_seconds = 0.0
+
+    def push(self, data):
+        """Adds a chunk of interleaved 16-bit stereo PCM bytes."""
+        frames = np.frombuffer(data, dtype=np.int16).reshape(-1, CHANNELS)
+        with self._lock:
+            self.overflow_seconds += self._ring.write(frames) / RATE
+
+    def buffered(self):
+        """Seconds of audio waiting to be mixed."""
+        with self._lock:
+            return max(0, len(self._ring) - self._owed) / RATE
+
+    def read_into(self, out):
+        """Fills `out` (frames x channels, float32) with the next frames of the timeline."""
+        n = len(out)
+        with self._lock:
+            if self._owed:
+                skipped = min(self._owed, len(self._ring))
+                self._ring.discard(skipped)
+                self._owed -= skipped
+            frames = self._ring.read(n)
+            if len(frames) < n:
+                self._owed += n - len(frames)
+                self.underruns += 1
+        out[:len(frames)] = frames
+        out[len(frames):] = 0
+
+    def clear(self):
+        with self._lock:
+            self._ring.clear()
+            self._owed = 0
+
+
+class MusicMixer:
+    """Sums stems with per-stem gain and a peak limiter into 16-bit stereo.
+
+    Gain changes are spread linearly over one block, so they don't click. The limiter's gain
+    is computed per sample: it falls along a ramp of up to `attack` seconds that ends at
+    each peak needing it, holds for the rest of the block, and recovers from the next block
+    on. Only a peak in the first `attack` seconds of a block gets a steeper drop, as the
+    mixer doesn't delay the output to look ahead.
+
+    Args:
+        preroll (float): Seconds every stem must have buffered before playback starts.
+        ceiling (float): Output peak level the limiter holds, as a fraction of full scale.
+        attack (float): Seconds for the limiter gain to fall from unity to silence; a 6 dB
+            reduction takes half of it.
+        release (float): Seconds for the limiter to recover 63% of the way to unity gain.
+    """
+
+    def __init__(self, preroll=0.5, ceiling=0.9, attack=0.005, release=0.3):
+        self.preroll = preroll
+        self.ceiling = ceiling * 32767
+        self.attack = attack
+        self.release = release
+        self.stems = []
+        self.started = False
+        self.limited_blocks = 0
+        self.clipped_samples = 0
+        self._lock = threading.Lock()
+        self._gains = np.zeros(0, dtype=np.float32)  # Gains applied at the end of the last block.
+        self._limiter_gain = 1.0
+        self._block = np.zeros((0, 0, CHANNELS), dtype=np.float32)
+        self._ramp = np.zeros(0, dtype=np.float32)
+        self._index = np.zeros(0, dtype=np.float32)
+
+    def add_stem(self, name, gain=1.0):
+        stem = Stem(name, gain)
+        with self._lock:
+            self.stems.append(stem)
+            self._gains = np.append(self._gains, np.float32(gain))
+        return stem
+
+    def set_gain(self, index, gain):
+        """Sets the linear volume of a stem. Takes effect over the next block."""
+        self.stems[index].gain = gain
+
+    def _buffers(self, frame_count):
+        if self._block.shape[:2] != (len(self.stems), frame_count):
+            self._block = np.zeros((len(self.stems), frame_count, CHANNELS), dtype=np.float32)
+            self._ramp = np.arange(1, frame_count + 1, dtype=np.float32) / frame_count
+            self._index = np.arange(frame_count, dtype=np.float32)
+        return self._block, self._ramp
+
+    def mix(self, frame_count):
+        """Returns the next `frame_count` frames of the mix as bytes.
+
+        Meant to be called from the audio device's thread.
+        """
+        with self._lock:
+            if not self.started:
+                if not self.stems or min(s.buffered() for s in self.stems) < self.preroll:
+                    return bytes(frame_count * CHANNELS * 2)
+                self.started = True
+
+            block, ramp = self._buffers(frame_count)
+            for stem, out in zip(self.stems, block):
+                stem.read_into(out)
+
+            # Per-stem gain, ramped from the previous block's value: (stems, frames).
+            target = np.array([s.gain for s in self.stems], dtype=np.float32)
+            gains = self._gains[:, None] + (target - self._gains)[:, None] * ramp
+            self._gains = target
+            mixed = np.einsum("sf,sfc->fc", gains, block)
+
+            # Peak limiter, with a gain per sample.
+            needed = np.minimum(1.0, self.ceiling / np.maximum(np.abs(mixed).max(axis=1), 1.0))
+            previous = self._limiter_gain
+            if needed.min() < 1.0 or previous < 1.0:
+                index = self._index
+                # Recovering from the previous block's gain towards unity...
+                recovered = 1.0 - (1.0 - previous) * np.exp(-(index + 1) / (self.release * RATE))
+                # ...but down each peak's attack ramp, the closest gain to unity that is at or
+                # below every later peak's need, reached at a limited slope.
+                slope = 1.0 / (self.attack * RATE)
+                ramps = np.minimum.accumulate((needed + slope * index)[::-1])[::-1] - slope * index
+                # Held once lowered, until the next block.
+                gain = np.minimum(recovered, np.minimum.accumulate(ramps))
+                mixed *= gain[:, None]
+                self._limiter_gain = float(gain[-1])
+                if needed.min() < 1.0:
+                    self.limited_blocks += 1
+
+            # Only a safety net, the limiter keeps peaks below the ceiling.
+            over = np.abs(mixed) > 32767
+            if over.any():
+                self.clipped_samples += int(over.sum())
+                np.clip(mixed, -32767, 32767, out=mixed)
+            return mixed.astype(np.int16).tobytes()
+
+    def stats(self):
+        return {
+            "started": self.started,
+            "limiter_db": round(20 * math.log10(self._limiter_gain), 1),
+            "limited_blocks": self.limited_blocks,
+            "clipped_samples": self.clipped_samples,
+            "stems": {
+                s.name: {
+                    "gain": s.gain,
+                    "buffered_ms": round(s.buffered() * 1000),
+                    "underruns": s.underruns,
+                }
+                for s in self.stems
+            },
+        }
+
+
+def _benchmark(block_frames=1024, seconds=30.0, stem_counts=(1, 2, 4, 8, 16)):
+    """Times `mix` for increasing numbers of stems against the real-time deadline.
+
+    Returns:
+        bool: Whether every stem count's 99th percentile is within the deadline.
+    """
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {min(os.sched_getaffinity(0))})
+    deadline = block_frames / RATE
+    blocks = int(seconds * RATE / block_frames)
+    chunk_frames = 2 * RATE  # Lyria sends chunks of about two seconds.
+    rng = np.random.default_rng(0)
+    chunk = (rng.standard_normal((chunk_frames, CHANNELS)) * 8000).astype(np.int16).tobytes()
+
+    print(f"Block {block_frames} frames, deadline {deadline * 1000:.1f} ms, "
+          f"{seconds:.0f} s per run")
+    print(f"{'stems':>6} {'mean ms':>9} {'p99 ms':>8} {'max ms':>8} {'load %':>8} "
+          f"{'limited':>8} {'clipped':>8}")
+    passed = True
+    for n in stem_counts:
+        mixer = MusicMixer(preroll=0.0)
+        stems = [mixer.add_stem(f"stem {i}", gain=0.8) for i in range(n)]
+        timings = np.empty(blocks)
+        fed = 0
+        for i in range(blocks):
+            # Feed on the same thread, as the chunks would arrive, outside the timed call.
+            while fed < (i + 1) * block_frames:
+                for stem in stems:
+                    stem.push(chunk)
+                fed += chunk_frames
+            if i % 200 == 100:
+                mixer.set_gain(0, 0.3 if mixer.stems[0].gain > 0.5 else 0.8)
+            started = time.perf_counter()
+            mixer.mix(block_frames)
+            timings[i] = time.perf_counter() - started
+        mean, p99, worst = timings.mean(), np.percentile(timings, 99), timings.max()
+        print(f"{n:>6} {mean * 1000:>9.3f} {p99 * 1000:>8.3f} {worst * 1000:>8.3f} "
+              f"{mean / deadline * 100:>8.1f} {mixer.limited_blocks:>8} "
+              f"{mixer.clipped_samples:>8}")
+        if p99 >= deadline:
+            print(f"FAIL {n} stems miss the real-time deadline")
+            passed = False
+    return passed
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if _benchmark() else 1)
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Offline rendering of a Lyria RealTime session to an audio file.
+
+A render script is a JSON file with the length of the piece and a list of timed changes.
+Times are in seconds of rendered audio, not wall-clock time, so the result doesn't depend
+on how fast the server generates:
+
+```
+{
+  "duration": 60,
+  "events": [
+    {"at": 0, "prompts": {"Piano": 1.0}, "bpm": 90, "scale": "C_MAJOR_A_MINOR"},
+    {"at": 20, "prompts": {"Piano": 0.5, "Soft drums": 1.0}, "ramp": 4},
+    {"at": 40, "top_k": 20, "density": "AUTO"}
+  ]
+}
+```
+
+`prompts` replaces the weighted prompts, over `ramp` seconds if given. Every other key is
+a `LiveMusicGenerationConfig` field, with "AUTO" returning it to the model's choice.
+Audio is written to disk chunk by chunk as it arrives, so memory use stays flat no matter
+how long the render is.
+"""
+
+import json
+import time
+import wave
+
+import numpy as np
+from google.genai import types
+
+from robotbox.music_control import MusicControlScheduler
+
+RATE = 48000
+CHANNELS = 2
+
+
+class AudioFileWriter:
+    """Appends 16-bit PCM to a WAV file, or to a FLAC file if `soundfile` is installed.
+
+    Args:
+        path (str): Output file, the format is picked from its extension.
+        rate (int): Sample rate.
+        channels (int): Interleaved channels.
+    """
+
+    def __init__(self, path, rate=RATE, channels=CHANNELS):
+        self.path = path
+        self.channels = channels
+        self.frames = 0
+        if path.lower().endswith(".flac"):
+            try:
+                import soundfile
+            except ImportError as e:
+                raise ImportError("Writing FLAC needs `pip install soundfile`") from e
+            self._wav = None
+            self._flac = soundfile.SoundFile(
+                path, "w", samplerate=rate, channels=channels, format="FLAC", subtype="PCM_16")
+        else:
+            self._flac = None
+            self._wav = wave.open(path, "wb")
+            self._wav.setnchannels(channels)
+            self._wav.setsampwidth(2)
+            self._wav.setframerate(rate)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, data):
+        """Writes interleaved 16-bit PCM bytes."""
+        if self._wav is not None:
+            self._wav.writeframes(data)
+        else:
+            self._flac.write(np.frombuffer(data, dtype=np.int16).reshape(-1, self.channels))
+        self.frames += len(data) // (2 * self.channels)
+
+    def close(self):
+        if self._wav is not None:
+            self._wav.close()
+        else:
+            self._flac.close()
+
+
+def _config_value(field, value):
+    if value == "AUTO":
+        return None
+    if field == "scale":
+        return types.Scale[value]
+    if field == "music_generation_mode":
+        return types.MusicGenerationMode[value]
+    return value
+
+
+def load_render_script(path):
+    """Reads a render script.
+
+    Returns:
+        tuple[float, list[dict]]: The duration in seconds and the events sorted by time.
+    """
+    with open(path) as f:
+        script = json.load(f)
+    events = sorted(script.get("events", []), key=lambda event: event.get("at", 0))
+    fields = set(types.LiveMusicGenerationConfig.model_fields)
+    for event in events:
+        unknown = set(event) - fields - {"at", "prompts", "ramp"}
+        if unknown:
+            raise ValueError(f"Unknown keys in render event {event}: {sorted(unknown)}")
+    return float(script["duration"]), events
+
+
+class _Timeline:
+    """Applies render events as the rendered audio reaches their time."""
+
+    def __init__(self, control, events):
+        self.control = control
+        self.events = list(events)
+        self._ramp = None  # (start weights, target weights, start time, duration)
+
+    async def advance(self, position):
+        """Sends whatever the script asks for up to `position` seconds of audio."""
+        while self.events and self.events[0].get("at", 0) <= position:
+            event = self.events.pop(0)
+            changes = {
+                field: _config_value(field, value)
+                for field, value in event.items() if field not in ("at", "prompts", "ramp")
+            }
+            if changes:
+                self.control.update_config(**changes)
+                await self.control.flush()
+            if "prompts" in event:
+                self._ramp = (dict(self.control.prompts), event["prompts"],
+                              event.get("at", 0), event.get("ramp", 0))
+        if self._ramp is not None:
+            start, target, at, duration = self._ramp
+            alpha = min(1.0, (position - at) / duration) if duration else 1.0
+            weights = {
+                text: (1 - alpha) * start.get(text, 0.0) + alpha * target.get(text, 0.0)
+                for text in dict.fromkeys([*start, *target])
+            }
+            await self.control.set_prompts(
+                [types.WeightedPrompt(text=t, weight=w) for t, w in weights.items()])
+            if alpha >= 1.0:
+                self._ramp = None
+
+
+async def render(session, script_path, output_path, report_every=10.0):
+    """Renders a script to a file as fast as the server produces audio.
+
+    Args:
+        session: A `client.aio.live.music.connect()` session that hasn't started playing.
+        script_path (str): The JSON render script.
+        output_path (str): The WAV or FLAC file to write.
+        report_every (float): Print progress every this many seconds of audio.
+
+    Returns:
+        dict: Audio seconds written, wall-clock seconds and the ratio between them.
+    """
+    duration, events = load_render_script(script_path)
+    # The script is followed exactly, so nothing is merged or rate limited.
+    control = MusicControlScheduler(session, types.LiveMusicGenerationConfig(),
+                                    coalesce_window=0, min_interval=0)
+    timeline = _Timeline(control, events)
+    total_frames = int(duration * RATE)
+    frame_bytes = 2 * CHANNELS
+
+    started = time.perf_counter()
+    await timeline.advance(0.0)
+    await control.play()
+    next_report = report_every
+    with AudioFileWriter(output_path) as writer:
+        async for message in session.receive():
+            if message.filtered_prompt:
+                print("Prompt was filtered out: ", message.filtered_prompt)
+            if not message.server_content:
+                continue
+            for chunk in message.server_content.audio_chunks:
+                remaining = (total_frames - writer.frames) * frame_bytes
+                writer.write(chunk.data[:remaining])
+            position = writer.frames / RATE
+            elapsed = time.perf_counter() - started
+            if position >= next_report:
+                print(f"Rendered {position:.0f} of {duration:.0f} s "
+                      f"({position / elapsed:.1f} s of audio per second)")
+                next_report += report_every
+            if writer.frames >= total_frames:
+                break
+            await timeline.advance(position)
+        await control.stop()
+
+    elapsed = time.perf_counter() - started
+    audio_seconds = writer.frames / RATE
+    return {
+        "audio_seconds": round(audio_seconds, 2),
+        "wall_seconds": round(elapsed, 2),
+        "audio_seconds_per_second": round(audio_seconds / elapsed, 2),
+        "control": control.stats,
+    }
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Packs many small independent prompts into a few `generate_content` calls.
+
+Fanning out one call per photo or per hint pays the per-request overhead every time.
+`PackedGenerator` estimates each item's tokens before sending anything, groups items into
+requests up to a token budget, asks for one structured answer per item, and splits text
+too large for a single request into pieces.
+
+Token estimates come from `TokenEstimator`: text is estimated locally from its length,
+with the characters-per-token ratio calibrated against real `count_tokens` results, and
+everything else (images, videos) is counted once with `count_tokens` and cached.
+"""
+
+import collections
+import hashlib
+import json
+
+import pydantic
+from google.genai import types
+
+# Tokens for the <item> markers and per-item bookkeeping around each packed item.
+ITEM_OVERHEAD = 12
+
+
+def _key(parts):
+    canonical = []
+    for part in parts:
+        if isinstance(part, str):
+            canonical.append(part)
+        elif isinstance(part, types.File):
+            canonical.append({"file": part.sha256_hash or part.uri})
+        elif isinstance(part, pydantic.BaseModel):
+            canonical.append(part.model_dump(mode="json", exclude_none=True))
+        else:
+            canonical.append(repr(part))
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True).encode()).hexdigest()
+
+
+class TokenEstimator:
+    """Estimates prompt tokens, calling `count_tokens` only where it has to.
+
+    Args:
+        client (genai.Client): Used for `count_tokens`.
+        model (str): The model the prompts are for.
+        chars_per_token (float): Starting ratio for local text estimates.
+        cache_size (int): Exact counts kept, least recently used first out.
+    """
+
+    def __init__(self, client, model, chars_per_token=4.0, cache_size=4096):
+        self.client = client
+        self.model = model
+        self.chars_per_token = chars_per_token
+        self.cache_size = cache_size
+        self.stats = {"count_tokens_calls": 0, "cache_hits": 0}
+        self._counts = collections.OrderedDict()
+
+    def count(self, parts):
+        """The exact token count of `parts`, from cache or `count_tokens`."""
+        key = _key(parts)
+        if key in self._counts:
+            self._counts.move_to_end(key)
+            self.stats["cache_hits"] += 1
+            return self._counts[key]
+        tokens = self.client.models.count_tokens(model=self.model, contents=parts).total_tokens
+        self.stats["count_tokens_calls"] += 1
+        self._counts[key] = tokens
+        if len(self._counts) > self.cache_size:
+            self._counts.popitem(last=False)
+        if all(isinstance(part, str) for part in parts):
+            self.observe(parts, tokens)
+        return tokens
+
+    def _media_tokens(self, parts):
+        # Counted one part at a time, so each image is counted once whatever it's sent with.
+        return sum(self.count([part]) for part in parts if not isinstance(part, str))
+
+    def estimate(self, parts):
+        """A fast estimate: local for text, cached `count_tokens` for anything else."""
+        text = sum(len(part) for part in parts if isinstance(part, str))
+        return int(text / self.chars_per_token) + 1 + self._media_tokens(parts)
+
+    def observe(self, parts, tokens):
+        """Calibrates the text estimate with the real token count of `parts`."""
+        text = sum(len(part) for part in parts if isinstance(part, str))
+        text_tokens = tokens - self._media_tokens(parts)
+        if text and text_tokens > 0:
+            # Weighted towards recent observations.
+            self.chars_per_token = 0.8 * self.chars_per_token + 0.2 * text / text_tokens
+
+
+class PackedAnswer(pydantic.BaseModel):
+    id: str
+    answer: str
+
+
+def _split_text(text, max_tokens, chars_per_token):
+    """Splits text into pieces of about `max_tokens`, at paragraph or line breaks if possible."""
+    limit = max(1, int(max_tokens * chars_per_token))
+    pieces = []
+    while len(text) > limit:
+        cut = max(text.rfind("\n\n", 0, limit), text.rfind("\n", 0, limit))
+        if cut <= limit // 2:
+            cut = text.rfind(" ", 0, limit)
+        if cut <= limit // 2:
+            cut = limit
+        pieces.append(text[:cut])
+        text = text[cut:].lstrip()
+    if text:
+        pieces.append(text)
+    return pieces
+
+
+class PackedGenerator:
+    """Answers one instruction for many items in as few calls as the token budget allows.
+
+    Args:
+        client (genai.Client): The client to call.
+        model (str): The model to use.
+        instruction (str): What to do with each item, e.g. "Describe the wiring in the photo".
+        budget (int): Maximum prompt tokens per request.
+        max_items (int): Maximum items per request, which also bounds the answer length.
+        estimator (TokenEstimator): Defaults to a new estimator for `model`.
+    """
+
+    def __init__(self, client, model, instruction, budget=8000, max_items=20, estimator=None):
+        self.client = client
+        self.model = model
+        self.instruction = instruction
+        self.budget = budget
+        self.max_items = max_items
+        self.estimator = estimator or TokenEstimator(client, model)
+        self.stats = {"items": 0, "calls": 0, "prompt_tokens": 0, "split_items": 0,
+                      "fallbacks": 0}
+        self._overhead = self.estimator.estimate([self._header()])
+
+    def _header(self):
+        return (f"{self.instruction}\n\nAnswer every item below separately. Items are between "
+                "<item id=...> and </item> markers; return one answer per item id.")
+
+    def _plan(self, items):
+        """Groups `(id, parts)` pairs into requests. Oversized text is split into pieces."""
+        groups, group, used = [], [], self._overhead
+        room = self.budget - self._overhead - ITEM_OVERHEAD
+        for item_id, parts in items:
+            tokens = self.estimator.estimate(parts) + ITEM_OVERHEAD
+            if tokens - ITEM_OVERHEAD > room and all(isinstance(p, str) for p in parts):
+                self.stats["split_items"] += 1
+                pieces = _split_text("\n".join(parts), room, self.estimator.chars_per_token)
+                groups.extend(
+                    [[(item_id, [piece], self.estimator.estimate([piece]))] for piece in pieces])
+                continue
+            if group and (used + tokens > self.budget or len(group) == self.max_items):
+                groups.append(group)
+                group, used = [], self._overhead
+            group.append((item_id, parts, tokens))
+            used += tokens
+        if group:
+            groups.append(group)
+        return groups
+
+    def _call(self, contents, config=None):
+        response = self.client.models.generate_content(
+            model=self.model, contents=contents, config=config)
+        self.stats["calls"] += 1
+        if response.usage_metadata and response.usage_metadata.prompt_token_count:
+            self.stats["prompt_tokens"] += response.usage_metadata.prompt_token_count
+            self.estimator.observe(contents, response.usage_metadata.prompt_token_count)
+        return response
+
+    def _run_single(self, parts):
+        return self._call([self.instruction, *parts]).text
+
+    def _run_oversized(self, item_id, parts):
+        """Answers an item found, on an exact count, not to fit the budget on its own."""
+        if not all(isinstance(part, str) for part in parts):
+            # Media can't be split; send it alone and let the API decide.
+            return [(item_id, self._run_single(parts))]
+        self.stats["split_items"] += 1
+        text = "\n".join(parts)
+        # Split at this text's exact ratio, as the running estimate was what misjudged it.
+        chars_per_token = len(text) / max(1, self.estimator.count([text]))
+        room = self.budget - len(self.instruction) / chars_per_token - ITEM_OVERHEAD
+        pieces = _split_text(text, max(1, room), chars_per_token)
+        return [(item_id, self._run_single([piece])) for piece in pieces]
+
+    def _run_group(self, group):
+        if not group:
+            return []
+        contents = [self._header()]
+        for item_id, parts, _ in group:
+            contents += [f"<item id={item_id}>", *parts, "</item>"]
+        # Estimates can be off near the limit, so check those groups exactly.
+        estimated = self._overhead + sum(tokens for *_, tokens in group)
+        if estimated > 0.9 * self.budget and self.estimator.count(contents) > self.budget:
+            if len(group) == 1:
+                return self._run_oversized(*group[0][:2])
+            half = len(group) // 2
+            return self._run_group(group[:half]) + self._run_group(group[half:])
+
+        response = self._call(contents, types.GenerateContentConfig(
+            response_mime_type="application/json", response_schema=list[PackedAnswer]))
+        answers = {a.id: a.answer for a in (response.parsed or [])}
+        results = []
+        for item_id, parts, _ in group:
+            if str(item_id) not in answers:
+                # The model skipped or mangled this item, ask for it on its own.
+                self.stats["fallbacks"] += 1
+                results.append((item_id, self._run_single(parts)))
+            else:
+                results.append((item_id, answers[str(item_id)]))
+        return results
+
+    def run(self, items):
+        """Answers the instruction for every item.
+
+        Args:
+            items (list[tuple]): `(id, contents)` pairs, where contents is a string or a
+                list of parts (strings, uploaded `types.File`s, ...). Ids must be unique.
+
+        Returns:
+            dict: Id -> answer text. Answers for split items are joined in order.
+        """
+        items = [(item_id, [c] if isinstance(c, str) else list(c)) for item_id, c in items]
+        self.stats["items"] += len(items)
+        answers = collections.defaultdict(list)
+        for group in self._plan(items):
+            if len(group) == 1:
+                item_id, parts, tokens = group[0]
+                # As in `_run_group`, an estimate near the limit is checked exactly.
+                if (tokens > 0.9 * self.budget
+                        and self.estimator.count([self.instruction, *parts]) > self.budget):
+                    results = self._run_oversized(item_id, parts)
+                else:
+                    results = [(item_id, self._run_single(parts))]
+            else:
+                results = self._run_group(group)
+            for item_id, answer in results:
+                answers[item_id].append(answer)
+        return {item_id: "\n\n".join(answers[item_id]) for item_id, _ in items}
+
+    def report(self):
+        """Calls saved compared to one call per item, and prompt tokens per call."""
+        calls = self.stats["calls"]
+        return {
+            **self.stats,
+            "calls_saved": self.stats["items"] - calls,
+            "tokens_per_call": round(self.stats["prompt_tokens"] / calls) if calls else 0,
+            **self.estimator.stats,
+            "chars_per_token": round(self.estimator.chars_per_token, 2),
+        }
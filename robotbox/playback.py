@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Audio playback buffers that keep the asyncio loop free of blocking device writes.
+
+The network side pushes PCM into a `JitterBuffer` from the event loop; the audio device
+pulls from it on its own thread (for example through a PyAudio `stream_callback`). The
+buffer sizes its pre-roll from how irregularly chunks actually arrive.
+"""
+
+import collections
+import threading
+import time
+
+import numpy as np
+
+
+class RingBuffer:
+    """A fixed-size FIFO of audio frames backed by a preallocated NumPy array.
+
+    Not thread-safe on its own, callers hold a lock.
+
+    Args:
+        capacity (int): Maximum number of frames held.
+        channels (int): Samples per frame.
+        dtype: Sample type.
+    """
+
+    def __init__(self, capacity, channels=1, dtype=np.int16):
+        self._data = np.zeros((capacity, channels), dtype=dtype)
+        self._start = 0
+        self._size = 0
+
+    @property
+    def capacity(self):
+        return len(self._data)
+
+    def __len__(self):
+        return self._size
+
+    def write(self, frames):
+        """Appends frames, overwriting the oldest ones if the buffer is full.
+
+        Returns:
+            int: The number of frames that were overwritten.
+        """
+        capacity = self.capacity
+        if len(frames) > capacity:
+            frames = frames[-capacity:]
+        n = len(frames)
+        overwritten = max(0, self._size + n - capacity)
+        if overwritten:
+            self.discard(overwritten)
+        end = (self._start + self._size) % capacity
+        first = min(n, capacity - end)
+        self._data[end:end + first] = frames[:first]
+        self._data[:n - first] = frames[first:]
+        self._size += n
+        return overwritten
+
+    def read(self, n):
+        """Removes and returns up to `n` frames."""
+        n = min(n, self._size)
+        capacity = self.capacity
+        first = min(n, capacity - self._start)
+        out = np.concatenate((self._data[self._start:self._start + first], self._data[:n - first]))
+        self.discard(n)
+        return out
+
+    def discard(self, n):
+        """Drops up to `n` of the oldest frames."""
+        n = min(n, self._size)
+        self._start = (self._start + n) % self.capacity
+        self._size -= n
+
+    def clear(self):
+        self._start = 0
+        self._size = 0
+
+
+class JitterBuffer:
+    """An adaptive playout buffer for a stream of PCM chunks.
+
+    Every pushed chunk is timestamped. The spread between how late and how early recent
+    chunks arrived, compared to a steady real-time stream, is the jitter the buffer has to
+    absorb, so playback (re)starts once that much audio is buffered. When the buffer runs
+    dry it counts an underrun and pre-rolls again; when the network catches up and the
+    buffer holds much more than needed, the excess is trimmed to bring latency back down.
+
+    Args:
+        rate (int): Sample rate.
+        channels (int): Interleaved channels.
+        min_delay (float): Lower bound for the target delay, in seconds.
+        max_delay (float): Upper bound for the target delay, in seconds.
+        capacity (float): Ring buffer size, in seconds.
+        window (int): Number of recent chunks the jitter estimate is based on.
+    """
+
+    def __init__(self, rate, channels=1, min_delay=0.05, max_delay=2.0, capacity=10.0, window=64):
+        self.rate = rate
+        self.channels = channels
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self._ring = RingBuffer(int(capacity * rate), channels)
+        self._lock = threading.Lock()
+        self._transits = collections.deque(maxlen=window)
+        self._chunk_seconds = collections.deque(maxlen=window)
+        self._received = 0.0
+        self._first_arrival = None
+        self._buffering = True
+        self.target_delay = min_delay
+        self.underruns = 0
+        self.trimmed_seconds = 0.0
+        self.overflow_seconds = 0.0
+
+    def push(self, data):
+        """Adds a chunk of interleaved 16-bit PCM bytes. Never blocks on the device."""
+        frames = np.frombuffer(data, dtype=np.int16).reshape(-1, self.channels)
+        now = time.monotonic()
+        with self._lock:
+            if self._first_arrival is None:
+                self._first_arrival = now
+            # How far behind a perfectly steady stream this chunk arrived.
+            self._transits.append((now - self._first_arrival) - self._received)
+            seconds = len(frames) / self.rate
+            self._received += seconds
+            self._chunk_seconds.append(seconds)
+            spread = max(self._transits) - min(self._transits)
+            self.target_delay = min(self.max_delay, max(self.min_delay, spread + self.min_delay))
+            self.overflow_seconds += self._ring.write(frames) / self.rate
+
+    def read(self, frame_count):
+        """Returns exactly `frame_count` frames as bytes, padding with silence if needed.
+
+        Meant to be called from the audio device's thread.
+        """
+        out = np.zeros((frame_count, self.channels), dtype=np.int16)
+        with self._lock:
+            level = len(self._ring) / self.rate
+            if self._buffering:
+                if level < self.target_delay:
+                    return out.tobytes()
+                self._buffering = False
+
+            # A chunk arriving refills the buffer by its own length, so only trim what's
+            # beyond the target plus the largest recent chunk.
+            excess = level - self.target_delay - max(self._chunk_seconds, default=0.0) - 0.25
+            if excess > 0:
+                self._ring.discard(int(excess * self.rate))
+                self.trimmed_seconds += excess
+
+            frames = self._ring.read(frame_count)
+            out[:len(frames)] = frames
+            if len(frames) < frame_count:
+                self.underruns += 1
+                self._buffering = True
+        return out.tobytes()
+
+    def clear(self):
+        """Drops everything buffered, for example when the stream is reset."""
+        with self._lock:
+            self._ring.clear()
+            self._buffering = True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "buffered_ms": round(len(self._ring) / self.rate * 1000),
+                "target_ms": round(self.target_delay * 1000),
+                "underruns": self.underruns,
+                "trimmed_ms": round(self.trimmed_seconds * 1000),
+                "overflow_ms": round(self.overflow_seconds * 1000),
+            }
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Streaming polyphase sample-rate conversion for the Live API audio handlers.
+
+The Live API takes 16 kHz PCM in and sends 24 kHz PCM back, but microphones, speakers and
+browsers all have their own native rates. Every handler converts through `StreamResampler`
+so that capture and playback can run at whatever rate the device prefers.
+
+## Benchmark
+
+To check accuracy and throughput, run (exits non-zero if accuracy regresses):
+
+```
+python -m robotbox.resample
+```
+"""
+
+import math
+import time
+
+import numpy as np
+
+# Rate the Live API expects for input audio.
+SEND_SAMPLE_RATE = 16000
+# Rate of the audio the Live API sends back.
+RECEIVE_SAMPLE_RATE = 24000
+
+
+class StreamResampler:
+    """Converts a stream of PCM chunks from one sample rate to another.
+
+    The filter state is kept between calls, so chunk boundaries don't produce clicks and
+    splitting the same signal into different chunk sizes produces the same output.
+
+    Args:
+        input_rate (int): Sample rate of the incoming audio.
+        output_rate (int): Sample rate of the produced audio.
+        channels (int): Number of interleaved channels.
+        zero_crossings (int): Half-width of the windowed-sinc filter, in zero crossings of
+            the lower of the two rates. Higher is sharper but slower.
+        rolloff (float): Cutoff as a fraction of the lower Nyquist frequency.
+    """
+
+    def __init__(self, input_rate, output_rate, channels=1, zero_crossings=8, rolloff=0.9):
+        self.input_rate = int(input_rate)
+        self.output_rate = int(output_rate)
+        self.channels = channels
+
+        g = math.gcd(self.input_rate, self.output_rate)
+        self.up = self.output_rate // g
+        self.down = self.input_rate // g
+
+        # Taps per polyphase branch, in input samples.
+        self.taps = 2 * zero_crossings * max(self.up, self.down) // self.up + 1
+        length = self.taps * self.up
+        cutoff = rolloff * 0.5 / max(self.up, self.down)
+        n = np.arange(length) - (length - 1) / 2
+        h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, 8.0) * self.up
+        # filters[p, k] weighs input sample (i - k) for an output at upsampled phase p.
+        self.filters = h.reshape(self.taps, self.up).T.astype(np.float32)
+        self.reset()
+
+    @property
+    def passthrough(self):
+        return self.up == self.down
+
+    def reset(self):
+        """Forgets the filter history, for example after an interruption."""
+        self._history = np.zeros((self.taps - 1, self.channels), dtype=np.float32)
+        self._next = 0
+
+    def process(self, chunk):
+        """Resamples a chunk of samples.
+
+        Args:
+            chunk (np.ndarray): Samples shaped `(n,)` or `(n, channels)`, int16 or float.
+
+        Returns:
+            np.ndarray: The resampled samples, with the same dtype and layout as `chunk`.
+        """
+        if self.passthrough:
+            return chunk
+
+        dtype = chunk.dtype
+        x = chunk.reshape(len(chunk), self.channels).astype(np.float32)
+        x_ext = np.concatenate((self._history, x))
+        total = len(x) * self.up
+
+        positions = np.arange(self._next, total, self.down)
+        if len(positions):
+            index = positions // self.up + self.taps - 1
+            phase = positions % self.up
+            windows = x_ext[index[:, None] - np.arange(self.taps)]
+            y = np.einsum("ok,okc->oc", self.filters[phase], windows)
+            self._next = positions[-1] + self.down - total
+        else:
+            y = np.zeros((0, self.channels), dtype=np.float32)
+            self._next -= total
+        self._history = x_ext[len(x_ext) - (self.taps - 1):]
+
+        if np.issubdtype(dtype, np.integer):
+            info = np.iinfo(dtype)
+            y = np.clip(np.rint(y), info.min, info.max)
+        y = y.astype(dtype)
+        return y.reshape(-1) if chunk.ndim == 1 else y
+
+    def process_bytes(self, data):
+        """Resamples a chunk of interleaved 16-bit PCM bytes."""
+        if self.passthrough:
+            return data
+        samples = np.frombuffer(data, dtype=np.int16).reshape(-1, self.channels)
+        return self.process(samples).tobytes()
+
+
+def _benchmark(min_snr_db=60.0):
+    """Checks accuracy and chunking invariance, and times each conversion.
+
+    Returns:
+        bool: Whether every conversion is above `min_snr_db` and chunking invariant.
+    """
+    passed = True
+    rng = np.random.default_rng(0)
+    conversions = [(48000, SEND_SAMPLE_RATE), (44100, SEND_SAMPLE_RATE), (RECEIVE_SAMPLE_RATE, 48000),
+                   (RECEIVE_SAMPLE_RATE, 44100)]
+    for input_rate, output_rate in conversions:
+        # Accuracy: a 440 Hz tone should come out as the same tone, whatever the chunking.
+        seconds = 2
+        t = np.arange(input_rate * seconds) / input_rate
+        tone = (10000 * np.sin(2 * np.pi * 440 * t)).astype(np.int16)
+        whole = StreamResampler(input_rate, output_rate).process(tone)
+        chunked = StreamResampler(input_rate, output_rate)
+        sizes = rng.integers(1, 2048, size=len(tone))
+        bounds = np.cumsum(sizes)
+        bounds = np.concatenate(([0], bounds[bounds < len(tone)], [len(tone)]))
+        pieces = [chunked.process(tone[a:b]) for a, b in zip(bounds[:-1], bounds[1:])]
+        same = np.array_equal(whole, np.concatenate(pieces))
+
+        resampler = StreamResampler(input_rate, output_rate)
+        delay = (resampler.taps * resampler.up - 1) / 2 / (input_rate * resampler.up)
+        t_out = np.arange(len(whole)) / output_rate - delay
+        expected = 10000 * np.sin(2 * np.pi * 440 * t_out)
+        settled = slice(output_rate // 10, len(whole) - output_rate // 10)
+        error = whole[settled] - expected[settled]
+        snr = 10 * np.log10(np.mean(expected[settled] ** 2) / np.mean(error ** 2))
+
+        # Throughput: 20 ms chunks, as a microphone callback would deliver them.
+        chunk = (rng.standard_normal(input_rate // 50) * 3000).astype(np.int16)
+        n_chunks = 2000
+        start = time.perf_counter()
+        for _ in range(n_chunks):
+            resampler.process(chunk)
+        elapsed = time.perf_counter() - start
+        realtime = n_chunks * 0.02 / elapsed
+
+        ok = snr > min_snr_db and same
+        passed = passed and ok
+        print(f"{'PASS' if ok else 'FAIL'} {input_rate:>6} -> {output_rate:<6} SNR {snr:5.1f} dB, chunking invariant: {same}, "
+              f"{realtime:,.0f}x real time")
+    return passed
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if _benchmark() else 1)
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+An on-disk cache of `generate_content` responses.
+
+Requests are keyed by a SHA-256 over a canonical form of the model name, the generation
+config and the contents. Uploaded files are keyed by their content hash rather than their
+URI, so the same photo uploaded twice still hits. Entries live in SQLite, compressed, and
+the least recently used ones are evicted once the cache outgrows its size limit.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+import pydantic
+from google.genai import types
+
+# Response fields that describe the HTTP exchange rather than the answer.
+_UNCACHED_FIELDS = {"sdk_http_response", "automatic_function_calling_history"}
+
+
+def _is_sampled(config):
+    """Whether a config leaves sampling free to give different answers each time."""
+    if config is None:
+        return True
+    if isinstance(config, dict):
+        config = types.GenerateContentConfig.model_validate(config)
+    return config.seed is None and (config.temperature is None or config.temperature > 0)
+
+
+class ResponseCache:
+    """A size-bounded LRU store of responses, shared safely between threads.
+
+    Args:
+        path (str): SQLite database file, created if needed.
+        max_bytes (int): Total size of the stored (compressed) responses to keep.
+        ttl (float): Seconds after which an entry is stale, or None to keep entries
+            until they are evicted.
+        file_hashes (callable): Returns the content hash for an uploaded file URI, or
+            None. For example `UploadIndex.sha256_for_uri` from `robotbox.uploads`.
+    """
+
+    def __init__(self, path, max_bytes=256 << 20, ttl=None, file_hashes=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.file_hashes = file_hashes
+        self.stats = {"hits": 0, "misses": 0, "bypassed": 0, "evicted": 0}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, value BLOB, size INTEGER, created REAL, used REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_used ON responses (used)")
+        self._size = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    @property
+    def size(self):
+        return self._size
+
+    def hit_rate(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+    def _canonical(self, value):
+        if isinstance(value, types.File):
+            return {"file": value.sha256_hash or value.uri}
+        if isinstance(value, pydantic.BaseModel):
+            value = value.model_dump(mode="json", exclude_none=True)
+        elif isinstance(value, bytes):
+            return {"bytes": hashlib.sha256(value).hexdigest()}
+        elif hasattr(value, "tobytes") and hasattr(value, "mode"):  # A PIL image.
+            return {"image": hashlib.sha256(value.tobytes()).hexdigest(),
+                    "mode": value.mode, "size": list(value.size)}
+        if isinstance(value, dict):
+            file_data = value.get("file_data")
+            if file_data and self.file_hashes:
+                sha256 = self.file_hashes(file_data.get("file_uri"))
+                if sha256:
+                    value = {**value, "file_data": {**file_data, "file_uri": sha256}}
+            return {k: self._canonical(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self._canonical(v) for v in value]
+        return value
+
+    def key(self, model, contents, config=None):
+        """The cache key for a request."""
+        if isinstance(config, pydantic.BaseModel):
+            config = config.model_dump(mode="json", exclude_none=True, exclude={"http_options"})
+        elif isinstance(config, dict):
+            config = {k: v for k, v in config.items() if k != "http_options"}
+        canonical = {
+            "model": model.removeprefix("models/"),
+            "config": self._canonical(config or {}),
+            "contents": self._canonical(contents),
+        }
+        text = json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                self._delete(key)
+                row = None
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            with self._db:
+                self._db.execute("UPDATE responses SET used = ? WHERE key = ?", (now, key))
+            self.stats["hits"] += 1
+        return types.GenerateContentResponse.model_validate_json(zlib.decompress(row[0]))
+
+    def put(self, key, response):
+        """Stores a response. Only complete responses should be stored, not blocked ones."""
+        value = zlib.compress(
+            response.model_dump_json(exclude_none=True, exclude=_UNCACHED_FIELDS).encode())
+        now = time.time()
+        with self._lock:
+            self._delete(key)
+            with self._db:
+                self._db.execute(
+                    "INSERT INTO responses VALUES (?, ?, ?, ?, ?)",
+                    (key, value, len(value), now, now))
+            self._size += len(value)
+            self._evict()
+
+    def _delete(self, key):
+        row = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            with self._db:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._size -= row[0]
+
+    def _evict(self):
+        while self._size > self.max_bytes:
+            rows = self._db.execute(
+                "SELECT key, size FROM responses ORDER BY used LIMIT 64").fetchall()
+            if not rows:
+                break
+            evicted = []
+            for key, size in rows:
+                if self._size <= self.max_bytes:
+                    break
+                evicted.append((key,))
+                self._size -= size
+            with self._db:
+                self._db.executemany("DELETE FROM responses WHERE key = ?", evicted)
+            self.stats["evicted"] += len(evicted)
+
+
+class CachedModels:
+    """`client.models.generate_content` with responses served from a `ResponseCache`.
+
+    Args:
+        client (genai.Client): The client to call on a miss.
+        cache (ResponseCache): Where responses are kept.
+        deterministic_only (bool): Only cache requests whose config pins the output
+            (temperature 0 or a seed). Leave False to reuse whatever answer came first.
+    """
+
+    def __init__(self, client, cache, deterministic_only=False):
+        self.client = client
+        self.cache = cache
+        self.deterministic_only = deterministic_only
+
+    def _key(self, model, contents, config, bypass):
+        if bypass is None:
+            bypass = self.deterministic_only and _is_sampled(config)
+        if bypass:
+            self.cache.stats["bypassed"] += 1
+            return None
+        return self.cache.key(model, contents, config)
+
+    def generate_content(self, *, model, contents, config=None, bypass=None):
+        """Like `client.models.generate_content`.
+
+        Args:
+            bypass (bool): True to always call the API (the response isn't stored either),
+                False to always use the cache, None to decide from `deterministic_only`.
+        """
+        key = self._key(model, contents, config, bypass)
+        if key is not None and (response := self.cache.get(key)) is not None:
+            return response
+        response = self.client.models.generate_content(
+            model=model, contents=contents, config=config)
+        if key is not None and response.candidates:
+            self.cache.put(key, response)
+        return response
+
+    async def agenerate_content(self, *, model, contents, config=None, bypass=None):
+        """Like `client.aio.models.generate_content`."""
+        key = self._key(model, contents, config, bypass)
+        if key is not None and (response := self.cache.get(key)) is not None:
+            return response
+        response = await self.client.aio.models.generate_content(
+            model=model, contents=contents, config=config)
+        if key is not None and response.candidates:
+            self.cache.put(key, response)
+        return response
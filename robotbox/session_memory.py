@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Keeps long tutoring sessions inside the Live API's context window.
+
+A lab session of 45 minutes of audio plus video outgrows the context window. `live_config`
+turns on the server's sliding-window compression, which drops the oldest turns once the
+context passes a trigger size, and session resumption, so a connection the server closes
+can be picked up again.
+
+What compression drops is gone for the model, so `RollingSummary` keeps a client-side
+summary of the conversation, built from the transcripts in the background with a text
+model. When a session is replaced by a new one, because there is no resumption handle or
+the server refused it, `inject` hands the model that summary and the latest exchanges, so
+the tutor still knows what the student already did. A resumed session already has its
+context and must not be given it again.
+"""
+
+import asyncio
+
+from google.genai import types
+
+# Compression starts once the context holds this many tokens...
+DEFAULT_TRIGGER_TOKENS = 32000
+# ...and drops the oldest turns until this many are left.
+DEFAULT_TARGET_TOKENS = 16000
+SUMMARY_MODEL = "gemini-2.5-flash"
+SUMMARY_PROMPT = """\
+You keep notes for a robotics tutor during a lab session with a student. Update the notes
+with the conversation below. Record what the student built and wired, problems they hit
+and how they were solved, what they understood, and anything still open. Write at most
+200 words of plain prose in the third person. Return only the notes.
+
+Current notes:
+{summary}
+
+Conversation since then:
+{turns}
+"""
+
+
+def live_config(config, trigger_tokens=DEFAULT_TRIGGER_TOKENS,
+                target_tokens=DEFAULT_TARGET_TOKENS, handle=None):
+    """Returns a copy of a Live config dict with compression and resumption turned on.
+
+    Args:
+        config (dict): The session config.
+        trigger_tokens (int): Context size at which the oldest turns start being dropped,
+            or None to leave compression off.
+        target_tokens (int): Context size compression cuts back to.
+        handle (str): A resumption handle from an earlier connection, to continue that
+            session instead of starting a new one.
+    """
+    config = dict(config)
+    if trigger_tokens:
+        config["context_window_compression"] = types.ContextWindowCompressionConfig(
+            trigger_tokens=trigger_tokens,
+            sliding_window=types.SlidingWindow(target_tokens=target_tokens),
+        )
+    config["session_resumption"] = types.SessionResumptionConfig(handle=handle)
+    return config
+
+
+class RollingSummary:
+    """A summary of the earlier conversation plus the latest exchanges, verbatim.
+
+    Feed it utterances with `add` (`SessionTranscript` does this when given one). Once
+    more than `summarize_chars` of text is waiting beyond the verbatim tail, the older part
+    is folded into the summary by a background model call, so `add` never waits.
+
+    Args:
+        client (genai.Client): Used for the summary calls.
+        model (str): The text model that writes the summary.
+        recent_chars (int): Latest conversation kept word for word.
+        summarize_chars (int): Older text gathered before a summary call is made.
+    """
+
+    def __init__(self, client, model=SUMMARY_MODEL, recent_chars=3000, summarize_chars=6000):
+        self.client = client
+        self.model = model
+        self.recent_chars = recent_chars
+        self.summarize_chars = summarize_chars
+        self.summary = ""
+        self.turns = []  # (role, text) not yet in the summary, oldest first.
+        self.stats = {"summaries": 0, "failures": 0, "injections": 0}
+        self._task = None
+
+    def add(self, role, text):
+        self.turns.append((role, text))
+        if self._task is None or self._task.done():
+            older = self._older()
+            if sum(len(text) for _, text in older) >= self.summarize_chars:
+                try:
+                    self._task = asyncio.get_running_loop().create_task(self._fold(older))
+                except RuntimeError:
+                    pass  # No event loop, e.g. while seeding; the next add will summarize.
+
+    def seed(self, utterances):
+        """Adds earlier utterances, e.g. `TranscriptStore.utterances` of a session being
+        continued."""
+        for utterance in utterances:
+            self.add(utterance["role"], utterance["text"])
+
+    def _older(self):
+        """The turns before the verbatim tail."""
+        kept = 0
+        for i in range(len(self.turns) - 1, -1, -1):
+            kept += len(self.turns[i][1])
+            if kept > self.recent_chars:
+                return self.turns[:i + 1]
+        return []
+
+    async def _fold(self, older):
+        turns = "\n".join(f"{role}: {text}" for role, text in older)
+        prompt = SUMMARY_PROMPT.format(summary=self.summary or "(none yet)", turns=turns)
+        try:
+            response = await self.client.aio.models.generate_content(
+                model=self.model, contents=prompt)
+        except Exception:
+            # Keep the turns; the next add tries again.
+            self.stats["failures"] += 1
+            return
+        if response.text:
+            self.summary = response.text.strip()
+            # Turns added meanwhile are after `older`, so drop exactly those summarized.
+            self.turns = self.turns[len(older):]
+            self.stats["summaries"] += 1
+
+    def context(self):
+        """The text handed to a resumed or new session."""
+        parts = []
+        if self.summary:
+            parts.append(f"Notes on the session so far:\n{self.summary}")
+        recent, size = [], 0
+        # Turns not summarized yet, bounded in case summary calls keep failing.
+        for role, text in reversed(self.turns):
+            size += len(text)
+            if recent and size > self.recent_chars + self.summarize_chars:
+                break
+            recent.insert(0, f"{role}: {text}")
+        if recent:
+            parts.append("Latest exchanges:\n" + "\n".join(recent))
+        return "\n\n".join(parts)
+
+    async def inject(self, session):
+        """Sends the summary to a new session as context, without asking for a reply.
+
+        Only for a fresh connection: a resumed one already has this context, and sending it
+        again after every reconnect would pile up copies.
+        """
+        context = self.context()
+        if not context:
+            return
+        await session.send_client_content(
+            turns=types.Content(role="user", parts=[types.Part(text=(
+                "(Context, not a question: this lab session was reconnected. "
+                f"Carry on from here.)\n\n{context}"))]),
+            turn_complete=False,
+        )
+        self.stats["injections"] += 1
+
+    async def aclose(self):
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
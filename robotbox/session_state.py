@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+State objects for the Streamlit app.
+
+Streamlit re-executes `app.py` on every widget interaction, so anything defined there is
+rebuilt on each rerun. The classes here are imported once per process; the app keeps one
+`FrameBuffer` per browser session in `st.session_state` and one `RunTimer` per process.
+"""
+
+import statistics
+import threading
+import time
+
+
+class FrameBuffer:
+    """The latest camera frame of one browser session.
+
+    `callback` runs on the WebRTC worker thread, the tutor session reads with `latest`.
+
+    Args:
+        format (str): Pixel format kept. "yuv420p" is the decoder's own, so keeping it
+            skips the colour conversion on this thread; `MediaWorkers` converts instead.
+    """
+
+    def __init__(self, format="bgr24"):
+        self.format = format
+        self._lock = threading.Lock()
+        self._frame = None
+
+    def callback(self, frame):
+        img = frame.to_ndarray(format=self.format)
+        with self._lock:
+            self._frame = img
+        return frame
+
+    def latest(self):
+        """Returns the latest frame as an array in `format`, or None before the first one."""
+        with self._lock:
+            return self._frame
+
+
+class RunTimer:
+    """Keeps the duration of the app's first (cold) script run and of later reruns."""
+
+    def __init__(self, history=100):
+        self.cold_start = None
+        self.reruns = []
+        self.history = history
+        self._lock = threading.Lock()
+
+    def record(self, started):
+        """Records a script run that began at `started` (a `time.perf_counter()` value)."""
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            if self.cold_start is None:
+                self.cold_start = elapsed
+            else:
+                self.reruns = self.reruns[-(self.history - 1):] + [elapsed]
+        return elapsed
+
+    def summary(self):
+        with self._lock:
+            if self.cold_start is None:
+                return "No runs recorded yet"
+            text = f"Cold start {self.cold_start * 1000:.0f} ms"
+            if self.reruns:
+                text += (f" · last rerun {self.reruns[-1] * 1000:.0f} ms"
+                         f" · median rerun {statistics.median(self.reruns) * 1000:.0f} ms")
+            return text
@@ -0,0 +1,414 @@
+# -*- coding: utf-8 -*-
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Local stand-ins for the Gemini API endpoints, for load tests and offline runs.
+
+`StandInLiveServer` speaks enough of the Live API WebSocket protocol for the voice handlers:
+it acknowledges the setup message and answers every chunk of input audio with the same
+duration of 24 kHz model audio. `StandInMusicServer` does the same for Lyria RealTime: once
+playing it streams 48 kHz stereo chunks that follow the current prompts and bpm.
+`redirect_live_api` points the `google-genai` SDK at either of them.
+
+`StandInUploadServer` implements the File API's resumable upload protocol over plain HTTP,
+and can drop the connection at chosen offsets to exercise resuming.
+"""
+
+import abc
+import asyncio
+import base64
+import contextlib
+import hashlib
+import http.server
+import itertools
+import json
+import threading
+import zlib
+
+import numpy as np
+import websockets.asyncio.server
+
+from robotbox.resample import RECEIVE_SAMPLE_RATE, SEND_SAMPLE_RATE
+
+_TO_URLSAFE = str.maketrans("+/", "-_")
+
+
+def _parse_rate(mime_type, default):
+    for param in mime_type.split(";")[1:]:
+        key, _, value = param.strip().partition("=")
+        if key == "rate":
+            return int(value)
+    return default
+
+
+def _audio_chunks(message):
+    """Yields `(mime_type, data)` for the audio blobs in a realtime input message."""
+    realtime_input = message.get("realtimeInput") or message.get("realtime_input") or {}
+    blobs = list(realtime_input.get("mediaChunks") or realtime_input.get("media_chunks") or [])
+    if "audio" in realtime_input:
+        blobs.append(realtime_input["audio"])
+    for blob in blobs:
+        mime_type = blob.get("mimeType") or blob.get("mime_type") or ""
+        if mime_type.startswith("audio/pcm"):
+            yield mime_type, blob["data"]
+
+
+class _StandInServer(abc.ABC):
+    """Runs a WebSocket handler on its own event loop on a background thread.
+
+    That way the stand-in can be used from synchronous and asynchronous code alike.
+    Subclasses implement `_handle`, which serves one connection.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.host = host
+        self.port = port
+        self.sessions = 0
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="standin", daemon=True)
+        self._server = None
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}"
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        async def serve():
+            return await websockets.asyncio.server.serve(
+                self._handle, self.host, self.port, max_size=None)
+
+        self._thread.start()
+        self._server = asyncio.run_coroutine_threadsafe(serve(), self._loop).result()
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    def stop(self):
+        async def close():
+            self._server.close()
+            await self._server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    @abc.abstractmethod
+    async def _handle(self, ws):
+        """Serves one WebSocket connection until it closes."""
+
+
+class StandInLiveServer(_StandInServer):
+    """A local WebSocket server that behaves like a very simple Live API model.
+
+    Args:
+        host (str): Interface to listen on.
+        port (int): Port to listen on, 0 picks a free one.
+        response_delay (float): Seconds to wait before answering each audio chunk, to
+            simulate model latency.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, response_delay=0.0):
+        super().__init__(host, port)
+        self.response_delay = response_delay
+
+    async def _handle(self, ws):
+        self.sessions += 1
+        await ws.recv()  # Setup message.
+        await ws.send(json.dumps({"setupComplete": {}}))
+        phase = 0
+        async for raw in ws:
+            for mime_type, data in _audio_chunks(json.loads(raw)):
+                # The SDK sends URL-safe base64, raw WebSocket clients send the standard alphabet.
+                n_in = len(base64.urlsafe_b64decode(data.translate(_TO_URLSAFE))) // 2
+                rate = _parse_rate(mime_type, SEND_SAMPLE_RATE)
+                n_out = n_in * RECEIVE_SAMPLE_RATE // rate
+                t = (phase + np.arange(n_out)) / RECEIVE_SAMPLE_RATE
+                phase += n_out
+                tone = (3000 * np.sin(2 * np.pi * 220 * t)).astype(np.int16)
+                if self.response_delay:
+                    await asyncio.sleep(self.response_delay)
+                await ws.send(json.dumps({
+                    "serverContent": {
+                        "modelTurn": {
+                            "parts": [{
+                                "inlineData": {
+                                    "mimeType": f"audio/pcm;rate={RECEIVE_SAMPLE_RATE}",
+                                    "data": base64.b64encode(tone.tobytes()).decode(),
+                                }
+                            }]
+                        }
+                    }
+                }))
+
+
+class StandInMusicServer(_StandInServer):
+    """A local WebSocket server that behaves like a very simple Lyria RealTime session.
+
+    Every weighted prompt becomes a sine partial (its pitch derived from the prompt text,
+    its level from the weight) pulsed on the beat of the configured bpm.
+
+    Args:
+        host (str): Interface to listen on.
+        port (int): Port to listen on, 0 picks a free one.
+        chunk_seconds (float): Length of each audio chunk sent.
+        speed (float): How many times faster than real time chunks are sent, or None to
+            send them as fast as the connection allows.
+    """
+
+    RATE = 48000
+    CHANNELS = 2
+
+    def __init__(self, host="127.0.0.1", port=0, chunk_seconds=2.0, speed=None):
+        super().__init__(host, port)
+        self.chunk_seconds = chunk_seconds
+        self.speed = speed
+        self.received = {"clientContent": 0, "musicGenerationConfig": 0, "playbackControl": 0}
+
+    def _chunk(self, position, prompts, bpm):
+        n = int(self.chunk_seconds * self.RATE)
+        t = (position + np.arange(n)) / self.RATE
+        signal = np.zeros(n)
+        total = sum(abs(w) for w in prompts.values()) or 1.0
+        for text, weight in prompts.items():
+            # A stable pitch per prompt, on a pentatonic scale above A3.
+            step = (0, 2, 4, 7, 9)[zlib.crc32(text.encode()) % 5]
+            octave = zlib.crc32(text.encode()) // 5 % 2
+            frequency = 220 * 2 ** ((step + 12 * octave) / 12)
+            signal += weight / total * np.sin(2 * np.pi * frequency * t)
+        beat = (t * (bpm or 120) / 60) % 1.0
+        signal *= np.exp(-4 * beat)
+        pcm = (6000 * signal).astype(np.int16)
+        return np.repeat(pcm[:, None], self.CHANNELS, axis=1)
+
+    async def _stream(self, ws, state):
+        mime_type = f"audio/l16;rate={self.RATE};channels={self.CHANNELS}"
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        sent = 0.0
+        while True:
+            chunk = self._chunk(state["position"], state["prompts"], state["bpm"])
+            state["position"] += len(chunk)
+            await ws.send(json.dumps({
+                "serverContent": {
+                    "audioChunks": [{
+                        "data": base64.b64encode(chunk.tobytes()).decode(),
+                        "mimeType": mime_type,
+                    }]
+                }
+            }))
+            sent += self.chunk_seconds
+            if self.speed:
+                await asyncio.sleep(max(0.0, started + sent / self.speed - loop.time()))
+            else:
+                # Yield so control messages are still handled between chunks.
+                await asyncio.sleep(0)
+
+    async def _handle(self, ws):
+        self.sessions += 1
+        await ws.recv()  # Setup message.
+        await ws.send(json.dumps({"setupComplete": {}}))
+        state = {"position": 0, "prompts": {}, "bpm": None}
+        streaming = None
+        try:
+            async for raw in ws:
+                message = json.loads(raw)
+                for key in self.received:
+                    if key in message:
+                        self.received[key] += 1
+                if "clientContent" in message:
+                    state["prompts"] = {
+                        p["text"]: p["weight"]
+                        for p in message["clientContent"].get("weightedPrompts", [])
+                    }
+                if "musicGenerationConfig" in message:
+                    state["bpm"] = message["musicGenerationConfig"].get("bpm")
+                control = message.get("playbackControl")
+                if control == "PLAY" and (streaming is None or streaming.done()):
+                    streaming = asyncio.create_task(self._stream(ws, state))
+                elif control in ("PAUSE", "STOP") and streaming is not None:
+                    streaming.cancel()
+                    if control == "STOP":
+                        state["position"] = 0
+                elif control == "RESET_CONTEXT":
+                    state["position"] = 0
+        finally:
+            if streaming is not None:
+                streaming.cancel()
+
+
+class StandInUploadServer:
+    """A local HTTP server for the File API's resumable upload protocol.
+
+    Uploaded bytes are hashed, not stored. Use `upload_url` as the upload endpoint.
+
+    Args:
+        host (str): Interface to listen on.
+        port (int): Port to listen on, 0 picks a free one.
+        interrupt_at (list[int]): Byte offsets at which the server accepts the first part of
+            a chunk and then drops the connection without answering, once each.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, interrupt_at=()):
+        self.interrupt_at = sorted(interrupt_at)
+        self.uploads = {}  # Session id -> state.
+        self.requests = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._httpd = http.server.ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="standin-upload", daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def upload_url(self):
+        return f"{self.url}/upload/v1beta/files"
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread.join()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, headers, body=None):
+                data = json.dumps(body).encode() if body is not None else b""
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                with server._lock:
+                    server.requests += 1
+                length = int(self.headers.get("Content-Length", 0))
+                command = self.headers.get("X-Goog-Upload-Command", "")
+                if command == "start":
+                    metadata = json.loads(self.rfile.read(length) or b"{}").get("file", {})
+                    session = next(server._ids)
+                    with server._lock:
+                        server.uploads[session] = {
+                            "size": int(self.headers["X-Goog-Upload-Header-Content-Length"]),
+                            "mime_type": self.headers["X-Goog-Upload-Header-Content-Type"],
+                            "display_name": metadata.get("displayName"),
+                            "received": 0,
+                            "sha256": hashlib.sha256(),
+                            "final": False,
+                        }
+                    self._reply(200, {
+                        "x-goog-upload-status": "active",
+                        "x-goog-upload-url": f"{server.url}/upload/sessions/{session}",
+                    })
+                    return
+
+                upload = server.uploads.get(int(self.path.rsplit("/", 1)[-1]))
+                if upload is None:
+                    self.rfile.read(length)
+                    self._reply(404, {}, {"error": {"code": 404, "message": "No such upload"}})
+                    return
+                status = "final" if upload["final"] else "active"
+                if command == "query":
+                    self._reply(200, {"x-goog-upload-status": status,
+                                      "x-goog-upload-size-received": str(upload["received"])})
+                    return
+
+                offset = int(self.headers.get("X-Goog-Upload-Offset", -1))
+                if offset != upload["received"] or upload["final"]:
+                    self.rfile.read(length)
+                    self._reply(400, {}, {"error": {"code": 400, "message": "Bad offset"}})
+                    return
+                end = offset + length
+                cut = next((at for at in server.interrupt_at if offset <= at < end), None)
+                if cut is not None:
+                    server.interrupt_at.remove(cut)
+                    upload["sha256"].update(self.rfile.read(cut - offset))
+                    upload["received"] = cut
+                    self.close_connection = True
+                    return
+                upload["sha256"].update(self.rfile.read(length))
+                upload["received"] = end
+                headers = {"x-goog-upload-size-received": str(end)}
+                if "finalize" in command:
+                    upload["final"] = True
+                    headers["x-goog-upload-status"] = "final"
+                    name = f"files/standin-{self.path.rsplit('/', 1)[-1]}"
+                    self._reply(200, headers, {"file": {
+                        "name": name,
+                        "displayName": upload["display_name"],
+                        "mimeType": upload["mime_type"],
+                        "sizeBytes": str(upload["received"]),
+                        "sha256Hash": upload["sha256"].hexdigest(),
+                        "uri": f"{server.url}/v1beta/{name}",
+                        "state": "ACTIVE",
+                    }})
+                else:
+                    headers["x-goog-upload-status"] = "active"
+                    self._reply(200, headers)
+
+        return Handler
+
+
+@contextlib.contextmanager
+def redirect_live_api(url):
+    """Sends every `google-genai` Live and Lyria connection to `url` instead of Google.
+
+    The SDK always builds a `wss://` URL for these APIs, so this replaces the connect
+    functions the SDK uses and drops its TLS settings.
+    """
+    from google.genai import live, live_music
+
+    originals = live.ws_connect, live_music.connect
+
+    def redirect(original):
+        def connect(uri, **kwargs):
+            kwargs.pop("ssl", None)
+            return original(url, **kwargs)
+
+        return connect
+
+    live.ws_connect = redirect(originals[0])
+    live_music.connect = redirect(originals[1])
+    try:
+        yield
+    finally:
+        live.ws_connect, live_music.connect = originals
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Runs Live API tool calls without holding up the receive loop.
+
+Awaiting a tool inside the loop that reads from the session stops audio from being read
+until the tool returns. `ToolDispatcher.dispatch` starts each function call as a task and
+returns at once: synchronous tools run on a bounded thread pool, coroutine functions run
+on the event loop. Each result is sent back as a tool response as soon as it is ready.
+Calls the server cancels are abandoned without a response, and calls that overrun their
+timeout answer with an error so the model can carry on.
+"""
+
+import asyncio
+import concurrent.futures
+import inspect
+import time
+
+import numpy as np
+from google.genai import types
+
+
+class ToolDispatcher:
+    """Dispatches a session's tool calls to registered Python callables.
+
+    Args:
+        session (AsyncSession): The Live session to send responses on.
+        tools (list): Tools to register, each with a `name`, called with the function
+            call's arguments. A `declaration` and a `timeout` attribute are used if present.
+        max_workers (int): Threads for synchronous tools. Calls beyond this wait their turn.
+        timeout (float): Default seconds a call may take.
+    """
+
+    def __init__(self, session, tools=(), max_workers=4, timeout=10.0):
+        self.session = session
+        self.timeout = timeout
+        self.tools = {}
+        self._timeouts = {}
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers, thread_name_prefix="tool")
+        self._running = {}  # Function call id -> (task, tool name).
+        self._latencies = {}  # Tool name -> seconds per completed call.
+        self._counts = {}  # Tool name -> {"errors", "timeouts", "cancelled"}.
+        for tool in tools:
+            self.register(tool.name, tool, getattr(tool, "timeout", None))
+
+    def register(self, name, function, timeout=None):
+        """Adds a tool. `function` takes the call's arguments dict and returns a result."""
+        self.tools[name] = function
+        self._timeouts[name] = timeout or self.timeout
+        self._latencies[name] = []
+        self._counts[name] = {"errors": 0, "timeouts": 0, "cancelled": 0}
+
+    @property
+    def declarations(self):
+        """The `types.Tool` declarations of registered tools, for the session config."""
+        return [tool.declaration for tool in self.tools.values() if hasattr(tool, "declaration")]
+
+    def dispatch(self, tool_call):
+        """Starts every function call in a `tool_call` message. Returns immediately."""
+        for call in tool_call.function_calls or ():
+            task = asyncio.create_task(self._run(call))
+            self._running[call.id] = (task, call.name)
+            task.add_done_callback(lambda _, call_id=call.id: self._running.pop(call_id, None))
+
+    def cancel(self, cancellation):
+        """Cancels the calls in a `tool_call_cancellation` message."""
+        for call_id in cancellation.ids or ():
+            task, name = self._running.get(call_id, (None, None))
+            if task is not None and task.cancel() and name in self._counts:
+                self._counts[name]["cancelled"] += 1
+
+    async def _call(self, function, args):
+        if inspect.iscoroutinefunction(function) or inspect.iscoroutinefunction(
+                getattr(function, "__call__", None)):
+            return await function(args)
+        loop = asyncio.get_running_loop()
+        # A thread can't be interrupted, so a timed-out or cancelled call is left to finish
+        # in the pool and its result dropped.
+        return await loop.run_in_executor(self._executor, function, args)
+
+    async def _run(self, call):
+        name = call.name
+        function = self.tools.get(name)
+        if function is None:
+            await self._respond(call, {"error": f"Unknown function {name}"})
+            return
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(
+                self._call(function, call.args or {}), self._timeouts[name])
+            if not isinstance(result, dict):
+                result = {"result": result}
+        except asyncio.TimeoutError:
+            self._counts[name]["timeouts"] += 1
+            result = {"error": f"{name} took longer than {self._timeouts[name]:g} s"}
+        except Exception as e:
+            self._counts[name]["errors"] += 1
+            result = {"error": f"{type(e).__name__}: {e}"}
+        self._latencies[name].append(time.perf_counter() - started)
+        await self._respond(call, result)
+
+    async def _respond(self, call, result):
+        await self.session.send_tool_response(function_responses=[
+            types.FunctionResponse(id=call.id, name=call.name, response=result)])
+
+    def stats(self):
+        """Per tool: calls completed, errors, timeouts, cancellations and latency in ms."""
+        report = {}
+        for name, latencies in self._latencies.items():
+            ms = np.array(latencies) * 1000
+            report[name] = {
+                "calls": len(latencies),
+                **self._counts[name],
+                "p50_ms": round(float(np.percentile(ms, 50)), 1) if len(ms) else None,
+                "p95_ms": round(float(np.percentile(ms, 95)), 1) if len(ms) else None,
+            }
+        return report
+
+    async def aclose(self):
+        """Cancels calls still running and shuts the thread pool down."""
+        tasks = [task for task, _ in self._running.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,395 @@
+# -*- coding: utf-8 -*-
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+An append-only, searchable store of tutoring session transcripts.
+
+Every utterance (a student's transcribed speech or the tutor's reply) is appended as a
+JSON line to a segmented log per student, `<root>/<student id>/000001.jsonl`, and indexed
+in `<root>/index.sqlite` by student, session, time and keyword. Directories are named by
+the student's number in the index, never by the name typed in, so a name can't point
+outside the store. Queries like "every session
+where this student talked about the L298N driver" only touch the index, so they take
+milliseconds over a term's worth of sessions.
+
+Appends are queued and written by a background thread, so recording never blocks the
+audio receive loop.
+
+```
+python -m robotbox.transcripts search transcripts "l298n driver" --student ada
+python -m robotbox.transcripts benchmark
+```
+"""
+
+import argparse
+import json
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+
+SEGMENT_BYTES = 4 << 20
+# How long the writer waits to gather more utterances into one transaction.
+FLUSH_INTERVAL = 0.5
+# Students, sessions and keywords are each numbered in their own table, so a keyword can
+# never be taken for a student or a session of the same name.
+NAME_TABLES = ("students", "sessions", "terms")
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from has have i if in is it its me my "
+    "no not of on or so that the then there this to was we what when where which who why "
+    "will with you your".split()
+)
+
+
+def terms(text):
+    """The distinct keywords in `text`, lower-cased, without stopwords."""
+    return {w for w in re.findall(r"[a-z0-9]+", text.lower()) if len(w) > 1 and w not in STOPWORDS}
+
+
+class TranscriptStore:
+    """Appends utterances to per-student logs and answers keyword queries.
+
+    Args:
+        root (str): Directory for the logs and the index, created if needed.
+        segment_bytes (int): Size at which a student's log moves on to a new segment.
+    """
+
+    def __init__(self, root, segment_bytes=SEGMENT_BYTES):
+        self.root = root
+        self.segment_bytes = segment_bytes
+        os.makedirs(root, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        self._db.executescript("".join(
+            f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY, name TEXT UNIQUE);"
+            for table in NAME_TABLES) + """
+            CREATE TABLE IF NOT EXISTS utterances (
+                id INTEGER PRIMARY KEY, student INTEGER, session INTEGER, time REAL,
+                segment INTEGER, offset INTEGER);
+            CREATE INDEX IF NOT EXISTS utterances_student ON utterances (student, time);
+            CREATE TABLE IF NOT EXISTS postings (
+                term INTEGER, student INTEGER, session INTEGER, utterance INTEGER, time REAL,
+                PRIMARY KEY (term, student, session, utterance)) WITHOUT ROWID;
+        """)
+        self._lock = threading.Lock()  # Guards the connection between readers and the writer.
+        # Table -> name -> id.
+        self._names = {table: dict(self._db.execute(f"SELECT name, id FROM {table}"))
+                       for table in NAME_TABLES}
+        self._segments = {}  # Student -> (segment number, open file).
+        self._queue = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def append(self, student, session, role, text, when=None):
+        """Queues one utterance. Returns at once; the write happens in the background."""
+        if text.strip():
+            self._queue.put((student, session, role, text.strip(), when or time.time()))
+
+    def flush(self):
+        """Waits until everything appended so far is written and indexed."""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def close(self):
+        self._queue.put(None)
+        self._writer.join()
+        for _, f in self._segments.values():
+            f.close()
+        with self._lock:
+            self._db.close()
+
+    def _id(self, table, name):
+        names = self._names[table]
+        if name not in names:
+            cursor = self._db.execute(f"INSERT INTO {table} (name) VALUES (?)", (name,))
+            names[name] = cursor.lastrowid
+        return names[name]
+
+    def _directory(self, student):
+        return os.path.join(self.root, str(self._names["students"][student]))
+
+    def _segment(self, student):
+        """The open segment for a student's next append, moving on when it's full."""
+        number, f = self._segments.get(student, (None, None))
+        if f is not None and f.tell() < self.segment_bytes:
+            return number, f
+        if f is None:
+            # Carry on with the student's last segment from an earlier run.
+            with self._lock, self._db:
+                self._id("students", student)
+            directory = self._directory(student)
+            os.makedirs(directory, exist_ok=True)
+            existing = [int(n[:-6]) for n in os.listdir(directory) if n.endswith(".jsonl")]
+            number = max(existing, default=1)
+        else:
+            f.close()
+            number += 1
+        f = open(os.path.join(self._directory(student), f"{number:06d}.jsonl"), "ab")
+        self._segments[student] = (number, f)
+        return number, f
+
+    def _write(self, batch):
+        rows = []
+        for student, session, role, text, when in batch:
+            number, f = self._segment(student)
+            offset = f.tell()
+            record = {"student": student, "session": session, "time": when, "role": role,
+                      "text": text}
+            f.write(json.dumps(record).encode() + b"\n")
+            rows.append((student, session, when, number, offset, text))
+        # The log is written before the index, so the index never points past its end.
+        for _, f in self._segments.values():
+            f.flush()
+        with self._lock, self._db:
+            for student, session, when, number, offset, text in rows:
+                student_id = self._id("students", student)
+                session_id = self._id("sessions", session)
+                cursor = self._db.execute(
+                    "INSERT INTO utterances (student, session, time, segment, offset) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (student_id, session_id, when, number, offset))
+                # Postings repeat the student, session and time so that finding matching
+                # sessions is a scan of this one table.
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO postings VALUES (?, ?, ?, ?, ?)",
+                    [(self._id("terms", t), student_id, session_id, cursor.lastrowid, when)
+                     for t in terms(text)])
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            batch, waiters, closing = [], [], False
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while True:
+                if item is None:
+                    closing = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if closing or waiters:
+                    # Drain whatever is already queued, without waiting for more.
+                    try:
+                        item = self._queue.get_nowait()
+                        continue
+                    except queue.Empty:
+                        break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+            for waiter in waiters:
+                waiter.set()
+            if closing:
+                return
+
+    def _read(self, student, segment, offset):
+        with open(os.path.join(self._directory(student), f"{segment:06d}.jsonl"), "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def search(self, query, student=None, since=None, until=None, limit=50, snippets=3):
+        """Finds the sessions that mention every keyword in `query`.
+
+        Args:
+            query (str): Keywords, e.g. "l298n driver". Stopwords are ignored.
+            student (str): Only this student's sessions.
+            since (float): Only utterances at or after this Unix time.
+            until (float): Only utterances before this Unix time.
+            limit (int): Most recent sessions to return.
+            snippets (int): Matching utterances to read back per session.
+
+        Returns:
+            list[dict]: `{"student", "session", "time", "utterances"}` per session, newest
+            first, where `time` is the first matching utterance.
+        """
+        wanted = terms(query)
+        with self._lock:
+            ids = [self._names["terms"].get(t) for t in wanted]
+            student_id = self._names["students"].get(student) if student else None
+            if not wanted or None in ids or (student and student_id is None):
+                return []
+            where = f"p.term IN ({','.join('?' * len(ids))})"
+            args = list(ids)
+            if student_id is not None:
+                where += " AND p.student = ?"
+                args.append(student_id)
+            if since is not None:
+                where += " AND p.time >= ?"
+                args.append(since)
+            if until is not None:
+                where += " AND p.time < ?"
+                args.append(until)
+            matches = self._db.execute(
+                f"SELECT p.student, p.session, MIN(p.time) FROM postings p WHERE {where} "
+                "GROUP BY p.student, p.session HAVING COUNT(DISTINCT p.term) = ? "
+                "ORDER BY MAX(p.time) DESC LIMIT ?", args + [len(ids), limit]).fetchall()
+            found = {}
+            for sid, session, _ in matches:
+                found[sid, session] = self._db.execute(
+                    "SELECT DISTINCT u.time, u.segment, u.offset "
+                    "FROM postings p JOIN utterances u ON u.id = p.utterance "
+                    f"WHERE {where} AND p.student = ? AND p.session = ? ORDER BY u.time LIMIT ?",
+                    args + [sid, session, snippets]).fetchall()
+            students = {v: k for k, v in self._names["students"].items()}
+            sessions = {v: k for k, v in self._names["sessions"].items()}
+
+        results = []
+        for sid, session, first in matches:
+            results.append({
+                "student": students[sid],
+                "session": sessions[session],
+                "time": first,
+                "utterances": [self._read(students[sid], segment, offset)
+                               for _, segment, offset in found[sid, session]],
+            })
+        return results
+
+    def sessions(self, student):
+        """A student's sessions as `(session, first utterance time)`, oldest first."""
+        with self._lock:
+            student_id = self._names["students"].get(student)
+            rows = self._db.execute(
+                "SELECT session, MIN(time) FROM utterances WHERE student = ? "
+                "GROUP BY session ORDER BY 2", (student_id,)).fetchall()
+            names = {v: k for k, v in self._names["sessions"].items()}
+        return [(names[session], started) for session, started in rows]
+
+    def utterances(self, student, session):
+        """Every utterance of one session, oldest first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT segment, offset FROM utterances WHERE student = ? AND session = ? "
+                "ORDER BY time",
+                (self._names["students"].get(student), self._names["sessions"].get(session)),
+            ).fetchall()
+        return [self._read(student, segment, offset) for segment, offset in rows]
+
+
+class SessionTranscript:
+    """Collects a Live session's transcription fragments into whole utterances.
+
+    Transcriptions arrive in pieces across many messages. Pass every message's
+    `server_content` to `add`; each side's text is appended to the store once its turn ends.
+
+    Args:
+        store (TranscriptStore): Where utterances go.
+        student (str): Who the session is with.
+        session (str): A name for this session, for example its start time.
+        memory (RollingSummary): Also gets every utterance, to summarize the session for
+            reconnections. See `robotbox.session_memory`.
+    """
+
+    def __init__(self, store, student, session=None, memory=None):
+        self.store = store
+        self.student = student
+        self.session = session or time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.memory = memory
+        self._parts = {"student": [], "tutor": []}
+
+    def add(self, server_content):
+        if server_content is None:
+            return
+        if server_content.input_transcription and server_content.input_transcription.text:
+            self._parts["student"].append(server_content.input_transcription.text)
+        if server_content.output_transcription and server_content.output_transcription.text:
+            # The tutor answering means the student's utterance is over.
+            self._end("student")
+            self._parts["tutor"].append(server_content.output_transcription.text)
+        if server_content.turn_complete or server_content.interrupted:
+            self._end("student")
+            self._end("tutor")
+
+    def _end(self, role):
+        if self._parts[role]:
+            text = "".join(self._parts[role]).strip()
+            self.store.append(self.student, self.session, role, text)
+            if self.memory is not None and text:
+                self.memory.add(role, text)
+            self._parts[role] = []
+
+    def close(self):
+        self._end("student")
+        self._end("tutor")
+
+
+def _benchmark(root="/tmp/robotbox-transcripts", students=30, sessions=60, utterances=150):
+    """Fills a store with a term of synthetic sessions, then times appends and queries."""
+    import random
+    import shutil
+
+    shutil.rmtree(root, ignore_errors=True)
+    rng = random.Random(0)
+    words = ("motor wire resistor led breadboard battery sensor servo code loop voltage "
+             "ground pin arduino current pwm speed direction capacitor button").split()
+    store = TranscriptStore(root)
+    started = time.perf_counter()
+    worst = 0.0
+    term_start = time.time() - 90 * 86400
+    for s in range(sessions):
+        for st in range(students):
+            when = term_start + s * 1.5 * 86400 + st * 60
+            for u in range(utterances):
+                text = " ".join(rng.choices(words, k=12))
+                if u == 7 and rng.random() < 0.1:
+                    text += " my l298n driver is not turning the motor"
+                call = time.perf_counter()
+                store.append(f"student{st}", f"session{s}", "student" if u % 2 else "tutor",
+                             text, when + u * 10)
+                worst = max(worst, time.perf_counter() - call)
+    store.flush()
+    total = students * sessions * utterances
+    elapsed = time.perf_counter() - started
+    size = sum(os.path.getsize(os.path.join(d, f)) for d, _, fs in os.walk(root) for f in fs)
+    print(f"{total} utterances in {elapsed:.1f} s, slowest append {worst * 1e6:.0f} us, "
+          f"{size / 1e6:.0f} MB on disk")
+
+    for query, student in [("l298n driver", "student3"), ("l298n driver", None),
+                           ("pwm capacitor", "student7"), ("servo", "student0")]:
+        timings = []
+        for _ in range(20):
+            call = time.perf_counter()
+            found = store.search(query, student=student, limit=20)
+            timings.append(time.perf_counter() - call)
+        timings.sort()
+        print(f"{query!r:16} {str(student):10} {len(found):3} sessions, "
+              f"median {timings[10] * 1000:.1f} ms, max {timings[-1] * 1000:.1f} ms")
+    store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    commands = parser.add_subparsers(dest="command", required=True)
+    search = commands.add_parser("search", help="Find sessions mentioning every keyword")
+    search.add_argument("root", help="Transcript directory")
+    search.add_argument("query")
+    search.add_argument("--student")
+    search.add_argument("--limit", type=int, default=20)
+    commands.add_parser("benchmark", help="Time appends and queries on synthetic data")
+    args = parser.parse_args()
+
+    if args.command == "benchmark":
+        _benchmark()
+    else:
+        store = TranscriptStore(args.root)
+        for hit in store.search(args.query, student=args.student, limit=args.limit):
+            print(f"{hit['student']} {hit['session']} "
+                  f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(hit['time']))}")
+            for utterance in hit["utterances"]:
+                print(f"    {utterance['role']}: {utterance['text']}")
+        store.close()
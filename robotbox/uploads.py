@@ -0,0 +1,390 @@
+# -*- coding: utf-8 -*-
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Bulk File API uploads that skip files the API already has.
+
+Files are identified by the SHA-256 of their content. `UploadIndex` remembers, in a local
+SQLite database, which hashes were uploaded under which file name and URI and until when
+the API keeps them (48 hours), so `bulk_upload` only sends bytes the API doesn't have yet.
+
+`resumable_upload` is for large recordings: it streams a memory-mapped file in fixed-size
+chunks and keeps the upload session on disk, so an interrupted upload continues from the
+last offset the server acknowledged instead of starting over.
+"""
+
+import concurrent.futures
+import datetime
+import hashlib
+import json
+import mimetypes
+import mmap
+import os
+import sqlite3
+import time
+
+import httpx
+from google.genai import errors, types
+
+# Uploaded files are deleted by the API after this long.
+FILE_TTL = datetime.timedelta(hours=48)
+# Entries closer than this to their expiry are uploaded again, so the file doesn't expire
+# between the lookup and the request that uses it.
+EXPIRY_MARGIN = datetime.timedelta(hours=1)
+HASH_CHUNK_SIZE = 1 << 20
+
+UPLOAD_URL = "https://generativelanguage.googleapis.com/upload/v1beta/files"
+# The same chunk size as the SDK. Chunks other than the last must be multiples of 256 KiB.
+UPLOAD_CHUNK_SIZE = 8 << 20
+
+
+def sha256_file(path, chunk_size=HASH_CHUNK_SIZE):
+    """Returns the hex SHA-256 of a file, reading it in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+class UploadIndex:
+    """A local SQLite table of content hash -> uploaded file.
+
+    Only use an index from the thread that opened it.
+
+    Args:
+        path (str): Database file, created if needed.
+    """
+
+    def __init__(self, path):
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS uploads ("
+            " sha256 TEXT PRIMARY KEY, name TEXT, uri TEXT, mime_type TEXT,"
+            " display_name TEXT, size_bytes INTEGER, expires REAL)"
+        )
+
+    def close(self):
+        self._db.close()
+
+    def get(self, sha256):
+        """Returns the uploaded file for a hash, or None if unknown or about to expire."""
+        row = self._db.execute(
+            "SELECT name, uri, mime_type, display_name, size_bytes, expires FROM uploads"
+            " WHERE sha256 = ? AND expires > ?",
+            (sha256, (_now() + EXPIRY_MARGIN).timestamp()),
+        ).fetchone()
+        if row is None:
+            return None
+        name, uri, mime_type, display_name, size_bytes, expires = row
+        return types.File(
+            name=name, uri=uri, mime_type=mime_type, display_name=display_name,
+            size_bytes=size_bytes, sha256_hash=sha256,
+            expiration_time=datetime.datetime.fromtimestamp(expires, datetime.timezone.utc),
+        )
+
+    def sha256_for_uri(self, uri):
+        """Returns the content hash of an uploaded file by its URI, or None."""
+        row = self._db.execute("SELECT sha256 FROM uploads WHERE uri = ?", (uri,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, sha256, file):
+        expires = file.expiration_time or _now() + FILE_TTL
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO uploads VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (sha256, file.name, file.uri, file.mime_type, file.display_name,
+                 file.size_bytes, expires.timestamp()),
+            )
+
+    def forget(self, sha256):
+        with self._db:
+            self._db.execute("DELETE FROM uploads WHERE sha256 = ?", (sha256,))
+
+    def prune(self):
+        """Removes expired entries. Returns how many were removed."""
+        with self._db:
+            return self._db.execute(
+                "DELETE FROM uploads WHERE expires <= ?", (_now().timestamp(),)).rowcount
+
+
+def _upload(client, path):
+    mime_type = mimetypes.guess_type(path)[0]
+    config = {"display_name": os.path.basename(path)}
+    if mime_type:
+        config["mime_type"] = mime_type
+    return client.files.upload(file=path, config=config)
+
+
+def _size_and_hash(path):
+    return os.path.getsize(path), sha256_file(path)
+
+
+def bulk_upload(client, paths, index, max_workers=8, verify=False, progress=None):
+    """Uploads files the index doesn't know about, a few at a time.
+
+    Args:
+        client (genai.Client): The client to upload with.
+        paths (list[str]): Files to make available.
+        index (UploadIndex): Index to look up and record uploads in.
+        max_workers (int): Files hashed or uploaded concurrently.
+        verify (bool): Check with `files.get` that indexed files still exist, for when
+            something else may have deleted them.
+        progress (callable): Called as `progress(path, file, cached)` for each file.
+
+    Returns:
+        tuple[dict, dict, dict]: Path -> `types.File` for every file that is available,
+        path -> exception for every file that couldn't be read or uploaded, and statistics: files and
+        bytes per second, cache hit rate, uploads and failures.
+    """
+    started = time.perf_counter()
+    files = {}
+    failed = {}
+    hits = 0
+    uploads = 0
+    uploaded_bytes = 0
+    sizes = {}
+    hashes = {}
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as pool:
+        futures = {pool.submit(_size_and_hash, path): path for path in paths}
+        for future in concurrent.futures.as_completed(futures):
+            path = futures[future]
+            try:
+                sizes[path], hashes[path] = future.result()
+            except OSError as e:
+                # A missing or unreadable file is reported, the rest are still uploaded.
+                failed[path] = e
+        hashes = {path: hashes[path] for path in paths if path in hashes}  # In input order.
+
+        # The same content may appear under several paths, it's uploaded once.
+        to_upload = {}
+        for path, sha256 in hashes.items():
+            file = index.get(sha256)
+            if file is not None and verify:
+                try:
+                    client.files.get(name=file.name)
+                except errors.ClientError:
+                    index.forget(sha256)
+                    file = None
+            if file is not None:
+                files[path] = file
+                hits += 1
+                if progress:
+                    progress(path, file, True)
+            else:
+                to_upload.setdefault(sha256, []).append(path)
+
+        futures = {
+            pool.submit(_upload, client, same[0]): sha256 for sha256, same in to_upload.items()
+        }
+        for future in concurrent.futures.as_completed(futures):
+            sha256 = futures[future]
+            same = to_upload[sha256]
+            try:
+                file = future.result()
+            except (errors.APIError, httpx.TransportError, OSError) as e:
+                # One bad file or dropped connection shouldn't lose the uploads that worked.
+                failed.update(dict.fromkeys(same, e))
+                continue
+            index.put(sha256, file)
+            uploads += 1
+            uploaded_bytes += sizes[same[0]]
+            for n, path in enumerate(same):
+                files[path] = file
+                if n:
+                    hits += 1
+                if progress:
+                    progress(path, file, bool(n))
+
+    elapsed = time.perf_counter() - started
+    stats = {
+        "files": len(paths),
+        "uploads": uploads,
+        "failed": len(failed),
+        "hit_rate": round(hits / len(paths), 3) if paths else 0.0,
+        "seconds": round(elapsed, 2),
+        "files_per_second": round(len(paths) / elapsed, 1),
+        "bytes_per_second": round(sum(sizes.values()) / elapsed),
+        "uploaded_bytes_per_second": round(uploaded_bytes / elapsed),
+    }
+    return files, failed, stats
+
+
+def _state_path(state_dir, path):
+    stat = os.stat(path)
+    # A changed file (new size or modification time) gets a new upload session.
+    key = f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    return os.path.join(state_dir, hashlib.sha256(key.encode()).hexdigest()[:32] + ".json")
+
+
+def _save_state(state_path, state):
+    # Write and rename, so a crash never leaves a half-written state file.
+    tmp = state_path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, state_path)
+
+
+def _read_blocks(mm, start, end, block_size=1 << 18):
+    # httpx keeps request bodies alive in reference cycles until the garbage collector runs,
+    # so a chunk is streamed in small pieces rather than passed as one large bytes object.
+    for position in range(start, end, block_size):
+        yield mm[position:min(position + block_size, end)]
+
+
+def _query(http, session_url):
+    """Returns the session status ("active" or "final") and the bytes the server has."""
+    response = http.post(session_url, headers={"X-Goog-Upload-Command": "query"})
+    errors.APIError.raise_for_response(response)
+    return (response.headers.get("x-goog-upload-status"),
+            int(response.headers.get("x-goog-upload-size-received", 0)))
+
+
+def _start(http, upload_url, size, mime_type, display_name):
+    """Starts a resumable upload session and returns its URL."""
+    response = http.post(
+        upload_url,
+        headers={
+            "X-Goog-Upload-Protocol": "resumable",
+            "X-Goog-Upload-Command": "start",
+            "X-Goog-Upload-Header-Content-Length": str(size),
+            "X-Goog-Upload-Header-Content-Type": mime_type,
+        },
+        json={"file": {"displayName": display_name}},
+    )
+    errors.APIError.raise_for_response(response)
+    return response.headers["x-goog-upload-url"]
+
+
+def resumable_upload(
+    path,
+    api_key=None,
+    mime_type=None,
+    display_name=None,
+    state_dir=".uploads",
+    chunk_size=UPLOAD_CHUNK_SIZE,
+    progress=None,
+    max_retries=5,
+    upload_url=UPLOAD_URL,
+):
+    """Uploads a file in chunks, resuming an earlier attempt at the same file if there was one.
+
+    The file is memory-mapped and each chunk's pages are released once it is sent, so
+    memory use doesn't grow with the file size. Network errors are retried from the offset
+    the server reports; if the process dies, calling this again with the same `state_dir`
+    picks up the same upload session.
+
+    Args:
+        path (str): The file to upload.
+        api_key (str): The API key, defaults to the `GOOGLE_API_KEY` environment variable.
+        mime_type (str): Defaults to a guess from the file name.
+        display_name (str): Defaults to the file name.
+        state_dir (str): Directory for the upload session state.
+        chunk_size (int): Bytes per request, a multiple of 256 KiB.
+        progress (callable): Called as `progress(sent, total, bytes_per_second)` after
+            every acknowledged chunk.
+        max_retries (int): Consecutive failed chunk uploads or offset queries before giving
+            up.
+        upload_url (str): The File API upload endpoint.
+
+    Returns:
+        types.File: The uploaded file.
+    """
+    api_key = api_key or os.environ["GOOGLE_API_KEY"]
+    size = os.path.getsize(path)
+    mime_type = mime_type or mimetypes.guess_type(path)[0] or "application/octet-stream"
+    os.makedirs(state_dir, exist_ok=True)
+    state_path = _state_path(state_dir, path)
+
+    with httpx.Client(headers={"x-goog-api-key": api_key}, timeout=120) as http:
+        if size == 0:
+            # An empty file can't be mapped and has nothing to resume: one finalize request,
+            # and no state file.
+            session_url = _start(http, upload_url, 0, mime_type,
+                                 display_name or os.path.basename(path))
+            response = http.post(
+                session_url,
+                headers={"X-Goog-Upload-Command": "upload, finalize",
+                         "X-Goog-Upload-Offset": "0", "Content-Length": "0"},
+                content=b"",
+            )
+            errors.APIError.raise_for_response(response)
+            if progress:
+                progress(0, 0, 0.0)
+            return types.File.model_validate(response.json()["file"])
+
+        session_url, offset = None, 0
+        if os.path.exists(state_path):
+            with open(state_path) as f:
+                session_url = json.load(f)["session_url"]
+            try:
+                status, offset = _query(http, session_url)
+            except errors.ClientError:
+                status = None  # Expired or unknown session.
+            if status != "active":
+                session_url, offset = None, 0
+
+        if session_url is None:
+            session_url = _start(http, upload_url, size, mime_type,
+                                 display_name or os.path.basename(path))
+            _save_state(state_path, {"session_url": session_url, "path": path, "size": size})
+
+        started = time.perf_counter()
+        resumed_at = offset
+        failures = 0
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            while True:
+                try:
+                    if failures:
+                        # The server may have kept part of the failed chunk, continue from
+                        # what it has. A failed query counts as another failure.
+                        _, offset = _query(http, session_url)
+                    end = min(offset + chunk_size, size)
+                    command = "upload, finalize" if end >= size else "upload"
+                    response = http.post(
+                        session_url,
+                        headers={"X-Goog-Upload-Command": command,
+                                 "X-Goog-Upload-Offset": str(offset),
+                                 "Content-Length": str(end - offset)},
+                        content=_read_blocks(mm, offset, end),
+                    )
+                    if response.status_code >= 500:
+                        errors.APIError.raise_for_response(response)
+                except (httpx.TransportError, errors.ServerError):
+                    failures += 1
+                    if failures > max_retries:
+                        raise
+                    time.sleep(min(30, 2 ** failures))
+                    continue
+                errors.APIError.raise_for_response(response)
+                failures = 0
+
+                if hasattr(mm, "madvise"):
+                    # The pages were only needed for this chunk, let the OS drop them.
+                    start = offset - offset % mmap.PAGESIZE
+                    mm.madvise(mmap.MADV_DONTNEED, start, end - start)
+                offset = int(response.headers.get("x-goog-upload-size-received", end))
+                if progress:
+                    elapsed = time.perf_counter() - started
+                    progress(offset, size, (offset - resumed_at) / elapsed if elapsed else 0.0)
+                if response.headers.get("x-goog-upload-status") == "final":
+                    break
+
+    os.remove(state_path)
+    return types.File.model_validate(response.json()["file"])
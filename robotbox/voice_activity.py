@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Sends the microphone upstream only while the student is speaking.
+
+Most of a lab session is the student wiring in silence. Streaming that silence costs
+upload bandwidth and server-side audio processing for nothing. `SpeechGate` runs a
+voice activity detector on the microphone and passes on only speech segments, each marked
+with an activity start and an activity end, so the Live API's own voice activity
+detection can be turned off (`MANUAL_ACTIVITY_CONFIG`).
+
+The detector compares each 20 ms frame's energy with the room's noise floor, taken as the
+quietest frame of the last few seconds. Speech always has gaps quieter than that, so
+speaking doesn't raise the floor, but a fan switched on does within seconds. A segment
+begins once a few frames in a row are clearly above the floor, and the audio from just
+before that (the pre-roll) is sent first, so the soft start of a word isn't cut. It ends
+after a stretch of silence (the hangover), so pauses between words don't split a
+sentence.
+
+## Benchmark
+
+To measure suppression and onset clipping on a synthetic session, run:
+
+```
+python -m robotbox.voice_activity
+```
+"""
+
+import collections
+import time
+
+import numpy as np
+
+from robotbox.resample import SEND_SAMPLE_RATE
+
+# Session config that turns off the server's voice activity detection, for a client that
+# sends its own activity start and end.
+MANUAL_ACTIVITY_CONFIG = {"automatic_activity_detection": {"disabled": True}}
+
+
+class SpeechGate:
+    """Splits a microphone stream into speech segments, dropping the silence between them.
+
+    Args:
+        rate (int): Sample rate of the 16-bit mono input.
+        frame_ms (int): Length of the frames the detector classifies.
+        threshold_db (float): How far above the noise floor a frame must be to count as
+            speech.
+        min_level_db (float): Frames quieter than this (dB full scale) are never speech,
+            however quiet the room is.
+        start_frames (int): Speech frames in a row needed to start a segment.
+        pre_roll_ms (int): Audio from before the start that is sent with it.
+        hangover_ms (int): Silence that ends a segment.
+        floor_ms (int): Window the noise floor is the minimum over.
+        max_segment_ms (int): Longest segment; a longer one is ended and must start again.
+    """
+
+    def __init__(self, rate=SEND_SAMPLE_RATE, frame_ms=20, threshold_db=10.0,
+                 min_level_db=-50.0, start_frames=2, pre_roll_ms=300, hangover_ms=600,
+                 floor_ms=4000, max_segment_ms=30000):
+        self.frame = rate * frame_ms // 1000
+        self.threshold_db = threshold_db
+        self.min_level_db = min_level_db
+        self.start_frames = start_frames
+        self.hangover = max(1, hangover_ms // frame_ms)
+        self.max_segment = max(1, max_segment_ms // frame_ms)
+        # Minima of 250 ms blocks, so the window's minimum is cheap to keep.
+        self._block_frames = max(1, 250 // frame_ms)
+        self._minima = collections.deque(maxlen=max(1, floor_ms // 250))
+        self._block = []
+        self._length = 0  # Frames in the current segment.
+        self.pre_roll = collections.deque(maxlen=max(start_frames, pre_roll_ms // frame_ms))
+        self.floor_db = None
+        self.active = False
+        self._run = 0  # Speech frames in a row while inactive, silent ones while active.
+        self._pending = np.zeros(0, np.int16)
+        self.counts = {"frames": 0, "sent_frames": 0, "segments": 0, "clipped_onsets": 0}
+
+    def _levels(self, frames):
+        """Energy of each frame in dB full scale."""
+        power = np.mean((frames.astype(np.float32) / 32768) ** 2, axis=1)
+        return 10 * np.log10(power + 1e-10)
+
+    def _is_speech(self, level):
+        # The floor is kept whatever the frames are classified as, so a louder room can't
+        # lock the gate open.
+        self._block.append(level)
+        if len(self._block) == self._block_frames:
+            self._minima.append(min(self._block))
+            self._block = []
+        self.floor_db = min(min(self._minima, default=level), min(self._block, default=level))
+        return level > max(self.floor_db + self.threshold_db, self.min_level_db)
+
+    def process(self, samples):
+        """Classifies int16 samples and returns what to send.
+
+        Returns:
+            list: Events in order: ("start", None), ("audio", np.ndarray of int16) and
+            ("end", None). Audio is only returned between a start and an end.
+        """
+        samples = np.concatenate([self._pending, np.asarray(samples, np.int16)])
+        count = len(samples) // self.frame
+        self._pending = samples[count * self.frame:]
+        frames = samples[:count * self.frame].reshape(count, self.frame)
+        events = []
+        for frame, level in zip(frames, self._levels(frames)):
+            speech = self._is_speech(level)
+            self.counts["frames"] += 1
+            if self.active:
+                self._run = 0 if speech else self._run + 1
+                self._length += 1
+                events.append(("audio", frame))
+                self.counts["sent_frames"] += 1
+                if self._run >= self.hangover or self._length >= self.max_segment:
+                    events.append(("end", None))
+                    self.active = False
+                    self._run = 0
+                continue
+            self._run = self._run + 1 if speech else 0
+            self.pre_roll.append((frame, speech))
+            if self._run >= self.start_frames:
+                # The speech started before the pre-roll if its oldest frame is speech too.
+                if self.pre_roll[0][1] and len(self.pre_roll) == self.pre_roll.maxlen:
+                    self.counts["clipped_onsets"] += 1
+                events.append(("start", None))
+                events.extend(("audio", held) for held, _ in self.pre_roll)
+                self.counts["sent_frames"] += len(self.pre_roll)
+                self.counts["segments"] += 1
+                self.pre_roll.clear()
+                self.active = True
+                self._run = 0
+                self._length = 0
+        return _merge(events)
+
+    def process_bytes(self, data):
+        """Like `process`, for 16-bit PCM bytes; audio is returned as bytes."""
+        return [(kind, None if audio is None else audio.tobytes())
+                for kind, audio in self.process(np.frombuffer(data, dtype=np.int16))]
+
+    def stats(self):
+        """Frames seen and sent, the fraction of audio suppressed, segments sent, and
+        segments whose speech had already started before their pre-roll."""
+        frames = self.counts["frames"]
+        return {
+            **self.counts,
+            "suppressed": round(1 - self.counts["sent_frames"] / frames, 3) if frames else 0.0,
+        }
+
+
+def _merge(events):
+    """Joins consecutive audio frames into one chunk."""
+    merged = []
+    for kind, audio in events:
+        if kind == "audio" and merged and merged[-1][0] == "audio":
+            merged[-1] = ("audio", merged[-1][1] + [audio])
+        else:
+            merged.append((kind, [audio] if kind == "audio" else None))
+    return [(kind, np.concatenate(audio) if kind == "audio" else None)
+            for kind, audio in merged]
+
+
+def _session(rng, minutes=10, rate=SEND_SAMPLE_RATE):
+    """A synthetic lab session: short utterances between long silences in a quiet room.
+
+    Returns:
+        (np.ndarray, list): int16 samples, and the (start, end) sample of every utterance.
+    """
+    n = int(minutes * 60 * rate)
+    # Room noise around -60 dBFS, slowly getting louder and quieter.
+    swell = 1 + 0.5 * np.sin(np.arange(n) / rate / 40)
+    audio = rng.standard_normal(n) * 10 ** (-60 / 20) * swell
+    utterances = []
+    position = int(rng.uniform(1, 5) * rate)
+    while True:
+        length = int(rng.uniform(0.6, 5) * rate)
+        if position + length >= n:
+            break
+        voice = rng.standard_normal(length)
+        voice = np.convolve(voice, np.ones(8) / 8, mode="same")  # Duller than white noise.
+        # Syllables, words with short pauses, and a soft 80 ms start as of a fricative.
+        syllables = rng.random(length // 3200 + 1) > 0.2
+        syllables[0] = True
+        syllables = np.repeat(syllables, 3200)[:length]
+        envelope = np.convolve(syllables.astype(float), np.hanning(1600) / 800, mode="same")
+        envelope[:1280] *= np.linspace(0.05, 1, 1280)
+        level = 10 ** (rng.uniform(-30, -18) / 20)
+        audio[position:position + length] += level * voice * envelope / np.std(voice)
+        utterances.append((position, position + length))
+        position += length + int(rng.exponential(8) * rate + 0.5 * rate)
+    return np.clip(audio * 32768, -32768, 32767).astype(np.int16), utterances
+
+
+def _benchmark(minutes=10):
+    """Runs the gate over a synthetic session, in 64 ms chunks as `listen_audio` reads."""
+    rng = np.random.default_rng(0)
+    audio, utterances = _session(rng, minutes)
+    gate = SpeechGate()
+    sent = np.zeros(len(audio), bool)
+    chunk = 1024
+    started = time.perf_counter()
+    for start in range(0, len(audio), chunk):
+        for kind, data in gate.process(audio[start:start + chunk]):
+            if kind == "audio":
+                # Audio returned now ends where the frames processed so far end.
+                end = start + chunk - len(gate._pending)
+                sent[end - len(data):end] = True
+    elapsed = time.perf_counter() - started
+    clipped = []
+    for begin, end in utterances:
+        first = np.argmax(sent[begin:end]) if sent[begin:end].any() else end - begin
+        clipped.append(first / SEND_SAMPLE_RATE * 1000)
+    speech = np.zeros(len(audio), bool)
+    for begin, end in utterances:
+        speech[begin:end] = True
+    stats = gate.stats()
+    print(f"{minutes} minutes, {len(utterances)} utterances, "
+          f"{speech.mean() * 100:.0f}% of the time speaking")
+    print(f"suppressed {stats['suppressed'] * 100:.1f}% of the audio in {stats['segments']} "
+          f"segments; speech sent {sent[speech].mean() * 100:.1f}%")
+    print(f"onset clipping: {sum(ms > 0 for ms in clipped)} of {len(clipped)} utterances, "
+          f"max {max(clipped):.0f} ms; flagged by the gate: {stats['clipped_onsets']}")
+    print(f"{elapsed / (len(audio) / SEND_SAMPLE_RATE) * 100:.3f}% of real time")
+
+    # The room gets 20 dB noisier (a fan is switched on) and stays that way for a minute.
+    rate = SEND_SAMPLE_RATE
+    noise = rng.standard_normal(70 * rate) * 10 ** (-60 / 20)
+    noise[10 * rate:] *= 10
+    gate = SpeechGate()
+    closed = None
+    for start in range(0, len(noise), chunk):
+        for kind, _ in gate.process(np.int16(noise[start:start + chunk] * 32768)):
+            if kind == "end" and start > 10 * rate and closed is None:
+                closed = (start - 10 * rate) / rate
+    print(f"20 dB noise step: gate closed after {closed:.1f} s, suppressed "
+          f"{gate.stats()['suppressed'] * 100:.0f}% of the minute, floor {gate.floor_db:.1f} dB")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Turns camera frames of the robot workspace into short text observations.
+
+Sending a JPEG every second makes the model re-read the same breadboard over and over.
+`WorkspaceObserver` finds the breadboard, coloured wires and component blobs locally with
+OpenCV, and maps them to breadboard rows. `ObservationStream` sends a one-line text
+observation only when that layout changes, and a full frame only every few seconds, and
+keeps count of the bytes and tokens that saves compared to a frame per tick.
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+# OpenCV hue runs 0-179. Each colour is a list of (low, high) HSV bounds.
+WIRE_COLOURS = {
+    "red": [((0, 120, 70), (7, 255, 255)), ((170, 120, 70), (179, 255, 255))],
+    "orange": [((8, 120, 100), (19, 255, 255))],
+    "yellow": [((20, 100, 100), (34, 255, 255))],
+    "green": [((40, 80, 50), (85, 255, 255))],
+    "blue": [((95, 100, 50), (130, 255, 255))],
+    "black": [((0, 0, 0), (179, 255, 50))],
+}
+# Tokens counted for an image up to 384 pixels on both sides, or per 768x768 tile of a
+# larger one.
+IMAGE_TOKENS = 258
+CHARS_PER_TOKEN = 4
+
+
+def image_tokens(width, height):
+    """Tokens the model counts for a `width` x `height` image."""
+    if width <= 384 and height <= 384:
+        return IMAGE_TOKENS
+    return IMAGE_TOKENS * -(-width // 768) * -(-height // 768)
+
+
+def jpeg_size(data):
+    """Returns `(width, height)` from a JPEG's frame header, without decoding it."""
+    position = 2
+    while position + 9 <= len(data):
+        marker, length = data[position + 1], int.from_bytes(data[position + 2:position + 4], "big")
+        # SOF0-SOF15, except DHT (C4), JPG (C8) and DAC (CC).
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height = int.from_bytes(data[position + 5:position + 7], "big")
+            return int.from_bytes(data[position + 7:position + 9], "big"), height
+        position += 2 + length
+    raise ValueError("no JPEG frame header")
+
+
+class WorkspaceObserver:
+    """Extracts the breadboard layout from BGR frames.
+
+    Args:
+        board_rows (int): Numbered rows along the breadboard's long side.
+        width (int): Frames are downscaled to this width before analysis.
+        min_area (float): Smallest blob kept, as a fraction of the frame.
+        stable_frames (int): Consecutive frames a new layout must persist before it is
+            reported, so hands moving over the board don't cause a stream of changes.
+    """
+
+    def __init__(self, board_rows=30, width=320, min_area=0.0015, stable_frames=2):
+        self.board_rows = board_rows
+        self.width = width
+        self.min_area = min_area
+        self.stable_frames = stable_frames
+        self.reported = None  # The layout last returned by `update`.
+        self._candidate = None
+        self._candidate_count = 0
+        self._kernel = np.ones((3, 3), np.uint8)
+
+    def _board(self, hsv):
+        # A breadboard is the largest bright, unsaturated region.
+        mask = cv2.inRange(hsv, (0, 0, 150), (179, 60, 255))
+        n, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=4)
+        if n < 2:
+            return None
+        i = 1 + int(np.argmax(stats[1:, cv2.CC_STAT_AREA]))
+        x, y, w, h, area = stats[i]
+        if area < 0.1 * mask.size:
+            return None
+        return x, y, w, h
+
+    def _position(self, board, point):
+        """Maps a point to (row, side) on the board, or None off the board."""
+        x, y, w, h = board
+        px, py = point
+        if not (x <= px < x + w and y <= py < y + h):
+            return None
+        # Rows run along the long side; the centre channel splits the short side in two.
+        along, across = ((px - x) / w, (py - y) / h) if w >= h else ((py - y) / h, (px - x) / w)
+        return int(along * self.board_rows) + 1, "left" if across < 0.5 else "right"
+
+    def extract(self, frame):
+        """Returns the layout of one frame as a hashable tuple of parts."""
+        scale = self.width / frame.shape[1]
+        small = cv2.resize(frame, (self.width, int(frame.shape[0] * scale)),
+                           interpolation=cv2.INTER_AREA)
+        hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+        board = self._board(hsv)
+        min_pixels = self.min_area * hsv.shape[0] * hsv.shape[1]
+        parts = [("board", board is not None)]
+
+        for colour, ranges in WIRE_COLOURS.items():
+            mask = np.zeros(hsv.shape[:2], np.uint8)
+            for low, high in ranges:
+                mask |= cv2.inRange(hsv, low, high)
+            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self._kernel)
+            n, labels, stats, centroids = cv2.connectedComponentsWithStats(mask)
+            for i in range(1, n):
+                x, y, w, h, area = stats[i]
+                if area < min_pixels:
+                    continue
+                # Wires are long and thin, or fill little of their box when diagonal.
+                elongated = max(w, h) >= 3 * min(w, h) or area < 0.35 * w * h
+                if elongated:
+                    ys, xs = np.nonzero(labels[y:y + h, x:x + w] == i)
+                    points = np.stack([xs + x, ys + y], axis=1).astype(np.float32)
+                    centre = points.mean(axis=0)
+                    # The two ends are the extremes along the wire's main axis.
+                    _, _, axes = np.linalg.svd(points - centre, full_matrices=False)
+                    projection = (points - centre) @ axes[0]
+                    ends = points[np.argmin(projection)], points[np.argmax(projection)]
+                    where = [self._position(board, e) if board else None for e in ends]
+                    where.sort(key=lambda position: (position is None, position or ()))
+                    parts.append(("wire", colour, *where))
+                else:
+                    where = self._position(board, centroids[i]) if board else None
+                    size = "large" if area > 10 * min_pixels else "small"
+                    parts.append(("part", colour, where, size))
+        return tuple(sorted(parts, key=str))
+
+    def update(self, frame):
+        """Returns a text observation if the layout changed and settled, otherwise None."""
+        layout = self.extract(frame)
+        if layout == self.reported:
+            self._candidate, self._candidate_count = None, 0
+            return None
+        if layout == self._candidate:
+            self._candidate_count += 1
+        else:
+            self._candidate, self._candidate_count = layout, 1
+        if self._candidate_count < self.stable_frames:
+            return None
+        previous, self.reported = self.reported, layout
+        self._candidate, self._candidate_count = None, 0
+        return describe(layout, previous)
+
+
+def _where(position):
+    if position is None:
+        return "off the board"
+    row, side = position
+    return f"row {row} {side}"
+
+
+def _describe_part(part):
+    if part[0] == "wire":
+        _, colour, a, b = part
+        return f"{colour} wire from {_where(a)} to {_where(b)}"
+    _, colour, where, size = part
+    return f"{size} {colour} component at {_where(where)}"
+
+
+def describe(layout, previous=None):
+    """A one-line text observation of a layout, listing what changed since `previous`."""
+    board = dict(p for p in layout if p[0] == "board").get("board")
+    items = [p for p in layout if p[0] != "board"]
+    text = "Workspace (local vision): " + ("breadboard visible. " if board else "no breadboard. ")
+    text += "; ".join(_describe_part(p) for p in items) or "nothing on it"
+    if previous is not None:
+        added = [_describe_part(p) for p in items if p not in previous]
+        removed = [_describe_part(p) for p in previous if p[0] != "board" and p not in layout]
+        if added:
+            text += ". New: " + "; ".join(added)
+        if removed:
+            text += ". Gone: " + "; ".join(removed)
+    return text + "."
+
+
+class ObservationStream:
+    """Decides, once per tick, whether to send a text observation and/or a full frame.
+
+    Args:
+        observer (WorkspaceObserver): Extracts the layout.
+        encode_jpeg (callable): Turns a BGR frame into JPEG bytes, or a list of JPEGs such
+            as `MultiResolutionFramer.encode` returns.
+        keyframe_interval (float): Seconds between full frames.
+        min_keyframe_gap (float): A layout change also sends a frame, but not more often
+            than this.
+    """
+
+    def __init__(self, observer, encode_jpeg, keyframe_interval=10.0, min_keyframe_gap=3.0):
+        self.observer = observer
+        self.encode_jpeg = encode_jpeg
+        self.keyframe_interval = keyframe_interval
+        self.min_keyframe_gap = min_keyframe_gap
+        self.started = None
+        self.ticks = 0
+        self.sent = {"frames": 0, "texts": 0, "bytes": 0, "tokens": 0}
+        self._frame_bytes = []  # Recent full-frame JPEG sizes, for a frame per tick.
+        self._frame_tokens = IMAGE_TOKENS  # Tokens for one full frame.
+        self._last_keyframe = -float("inf")
+
+    def tick(self, frame, now=None):
+        """Returns `(text, images)`: a text observation and a list of JPEGs to send, either
+        of which may be None."""
+        now = time.monotonic() if now is None else now
+        if self.started is None:
+            self.started = now
+        self.ticks += 1
+        text = self.observer.update(frame)
+        since = now - self._last_keyframe
+        images = None
+        if since >= self.keyframe_interval or (text and since >= self.min_keyframe_gap):
+            images = self.encode_jpeg(frame)
+            if isinstance(images, bytes):
+                images = [images]
+            self._last_keyframe = now
+            # A frame per tick would be one JPEG of the whole frame, which a single image
+            # already is; alongside a close-up, encode one to compare with.
+            full = images[0] if len(images) == 1 else cv2.imencode(".jpg", frame)[1]
+            self._frame_bytes = self._frame_bytes[-19:] + [len(full)]
+            self._frame_tokens = image_tokens(frame.shape[1], frame.shape[0])
+            self.sent["frames"] += 1
+            self.sent["bytes"] += sum(len(image) for image in images)
+            self.sent["tokens"] += sum(image_tokens(*jpeg_size(image)) for image in images)
+        if text:
+            self.sent["texts"] += 1
+            self.sent["bytes"] += len(text.encode())
+            self.sent["tokens"] += len(text) // CHARS_PER_TOKEN + 1
+        return text, images
+
+    def savings(self, now=None):
+        """Bytes and tokens saved per minute against sending a full-frame JPEG every tick."""
+        now = time.monotonic() if now is None else now
+        if self.started is None or not self._frame_bytes:
+            return {"bytes_per_minute": 0, "tokens_per_minute": 0}
+        minutes = max(now - self.started, 1.0) / 60
+        baseline_bytes = self.ticks * np.mean(self._frame_bytes)
+        baseline_tokens = self.ticks * self._frame_tokens
+        return {
+            "bytes_per_minute": int((baseline_bytes - self.sent["bytes"]) / minutes),
+            "tokens_per_minute": int((baseline_tokens - self.sent["tokens"]) / minutes),
+        }